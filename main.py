@@ -8,24 +8,70 @@ import os
 import sys
 import json
 import argparse
+from contextlib import contextmanager
 from datetime import datetime
-from pathlib import Path
+from functools import cached_property
 
 # 添加scripts目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'scripts'))
 
-from news_fetcher import TechNewsFetcher
-from image_generator import XiaohongshuImageGenerator
-from getnote_sender import send_daily_tech_news
+# 各模块在用到时才导入：setup-cron、status、search等轻量命令不加载Pillow和requests
+
+OUTPUT_DIR = "/mnt/okcomputer/output/tech-news-automation/output"
+ARCHIVE_DB = os.path.join(OUTPUT_DIR, "archive.sqlite3")
+SNAPSHOT_DIR = os.path.join(OUTPUT_DIR, "snapshots")
 
 class TechNewsAutomation:
-    def __init__(self):
-        self.output_dir = "/mnt/okcomputer/output/tech-news-automation/output"
+    def __init__(self, profile: bool = False, output_dir: str = OUTPUT_DIR):
+        """
+        Args:
+            profile: 是否对各阶段做性能分析（cProfile + tracemalloc）
+            output_dir: 输出目录（检索索引和快照也保存在其中）
+        """
+        self.output_dir = output_dir
+        self.profile = profile
+        self.profiler = None
         os.makedirs(self.output_dir, exist_ok=True)
-        
-        # 初始化模块
-        self.news_fetcher = TechNewsFetcher()
-        self.image_generator = XiaohongshuImageGenerator()
+    
+    # 各模块在第一次使用时才创建（例如没有新内容时不会加载图片生成器）
+    
+    @cached_property
+    def news_fetcher(self):
+        from news_fetcher import TechNewsFetcher
+        return TechNewsFetcher()
+    
+    @cached_property
+    def image_generator(self):
+        from image_generator import XiaohongshuImageGenerator
+        from thumbnails import ThumbnailFetcher, is_thumbnails_enabled
+        generator = XiaohongshuImageGenerator()
+        generator.profiler = self.profiler
+        if is_thumbnails_enabled():
+            generator.thumbnails = ThumbnailFetcher()
+        return generator
+    
+    @cached_property
+    def archive(self):
+        from archive_index import ArchiveIndex
+        return ArchiveIndex(os.path.join(self.output_dir, "archive.sqlite3"))
+    
+    @cached_property
+    def trends(self):
+        from trends import TrendAnalyzer
+        return TrendAnalyzer()
+    
+    def _set_profiler(self, profiler):
+        self.profiler = profiler
+        if 'image_generator' in self.__dict__:
+            self.image_generator.profiler = profiler
+    
+    @contextmanager
+    def _stage(self, name: str):
+        """流水线阶段（记录耗时事件和指标，开启性能分析时采集该阶段数据）"""
+        from profiling import profiled
+        from telemetry import stage
+        with stage(name), profiled(self.profiler, name):
+            yield
         
     def run(self, skip_send: bool = False) -> dict:
         """
@@ -43,80 +89,71 @@ class TechNewsAutomation:
         print("=" * 60)
         print()
         
+        # 每次运行在独立的工作目录中生成，完成后整体发布，重叠运行互不覆盖
+        from run_context import RunContext
+        run = RunContext(self.output_dir)
+        run.create()
+        print(f"🆔 运行ID: {run.run_id}")
+        
+        # 结构化事件日志：本次运行中的事件都带上运行ID
+        from telemetry import bind, configure, event
+        configure()
+        with bind(run_id=run.run_id):
+            event('run.start', skip_send=skip_send)
+            # 同一进程中多次运行（如soak）时，每次运行的配额额度重新计算
+            self.news_fetcher.quota.begin_run()
+            result = self._run(run, skip_send)
+            event('run.finish', published='run_dir' in result,
+                  failed_steps=[name for name, step in result['steps'].items()
+                                if isinstance(step, dict) and step.get('success') is False])
+        return result
+    
+    def _run(self, run, skip_send: bool) -> dict:
+        """运行流水线、发布结果并保存报告（run的主体）"""
         result = {
             'success': True,
+            'run_id': run.run_id,
             'timestamp': datetime.now().isoformat(),
             'steps': {}
         }
         
-        # 步骤1: 获取新闻
-        print("📰 步骤1: 获取高科技新闻...")
+        if self.profile:
+            from profiling import StageProfiler
+            self._set_profiler(StageProfiler(os.path.join(self.output_dir, f"profile_{run.run_id}")))
+        completed = False
         try:
-            news = self.news_fetcher.fetch_news(num_results=10)
-            result['steps']['fetch_news'] = {
-                'success': True,
-                'count': len(news)
-            }
-            print(f"✅ 成功获取 {len(news)} 条新闻")
-            
-            # 打印新闻摘要
-            for i, item in enumerate(news[:5], 1):
-                print(f"   {i}. [{item['category']}] {item['title'][:40]}...")
-        except Exception as e:
-            result['steps']['fetch_news'] = {
-                'success': False,
-                'error': str(e)
-            }
-            print(f"❌ 获取新闻失败: {e}")
-            return result
+            completed = self._run_steps(result, skip_send, run.work_dir)
+        finally:
+            if self.profiler is not None:
+                from profiling import print_profile_summary
+                result['profile'] = self.profiler.finish()
+                print_profile_summary(result['profile'])
+                self._set_profiler(None)
+            if not completed:
+                run.discard()
         
-        print()
-        
-        # 步骤2: 生成小红书风格图片
-        print("🎨 步骤2: 生成小红书风格图片...")
-        try:
-            images = self.image_generator.generate_all_images(news)
-            result['steps']['generate_images'] = {
-                'success': True,
-                'images': images
-            }
-            print(f"✅ 成功生成 {len(images)} 张图片")
-        except Exception as e:
-            result['steps']['generate_images'] = {
-                'success': False,
-                'error': str(e)
-            }
-            print(f"❌ 生成图片失败: {e}")
+        if not completed:
             return result
         
-        print()
+        # 发布本次运行的图片（同时更新输出目录下固定文件名的最新图片）
+        images = result['steps']['generate_images']['images']
+        result['run_dir'] = run.publish({os.path.basename(p): os.path.basename(p) for p in images})
+        result['steps']['generate_images']['images'] = [run.published_path(p) for p in images]
+        for variant in result['steps'].get('render_variants', {}).get('variants', []):
+            variant['images'] = {page: run.published_path(p) for page, p in variant['images'].items()}
         
-        # 步骤3: 发送到Get笔记
-        if not skip_send:
-            print("📤 步骤3: 发送到Get笔记...")
+        # 发布且发送成功（或跳过发送）后才推进增量水位线，发送失败时下次运行重新获取同一批新闻
+        if result['steps'].get('send_to_getnote', {}).get('success'):
+            self.news_fetcher.commit_watermarks()
+        
+        # 整理输出目录：归档旧报告、图片去重、缩小和删除过期结果（失败不影响本次运行）
+        with self._stage('retention'):
             try:
-                api_key = os.getenv('GETNOTE_API_KEY', '')
-                send_result = send_daily_tech_news(news, images, api_key)
-                result['steps']['send_to_getnote'] = send_result
-                
-                if send_result['success']:
-                    print(f"✅ 发送成功")
-                    if 'message' in send_result:
-                        print(f"   {send_result['message']}")
-                else:
-                    print(f"⚠️ 发送未完成: {send_result.get('message', '')}")
+                from retention import RetentionManager, print_retention_stats
+                result['retention'] = RetentionManager(self.output_dir).run()
+                print_retention_stats(result['retention'])
             except Exception as e:
-                result['steps']['send_to_getnote'] = {
-                    'success': False,
-                    'error': str(e)
-                }
-                print(f"⚠️ 发送过程出现问题: {e}")
-        else:
-            print("📤 步骤3: 跳过发送（测试模式）")
-            result['steps']['send_to_getnote'] = {
-                'success': True,
-                'skipped': True
-            }
+                print(f"⚠️ 输出目录整理失败: {e}")
         
         print()
         print("=" * 60)
@@ -124,13 +161,236 @@ class TechNewsAutomation:
         print("=" * 60)
         
         # 保存运行报告
-        report_path = os.path.join(self.output_dir, 
-                                   f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        from state_store import save_json_atomic
+        report_path = os.path.join(self.output_dir, f"report_{run.run_id}.json")
+        save_json_atomic(report_path, result, indent=2)
         print(f"📊 运行报告已保存: {report_path}")
         
         return result
+    
+    def _run_steps(self, result: dict, skip_send: bool, work_dir: str) -> bool:
+        """
+        依次执行流水线各步骤，结果写入result
+        
+        Args:
+            work_dir: 本次运行的工作目录，生成的图片写在这里
+        
+        Returns:
+            是否完整执行（获取或生成失败、没有新内容时返回False）
+        """
+        # 步骤1: 获取新闻
+        with self._stage('fetch_news'):
+            print("📰 步骤1: 获取高科技新闻...")
+            try:
+                news = self.news_fetcher.fetch_news(num_results=10)
+                result['steps']['fetch_news'] = {
+                    'success': True,
+                    'count': len(news),
+                    'providers': self.news_fetcher.router.summary(),
+                    'quota': self.news_fetcher.quota.report(self.news_fetcher.api_keys)
+                }
+                print(f"✅ 成功获取 {len(news)} 条新闻")
+            
+                # 打印新闻摘要
+                for i, item in enumerate(news[:5], 1):
+                    print(f"   {i}. [{item['category']}] {item['title'][:40]}...")
+            except Exception as e:
+                result['steps']['fetch_news'] = {
+                    'success': False,
+                    'error': str(e)
+                }
+                print(f"❌ 获取新闻失败: {e}")
+                return False
+        
+        # 写入历史检索索引（失败不影响主流程）
+        with self._stage('index_archive'):
+            try:
+                added = self.archive.index_news(news)
+                print(f"🗂️ 已写入检索索引: 新增 {added} 条")
+            except Exception as e:
+                print(f"⚠️ 写入检索索引失败: {e}")
+        
+        # 语义分组：去掉重复报道，相关新闻归入同一类别并相邻排列（失败时保持原顺序）
+        with self._stage('semantic_groups'):
+            from semantic import get_semantic_index, group_news
+            try:
+                index = get_semantic_index()
+                if index is not None and news:
+                    grouped = group_news(news, index)
+                    news = grouped['news']
+                    result['steps']['semantic_groups'] = {
+                        'success': True,
+                        'groups': grouped['groups'],
+                        'duplicates': grouped['duplicates']
+                    }
+                    print(f"🧩 语义分组: {len(grouped['groups'])} 组相关新闻, 去掉重复报道 {grouped['duplicates']} 条")
+            except Exception as e:
+                result['steps']['semantic_groups'] = {
+                    'success': False,
+                    'error': str(e)
+                }
+                print(f"⚠️ 语义分组失败: {e}")
+        
+        # 更新趋势统计并生成当日快照（失败时总结页使用默认趋势）
+        with self._stage('trends'):
+            trends = None
+            try:
+                self.trends.update(news)
+                trends = self.trends.snapshot()
+                result['steps']['trends'] = {
+                    'success': True,
+                    'categories': [t['name'] for t in trends['categories']],
+                    'bursts': trends['bursts']
+                }
+            except Exception as e:
+                print(f"⚠️ 趋势统计失败: {e}")
+        
+        # 增量模式下没有新内容时不再生成和发送
+        if not news:
+            print("😴 没有新的新闻，本次运行结束")
+            return False
+        
+        # 抓取原文生成卡片摘要（失败时保留API原有摘要）
+        with self._stage('enrich_summaries'):
+            from enrichment import ArticleEnricher, is_enrichment_enabled
+            if is_enrichment_enabled():
+                try:
+                    updated = ArticleEnricher().enrich(news, top_n=6)
+                    result['steps']['enrich_summaries'] = {
+                        'success': True,
+                        'updated': updated
+                    }
+                    print(f"📝 已从原文提取摘要: {updated} 条")
+                except Exception as e:
+                    result['steps']['enrich_summaries'] = {
+                        'success': False,
+                        'error': str(e)
+                    }
+                    print(f"⚠️ 原文摘要提取失败: {e}")
+        
+        # 英文标题和摘要翻译为中文（失败时保留原文）
+        with self._stage('localize'):
+            from localization import get_localizer
+            try:
+                localizer = get_localizer()
+                if localizer is not None:
+                    stats = localizer.localize(news)
+                    result['steps']['localize'] = dict(stats, success=True)
+                    print(f"🌐 已翻译 {stats['items']} 条新闻（新翻译 {stats['translated']} 段, "
+                          f"缓存命中 {stats['cached']} 段, {stats['batches']} 批）")
+            except Exception as e:
+                result['steps']['localize'] = {
+                    'success': False,
+                    'error': str(e)
+                }
+                print(f"⚠️ 翻译失败，保留原文: {e}")
+        
+        # 保存渲染输入的快照，之后可用 main.py replay <运行ID> 离线重新渲染（失败不影响本次运行）
+        variants_file = os.getenv('TECH_NEWS_VARIANTS', '').strip()
+        with self._stage('snapshot'):
+            try:
+                from snapshots import SnapshotStore
+                variants = None
+                if variants_file:
+                    from image_generator import load_variants
+                    try:
+                        variants = load_variants(variants_file)
+                    except (OSError, ValueError):
+                        pass  # 变体定义有误时由渲染变体步骤报告
+                store = SnapshotStore(os.path.join(self.output_dir, "snapshots"))
+                stats = store.save(result['run_id'], news, trends, variants)
+                store.prune()
+                result['steps']['snapshot'] = dict(stats, success=True)
+                print(f"📸 已保存输入快照: {len(news)} 条新闻, 新增 {stats['new_objects']} 个对象 "
+                      f"({stats['bytes'] / 1024:.1f} KiB)")
+            except Exception as e:
+                result['steps']['snapshot'] = {
+                    'success': False,
+                    'error': str(e)
+                }
+                print(f"⚠️ 保存输入快照失败: {e}")
+        
+        print()
+        
+        # 步骤2: 生成小红书风格图片
+        with self._stage('generate_images'):
+            print("🎨 步骤2: 生成小红书风格图片...")
+            try:
+                images = self.image_generator.generate_all_images(news, trends, work_dir)
+                result['steps']['generate_images'] = {
+                    'success': True,
+                    'images': images
+                }
+                print(f"✅ 成功生成 {len(images)} 张图片")
+            except Exception as e:
+                result['steps']['generate_images'] = {
+                    'success': False,
+                    'error': str(e)
+                }
+                print(f"❌ 生成图片失败: {e}")
+                return False
+        
+        # A/B版式变体（TECH_NEWS_VARIANTS指向变体定义文件；失败不影响主流程）
+        if variants_file:
+            with self._stage('render_variants'):
+                try:
+                    from image_generator import load_variants
+                    variants = self.image_generator.render_variants(
+                        news, load_variants(variants_file), os.path.join(work_dir, 'variants'))
+                    result['steps']['render_variants'] = {
+                        'success': True,
+                        'variants': variants
+                    }
+                    print(f"🧪 已渲染 {len(variants)} 个版式变体: {', '.join(v['name'] for v in variants)}")
+                except Exception as e:
+                    result['steps']['render_variants'] = {
+                        'success': False,
+                        'error': str(e)
+                    }
+                    print(f"⚠️ 渲染版式变体失败: {e}")
+        
+        print()
+        
+        # 步骤3: 发送到Get笔记
+        with self._stage('send_to_getnote'):
+            if not skip_send:
+                print("📤 步骤3: 发送到Get笔记...")
+                try:
+                    from getnote_sender import send_daily_tech_news
+                    api_key = os.getenv('GETNOTE_API_KEY', '')
+                    # 本地笔记按运行ID分目录，同一天的多期日报互不覆盖
+                    send_result = send_daily_tech_news(news, images, api_key,
+                                                       output_dir=self.output_dir,
+                                                       note_name=result['run_id'])
+                    result['steps']['send_to_getnote'] = send_result
+                
+                    if send_result['success']:
+                        print(f"✅ 发送成功")
+                        if 'message' in send_result:
+                            print(f"   {send_result['message']}")
+                    else:
+                        print(f"⚠️ 发送未完成: {send_result.get('message', '')}")
+                except Exception as e:
+                    result['steps']['send_to_getnote'] = {
+                        'success': False,
+                        'error': str(e)
+                    }
+                    print(f"⚠️ 发送过程出现问题: {e}")
+            else:
+                print("📤 步骤3: 跳过发送（测试模式）")
+                result['steps']['send_to_getnote'] = {
+                    'success': True,
+                    'skipped': True
+                }
+        
+        # 索引当天保存的笔记
+        with self._stage('index_notes'):
+            try:
+                self.archive.index_notes_dir(self.output_dir)
+            except Exception as e:
+                print(f"⚠️ 索引笔记失败: {e}")
+        
+        return True
 
 def setup_cron_job():
     """设置定时任务（每天早上8:30运行）"""
@@ -162,24 +422,271 @@ def setup_cron_job():
     print(f"  4. 设置参数: {script_path} --send")
     print("=" * 60)
 
+def show_status():
+    """显示最近一次运行、API健康度和当日配额（只读本地状态文件，不发起网络请求）"""
+    import glob
+    from provider_router import ProviderRouter
+    from rate_limiter import PROVIDER_ENV_KEYS, QuotaManager
+    
+    print("📋 系统状态")
+    print("=" * 60)
+    reports = sorted(glob.glob(os.path.join(OUTPUT_DIR, 'report_*.json')))
+    if reports:
+        with open(reports[-1], 'r', encoding='utf-8') as f:
+            last = json.load(f)
+        steps = ', '.join(f"{name}{'✅' if step.get('success') else '❌'}"
+                          for name, step in last.get('steps', {}).items())
+        print(f"最近运行: {last.get('timestamp', '')} {'成功' if last.get('success') else '失败'}")
+        print(f"   步骤: {steps}")
+    else:
+        print("最近运行: 暂无运行报告")
+    
+    # 密钥直接从环境变量读取，不加载新闻源插件（避免导入HTTP客户端和扫描entry point）
+    api_keys = {name: os.getenv(env_key, '') for name, env_key in PROVIDER_ENV_KEYS.items()}
+    quota = QuotaManager()
+    router = ProviderRouter(
+        quota_lookup=lambda name: quota.remaining(name, api_keys[name]) if api_keys.get(name) else None)
+    print("API健康度:")
+    # 内置API之外，RSS和第三方新闻源有健康度记录时也一并显示
+    for name, health in router.summary(list(dict.fromkeys([*api_keys, *router.state]))).items():
+        latency = f"{health['latency'] * 1000:.0f}ms" if health['latency'] is not None else '-'
+        remaining = health['remaining_quota'] if health['remaining_quota'] is not None else '-'
+        print(f"   {name:<10} {'可用' if health['available'] else '熔断中'}  延迟 {latency}  "
+              f"错误率 {health['error_rate']:.0%}  当日剩余 {remaining}")
+    
+    for name, plan in quota.report(api_keys).items():
+        print(f"   {name:<10} 今日已用 {plan['used_today']}/{plan['daily_limit']}  "
+              f"下次运行可用 {plan['run_allowance']}")
+    print("=" * 60)
+
+def replay_run(run_id: str, output_dir: str = None):
+    """用运行快照离线重新渲染图片和文案（不访问网络）"""
+    from snapshots import SnapshotError, SnapshotStore, replay
+    
+    store = SnapshotStore(SNAPSHOT_DIR)
+    try:
+        resolved = store.resolve(run_id)
+        result = replay(store, resolved, output_dir or os.path.join(OUTPUT_DIR, 'replays', resolved))
+    except SnapshotError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    if result['changed_templates']:
+        print(f"ℹ️ 以下模板在该运行之后有修改，使用当前版本渲染: {', '.join(result['changed_templates'])}")
+    if result['missing_thumbnails']:
+        print(f"⚠️ {len(result['missing_thumbnails'])} 张新闻配图不在本机缓存中（原运行下载失败或缓存已清理），对应卡片按无配图版式渲染:")
+        for url in result['missing_thumbnails']:
+            print(f"   {url}")
+    for variant in result['variants']:
+        print(f"🧪 变体 {variant['name']}: {', '.join(variant['images'].values())}")
+    print(f"📝 文案: {result['note']}")
+    print(f"⏱️ 重放 {result['run_id']}: 读取快照 {result['load_ms']:.1f} ms, 渲染 {result['render_ms']:.1f} ms")
+
+def soak_test(args):
+    """长时间运行测试：对着本地桩服务反复运行流程，资源占用或耗时超过阈值时以退出码1结束"""
+    import tempfile
+    from soak import FaultPlan, SoakTest, SoakThresholds, parse_duration, print_report
+    
+    directory = args.dir or os.path.join(tempfile.gettempdir(), 'tech_news_soak',
+                                         datetime.now().strftime('%Y%m%d_%H%M%S'))
+    faults = FaultPlan(latency_min=args.latency_min, latency_max=args.latency_max,
+                       error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    thresholds = SoakThresholds(rss_growth_mb=args.max_rss_growth, fd_growth=args.max_fd_growth,
+                                thread_growth=args.max_thread_growth, latency_drift=args.max_latency_drift)
+    test = SoakTest(directory, faults, thresholds, mode=args.mode, warmup=args.warmup,
+                    trace_malloc=args.tracemalloc)
+    print(f"🧪 Soak测试目录: {directory}")
+    report = test.run(lambda output_dir: TechNewsAutomation(output_dir=output_dir),
+                      duration=parse_duration(args.duration) if args.duration else None,
+                      iterations=args.iterations, interval=args.interval, verbose=args.verbose)
+    print_report(report)
+    sys.exit(0 if report['passed'] else 1)
+
+def benchmark_startup(repeat: int = 10):
+    """测量各命令的启动耗时（子进程运行，取中位数）"""
+    import statistics
+    import subprocess
+    import time
+    
+    script_path = os.path.abspath(__file__)
+    commands = [
+        ('python -c pass', [sys.executable, '-c', 'pass']),
+        ('setup-cron', [sys.executable, script_path, 'setup-cron']),
+        ('status', [sys.executable, script_path, 'status']),
+        ('--help', [sys.executable, script_path, '--help']),
+        ('import-all', [sys.executable, '-c',
+                         f"import sys; sys.path.insert(0, {os.path.join(os.path.dirname(script_path), 'scripts')!r}); "
+                         "import news_fetcher, image_generator, getnote_sender, enrichment"]),
+    ]
+    
+    print(f"⏱️ 启动耗时（{repeat}次中位数）:")
+    for label, cmd in commands:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            timings.append(time.perf_counter() - start)
+        print(f"   {label:<16} {statistics.median(timings) * 1000:>8.1f} ms  "
+              f"(最快 {min(timings) * 1000:.1f} ms)")
+
 def main():
     parser = argparse.ArgumentParser(description='全球科技新闻自动化系统')
+    # 兼容旧的参数形式（python main.py --send / --test / --setup-cron / --search）
     parser.add_argument('--send', action='store_true', 
                        help='发送到Get笔记（默认只生成不发送）')
     parser.add_argument('--setup-cron', action='store_true',
                        help='显示定时任务设置指南')
     parser.add_argument('--test', action='store_true',
                        help='测试模式（不发送）')
+    parser.add_argument('--profile', action='store_true',
+                       help='性能分析模式（不发送，输出各阶段pstats、火焰图调用栈和内存分配）')
+    parser.add_argument('--search', metavar='QUERY',
+                       help='检索历史新闻，如 --search "台积电 芯片"')
+    parser.add_argument('--days', type=int,
+                       help='检索时只查最近N天')
+    parser.add_argument('--category',
+                       help='检索时只查某个类别，如 芯片')
+    parser.add_argument('--limit', type=int, default=20,
+                       help='检索返回条数（默认20）')
+    
+    commands = parser.add_subparsers(dest='command', metavar='命令')
+    # 子命令中与顶层同名的开关不设默认值（SUPPRESS），否则会覆盖写在子命令前的顶层开关
+    
+    run_parser = commands.add_parser('run', help='运行完整流程（默认命令）')
+    run_parser.add_argument('--send', action='store_true', default=argparse.SUPPRESS,
+                            help='发送到Get笔记（默认只生成不发送）')
+    run_parser.add_argument('--profile', action='store_true', default=argparse.SUPPRESS,
+                            help='性能分析模式（不发送）')
+    
+    search_parser = commands.add_parser('search', help='检索历史新闻')
+    search_parser.add_argument('query', help='检索词，如 "台积电 芯片"')
+    search_parser.add_argument('--days', type=int, help='只查最近N天')
+    search_parser.add_argument('--category', help='只查某个类别，如 芯片')
+    search_parser.add_argument('--limit', type=int, default=20, help='返回条数（默认20）')
+    
+    commands.add_parser('status', help='显示最近运行、API健康度和配额')
+    commands.add_parser('setup-cron', help='显示定时任务设置指南')
+    
+    watch_parser = commands.add_parser('watch', help='突发新闻监控（发现多家媒体报道的新事件时立即生成卡片）')
+    watch_parser.add_argument('--send', action='store_true', default=argparse.SUPPRESS,
+                              help='推送突发卡片（默认只生成）')
+    watch_parser.add_argument('--once', action='store_true', help='只轮询一次（可交给cron调度）')
+    watch_parser.add_argument('--min-interval', type=float, default=120, help='最短轮询间隔秒数（默认120）')
+    watch_parser.add_argument('--max-interval', type=float, default=1800, help='最长轮询间隔秒数（默认1800）')
+    watch_parser.add_argument('--metrics-port', type=int,
+                              default=int(os.getenv('TECH_NEWS_METRICS_PORT', '8809')),
+                              help='本地 /metrics 和 /healthz 端口（默认8809，0为关闭）')
+    
+    commands.add_parser('compact', help='立即整理输出目录（归档旧报告、图片去重、清理过期结果）')
+    
+    serve_parser = commands.add_parser('serve', help='启动本地图片渲染服务（POST /render）')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认127.0.0.1）')
+    serve_parser.add_argument('--port', type=int, default=8808, help='监听端口（默认8808）')
+    serve_parser.add_argument('--workers', type=int, default=2, help='渲染线程数（默认2）')
+    serve_parser.add_argument('--queue-size', type=int, default=8, help='等待队列上限，满时返回503（默认8）')
+    
+    replay_parser = commands.add_parser('replay', help='用运行快照离线重新渲染图片和文案')
+    replay_parser.add_argument('run_id', help='运行ID（可以是唯一前缀，或latest）')
+    replay_parser.add_argument('--output', help='输出目录（默认 output/replays/<运行ID>/）')
+    
+    soak_parser = commands.add_parser('soak', help='长时间运行测试（桩服务 + 故障注入，检查内存、文件描述符和耗时漂移）')
+    soak_parser.add_argument('--duration', help='运行时长，如 90m、2h（默认按 --iterations）')
+    soak_parser.add_argument('--iterations', type=int, help='运行轮数（未指定时长时默认10）')
+    soak_parser.add_argument('--interval', type=float, default=0, help='两轮之间的间隔秒数（默认0）')
+    soak_parser.add_argument('--mode', choices=('run', 'watch', 'both'), default='both',
+                             help='run=日报流程, watch=突发监控轮询, both=每轮两者各一次（默认）')
+    soak_parser.add_argument('--warmup', type=int, default=3, help='不计入基线的预热轮数（默认3）')
+    soak_parser.add_argument('--latency-min', type=float, default=0.0, help='注入延迟下限秒数（默认0）')
+    soak_parser.add_argument('--latency-max', type=float, default=0.3, help='注入延迟上限秒数（默认0.3）')
+    soak_parser.add_argument('--error-rate', type=float, default=0.1, help='注入5xx的比例（默认0.1）')
+    soak_parser.add_argument('--rate-limit-rate', type=float, default=0.05, help='注入429的比例（默认0.05）')
+    soak_parser.add_argument('--seed', type=int, default=0, help='故障注入随机种子（默认0）')
+    soak_parser.add_argument('--max-rss-growth', type=float, default=64, help='常驻内存增长阈值MB（默认64）')
+    soak_parser.add_argument('--max-fd-growth', type=int, default=8, help='文件描述符增长阈值（默认8）')
+    soak_parser.add_argument('--max-thread-growth', type=int, default=4, help='线程数增长阈值（默认4）')
+    soak_parser.add_argument('--max-latency-drift', type=float, default=1.5,
+                             help='每轮耗时漂移阈值（后段/前段中位数，默认1.5）')
+    soak_parser.add_argument('--tracemalloc', action='store_true',
+                             help='统计Python堆增长并列出增长最多的分配位置（运行会变慢）')
+    soak_parser.add_argument('--dir', help='测试目录（默认 /tmp/tech_news_soak/<时间>/）')
+    soak_parser.add_argument('--verbose', action='store_true', help='显示流程自身的输出')
+    
+    bench_parser = commands.add_parser('bench-startup', help='测量各命令的启动耗时')
+    bench_parser.add_argument('--repeat', type=int, default=10, help='每个命令运行次数（默认10）')
+    
+    bench_json_parser = commands.add_parser('bench-json', help='对比整页与流式JSON解析的耗时和峰值内存')
+    bench_json_parser.add_argument('--file', help='录制的API响应文件（默认生成NewsAPI格式的大页）')
+    bench_json_parser.add_argument('--key', default='articles', help='文章数组字段（默认articles）')
+    bench_json_parser.add_argument('--articles', type=int, default=5000, help='生成的文章数（默认5000）')
+    
+    bench_semantic_parser = commands.add_parser('bench-semantic', help='测量语义索引的向量化、加载和近邻查询耗时')
+    bench_semantic_parser.add_argument('--articles', type=int, default=20000, help='合成文章数（默认20000）')
     
     args = parser.parse_args()
     
-    if args.setup_cron:
+    if args.command == 'setup-cron' or args.setup_cron:
         setup_cron_job()
         return
     
+    if args.command == 'status':
+        show_status()
+        return
+    
+    if args.command == 'watch':
+        from watch_mode import BreakingNewsWatcher
+        watcher = BreakingNewsWatcher(OUTPUT_DIR, ARCHIVE_DB, send=args.send,
+                                      min_interval=args.min_interval, max_interval=args.max_interval)
+        watcher.run(max_polls=1 if args.once else None,
+                    metrics_port=None if args.once else args.metrics_port)
+        return
+    
+    if args.command == 'compact':
+        from retention import RetentionManager, print_retention_stats
+        print_retention_stats(RetentionManager(OUTPUT_DIR).run())
+        return
+    
+    if args.command == 'serve':
+        from render_service import serve
+        serve(args.host, args.port, args.workers, args.queue_size)
+        return
+    
+    if args.command == 'replay':
+        replay_run(args.run_id, args.output)
+        return
+    
+    if args.command == 'soak':
+        soak_test(args)
+        return
+    
+    if args.command == 'bench-startup':
+        benchmark_startup(args.repeat)
+        return
+    
+    if args.command == 'bench-json':
+        from json_stream import print_benchmark, synthetic_page
+        if args.file:
+            with open(args.file, 'rb') as f:
+                body = f.read()
+        else:
+            body = synthetic_page(args.articles)
+        print_benchmark(body, args.key)
+        return
+    
+    if args.command == 'bench-semantic':
+        from semantic import print_benchmark
+        print_benchmark(args.articles)
+        return
+    
+    query = args.query if args.command == 'search' else args.search
+    if query:
+        from archive_index import ArchiveIndex, print_search_results
+        print_search_results(ArchiveIndex(ARCHIVE_DB), query,
+                             days=args.days, category=args.category, limit=args.limit)
+        return
+    
     # 运行自动化流程
-    automation = TechNewsAutomation()
-    skip_send = not args.send or args.test
+    automation = TechNewsAutomation(profile=args.profile)
+    skip_send = not args.send or args.test or args.profile
     
     result = automation.run(skip_send=skip_send)
     
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+历史新闻全文检索模块
+把每次运行的新闻和笔记增量写入SQLite FTS5索引，支持按关键词、类别和时间范围查询
+
+中文没有空格分词，这里对连续的中日韩文字做二元切分（"台积电" -> "台积 积电"），
+英文和数字按单词小写切分，再交给FTS5的unicode61分词器建索引，
+查询时用同样的方式切分并按短语匹配，两个字的中文词也能命中。
+"""
+
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from run_context import is_note_dir_name
+from watermarks import article_id, normalize_timestamp
+
+# 中日韩统一表意文字及常用扩展
+_CJK_RUN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_TOKEN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9A-Za-z]+(?:[.\-][0-9A-Za-z]+)*')
+
+
+def _cjk_bigrams(run: str) -> List[str]:
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text: str) -> List[str]:
+    """把文本切分成索引词：中文二元切分，英文小写单词"""
+    tokens = []
+    for match in _TOKEN.finditer(text or ''):
+        part = match.group()
+        if _CJK_RUN.fullmatch(part):
+            tokens.extend(_cjk_bigrams(part))
+        else:
+            tokens.append(part.lower())
+    return tokens
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    把用户查询转换为FTS5 MATCH表达式
+
+    每个空格分隔的词转换成一个短语，多个词之间为AND关系。
+    只有单个汉字的词无法用二元索引匹配，返回None由调用方改用LIKE。
+    """
+    phrases = []
+    for term in query.split():
+        tokens = tokenize(term)
+        if not tokens:
+            continue
+        if any(len(t) == 1 and _CJK_RUN.fullmatch(t) for t in tokens):
+            return None
+        phrases.append('"' + ' '.join(t.replace('"', '""') for t in tokens) + '"')
+    return ' AND '.join(phrases) if phrases else None
+
+
+class ArchiveIndex:
+    """历史新闻与笔记的全文索引"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS articles (
+                    rowid INTEGER PRIMARY KEY,
+                    id TEXT UNIQUE NOT NULL,
+                    title TEXT, summary TEXT, source TEXT, category TEXT,
+                    hot_score INTEGER, url TEXT, published TEXT, from_api TEXT,
+                    run_date TEXT);
+                CREATE INDEX IF NOT EXISTS idx_articles_published ON articles(published);
+                CREATE INDEX IF NOT EXISTS idx_articles_category ON articles(category, published);
+                CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                    tokens, tokenize='unicode61');
+
+                CREATE TABLE IF NOT EXISTS notes (
+                    rowid INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    mtime REAL, run_date TEXT, content TEXT);
+                CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+                    tokens, tokenize='unicode61');
+            ''')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ---- 写入 ----
+
+    def index_news(self, news_list: Iterable, run_date: Optional[str] = None) -> int:
+        """
+        增量写入新闻（按URL/标题去重，已索引的文章会跳过）
+
+        Returns:
+            新增的文章数
+        """
+        run_date = run_date or datetime.now().strftime('%Y-%m-%d')
+        added = 0
+        with self._connect() as conn:
+            for news in news_list:
+                published = normalize_timestamp(news.get('published_at', '')) or run_date + 'T00:00:00'
+                cursor = conn.execute(
+                    '''INSERT OR IGNORE INTO articles
+                       (id, title, summary, source, category, hot_score, url, published, from_api, run_date)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                    (article_id(news), news.get('title', ''), news.get('summary', ''),
+                     news.get('source', ''), news.get('category', ''), news.get('hot_score', 0),
+                     news.get('url', ''), published, news.get('from_api', ''), run_date))
+                if cursor.rowcount:
+                    text = ' '.join((news.get('title', ''), news.get('summary', ''),
+                                     news.get('source', ''), news.get('category', '')))
+                    conn.execute('INSERT INTO articles_fts(rowid, tokens) VALUES (?, ?)',
+                                 (cursor.lastrowid, ' '.join(tokenize(text))))
+                    added += 1
+        return added
+
+    def index_notes_dir(self, output_dir: str) -> int:
+        """
+        增量索引输出目录下的本地笔记（<运行ID>/note.txt 或旧版 YYYYMMDD/note.txt），未变化的文件跳过
+
+        Returns:
+            新增或更新的笔记数
+        """
+        updated = 0
+        if not os.path.isdir(output_dir):
+            return 0
+        with self._connect() as conn:
+            known = {row['path']: row['mtime'] for row in conn.execute('SELECT path, mtime FROM notes')}
+            for entry in os.scandir(output_dir):
+                if not (entry.is_dir() and is_note_dir_name(entry.name)):
+                    continue
+                path = os.path.join(entry.path, 'note.txt')
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                if known.get(path) == mtime:
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                run_date = f"{entry.name[:4]}-{entry.name[4:6]}-{entry.name[6:]}"
+                row = conn.execute('SELECT rowid FROM notes WHERE path=?', (path,)).fetchone()
+                if row:
+                    conn.execute('UPDATE notes SET mtime=?, content=? WHERE rowid=?',
+                                 (mtime, content, row['rowid']))
+                    conn.execute('DELETE FROM notes_fts WHERE rowid=?', (row['rowid'],))
+                    rowid = row['rowid']
+                else:
+                    rowid = conn.execute(
+                        'INSERT INTO notes (path, mtime, run_date, content) VALUES (?, ?, ?, ?)',
+                        (path, mtime, run_date, content)).lastrowid
+                conn.execute('INSERT INTO notes_fts(rowid, tokens) VALUES (?, ?)',
+                             (rowid, ' '.join(tokenize(content))))
+                updated += 1
+        return updated
+
+    # ---- 查询 ----
+
+    def search(self, query: str, days: Optional[int] = None, category: Optional[str] = None,
+               limit: int = 20) -> List[Dict]:
+        """
+        检索历史新闻
+
+        Args:
+            query: 关键词，多个词用空格分隔（AND关系）
+            days: 只查最近N天
+            category: 只查某个类别
+            limit: 最多返回条数
+
+        Returns:
+            按相关度、发布时间排序的新闻列表
+        """
+        where = []
+        params = []
+        if days:
+            cutoff = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%S')
+            where.append('a.published >= ?')
+            params.append(cutoff)
+        if category:
+            where.append('a.category = ?')
+            params.append(category)
+
+        match = build_match_query(query)
+        if match:
+            sql = ('SELECT a.*, bm25(articles_fts) AS rank FROM articles_fts '
+                   'JOIN articles a ON a.rowid = articles_fts.rowid '
+                   'WHERE articles_fts MATCH ?')
+            params.insert(0, match)
+        else:
+            # 单字查询：退化为LIKE扫描
+            sql = 'SELECT a.*, 0 AS rank FROM articles a WHERE 1=1'
+            for term in query.split():
+                where.append('(a.title LIKE ? OR a.summary LIKE ?)')
+                params.extend([f'%{term}%', f'%{term}%'])
+        if where:
+            sql += ' AND ' + ' AND '.join(where)
+        sql += ' ORDER BY rank, a.published DESC LIMIT ?'
+        params.append(limit)
+
+        with self._connect() as conn:
+            return [{k: row[k] for k in row.keys() if k not in ('rowid', 'rank')}
+                    for row in conn.execute(sql, params)]
+
+    def filter_new(self, news_list: List[Dict]) -> List[Dict]:
+        """返回尚未入库的文章（一次连接批量查询）"""
+        ids = [article_id(news) for news in news_list]
+        known = set()
+        with self._connect() as conn:
+            # 分批查询，不超过SQLite的参数个数上限
+            for i in range(0, len(ids), 500):
+                batch = ids[i:i + 500]
+                known.update(row[0] for row in conn.execute(
+                    f"SELECT id FROM articles WHERE id IN ({','.join('?' * len(batch))})", batch))
+        return [news for news, news_id in zip(news_list, ids) if news_id not in known]
+
+    def recent(self, hours: int = 24, limit: int = 500) -> List[Dict]:
+        """最近N小时内发布的文章（按发布时间倒序）"""
+        cutoff = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%dT%H:%M:%S')
+        with self._connect() as conn:
+            return [{k: row[k] for k in row.keys() if k != 'rowid'}
+                    for row in conn.execute('SELECT * FROM articles WHERE published >= ? '
+                                            'ORDER BY published DESC LIMIT ?', (cutoff, limit))]
+
+    def search_notes(self, query: str, limit: int = 10) -> List[Dict]:
+        """检索历史笔记，返回日期、路径和匹配片段"""
+        match = build_match_query(query)
+        if not match:
+            return []
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT n.run_date, n.path, n.content FROM notes_fts '
+                'JOIN notes n ON n.rowid = notes_fts.rowid '
+                'WHERE notes_fts MATCH ? ORDER BY bm25(notes_fts) LIMIT ?',
+                (match, limit)).fetchall()
+        results = []
+        first_term = query.split()[0]
+        for row in rows:
+            pos = max(0, row['content'].lower().find(first_term.lower()))
+            results.append({
+                'run_date': row['run_date'],
+                'path': row['path'],
+                'snippet': row['content'][max(0, pos - 30):pos + 60].replace('\n', ' '),
+            })
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            return {
+                'articles': conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0],
+                'notes': conn.execute('SELECT COUNT(*) FROM notes').fetchone()[0],
+            }
+
+
+def print_search_results(index: ArchiveIndex, query: str, days: Optional[int] = None,
+                         category: Optional[str] = None, limit: int = 20):
+    """命令行输出检索结果"""
+    start = time.perf_counter()
+    results = index.search(query, days=days, category=category, limit=limit)
+    notes = index.search_notes(query, limit=5)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"🔍 \"{query}\" 共找到 {len(results)} 条新闻、{len(notes)} 篇笔记（{elapsed:.1f} ms）")
+    for i, item in enumerate(results, 1):
+        print(f"{i:>3}. {item['published'][:10]} [{item['category']}] {item['title']}")
+        print(f"     来源: {item['source']} | 热度: {item['hot_score']}" +
+              (f" | {item['url']}" if item['url'] else ''))
+    for note in notes:
+        print(f"  📝 {note['run_date']} {note['snippet']}")
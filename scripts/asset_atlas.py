@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+卡片素材图集
+预先渲染圆角卡片、类别标签和序号圆圈，页面绘制时直接paste合成
+
+- 在4倍尺寸下绘制再缩小（超采样），边缘抗锯齿
+- 按尺寸、圆角、颜色、文字缓存：进程内LRU + 磁盘PNG（跨运行复用）
+- 素材带透明通道，paste时用自身alpha作为蒙版
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from state_store import state_path
+
+# 超采样倍数
+SUPERSAMPLE = 4
+
+# 素材格式版本，绘制方式变化时递增以废弃旧的磁盘缓存
+ATLAS_VERSION = 1
+
+# 进程内缓存的素材数
+MAX_MEMORY_ITEMS = 256
+
+Color = Tuple[int, int, int]
+
+
+def _font_id(font) -> str:
+    """字体的缓存标识（字体文件 + 字号）"""
+    path = getattr(font, 'path', None)
+    if isinstance(path, str):
+        return f"{os.path.basename(path)}@{font.size}"
+    return f"default@{getattr(font, 'size', 0)}"
+
+
+class AssetAtlas:
+    """带缓存的卡片素材"""
+
+    def __init__(self, cache_dir: Optional[str] = None,
+                 font_loader: Optional[Callable[[int, bool], ImageFont.ImageFont]] = None):
+        """
+        Args:
+            cache_dir: 磁盘缓存目录，默认在状态目录下的assets/
+            font_loader: (字号, 是否粗体) -> 字体，用于标签和序号文字
+        """
+        self.cache_dir = cache_dir or state_path('assets')
+        self.font_loader = font_loader or (lambda size, bold: ImageFont.load_default())
+        self._memory: 'OrderedDict[str, Image.Image]' = OrderedDict()
+        self.hits = 0
+        self.renders = 0
+
+    # ---- 缓存 ----
+
+    def __len__(self) -> int:
+        """内存中缓存的素材数"""
+        return len(self._memory)
+
+    def _get(self, key: str, render: Callable[[], Image.Image]) -> Image.Image:
+        asset = self._memory.get(key)
+        if asset is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return asset
+
+        path = os.path.join(self.cache_dir, f"{key}.png")
+        try:
+            with Image.open(path) as cached:
+                asset = cached.convert('RGBA')
+            self.hits += 1
+        except (OSError, ValueError):
+            asset = render()
+            self.renders += 1
+            self._save(path, asset)
+
+        self._memory[key] = asset
+        if len(self._memory) > MAX_MEMORY_ITEMS:
+            self._memory.popitem(last=False)
+        return asset
+
+    def _save(self, path: str, asset: Image.Image):
+        """先写临时文件再替换，并发运行（或渲染服务的多个线程）不会读到半个文件"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            asset.save(tmp_path, 'PNG')
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ 素材缓存写入失败: {e}")
+
+    @staticmethod
+    def _key(kind: str, size: Tuple[int, int], radius: int, fill: Color, label: str = '',
+             font=None) -> str:
+        color = '%02x%02x%02x' % tuple(fill)
+        extra = ''
+        if label:
+            digest = hashlib.sha1(f"{label}|{_font_id(font)}".encode('utf-8')).hexdigest()[:10]
+            extra = f"_{digest}"
+        return f"v{ATLAS_VERSION}_{kind}_{size[0]}x{size[1]}_r{radius}_{color}{extra}"
+
+    # ---- 绘制 ----
+
+    @staticmethod
+    def _mask(size: Tuple[int, int], radius: int) -> Image.Image:
+        """超采样绘制圆角矩形蒙版（radius为短边一半时即为圆/胶囊形）"""
+        w, h = size
+        big = Image.new('L', (w * SUPERSAMPLE, h * SUPERSAMPLE), 0)
+        ImageDraw.Draw(big).rounded_rectangle(
+            [0, 0, w * SUPERSAMPLE - 1, h * SUPERSAMPLE - 1],
+            radius=radius * SUPERSAMPLE, fill=255)
+        return big.resize((w, h), Image.LANCZOS)
+
+    def _shape(self, size: Tuple[int, int], radius: int, fill: Color,
+               label: str = '', font=None, text_fill: Color = (255, 255, 255)) -> Image.Image:
+        asset = Image.new('RGBA', size, tuple(fill) + (0,))
+        asset.putalpha(self._mask(size, radius))
+        if label:
+            # 文字在缩小后的素材上绘制，字形本身已由FreeType抗锯齿
+            ImageDraw.Draw(asset).text((size[0] / 2, size[1] / 2), label,
+                                       fill=text_fill, font=font, anchor='mm')
+        return asset
+
+    def rounded_rect(self, size: Tuple[int, int], radius: int, fill: Color) -> Image.Image:
+        """圆角卡片背景"""
+        key = self._key('card', size, radius, fill)
+        return self._get(key, lambda: self._shape(size, radius, fill))
+
+    def badge(self, label: str, size: Tuple[int, int], radius: int, fill: Color,
+              font_size: int) -> Image.Image:
+        """类别标签（带白色文字的圆角色块）"""
+        font = self.font_loader(font_size, False)
+        key = self._key('badge', size, radius, fill, label, font)
+        return self._get(key, lambda: self._shape(size, radius, fill, label, font))
+
+    def number_circle(self, number: int, diameter: int, fill: Color,
+                      font_size: int) -> Image.Image:
+        """序号圆圈"""
+        font = self.font_loader(font_size, True)
+        size = (diameter, diameter)
+        key = self._key('number', size, diameter // 2, fill, str(number), font)
+        return self._get(key, lambda: self._shape(size, diameter // 2, fill, str(number), font))
+
+    @staticmethod
+    def paste(img: Image.Image, asset: Image.Image, xy: Tuple[int, int]):
+        """以素材自身的alpha为蒙版合成到页面上"""
+        img.paste(asset, (int(xy[0]), int(xy[1])), asset)
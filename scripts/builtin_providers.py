@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+内置新闻源
+- NewsAPI (https://newsapi.org/) - 免费100请求/天
+- GNews (https://gnews.io/) - 免费100请求/天，每次最多10条
+- 天行数据 (https://www.tianapi.com/apiview/10) - 中文科技新闻，免费100次/天
+- RSS/Atom - TECH_NEWS_RSS_FEEDS中配置的订阅源（逗号分隔），无需密钥
+
+注册顺序即默认优先级（健康度路由会在此基础上重新排序）
+"""
+
+import os
+import random
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from html import unescape
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from news_item import NewsItem
+from provider_sdk import NewsProvider, ProviderError, ProviderRequest, register_provider
+from rate_limiter import PROVIDER_ENV_KEYS
+
+
+def _newsapi_style_item(article: Dict, provider: str) -> NewsItem:
+    """NewsAPI与GNews的文章格式相同"""
+    return NewsItem(
+        title=article.get('title') or '',
+        summary=(article.get('description') or (article.get('content') or '')[:150])[:150],
+        source=(article.get('source') or {}).get('name') or 'Unknown',
+        category='',
+        hot_score=random.randint(70, 98),
+        url=article.get('url') or '',
+        published_at=article.get('publishedAt') or '',
+        from_api=provider,
+        # NewsAPI为urlToImage，GNews为image
+        image_url=article.get('urlToImage') or article.get('image') or '',
+    )
+
+
+@register_provider
+class NewsAPIProvider(NewsProvider):
+    name = 'NewsAPI'
+    env_key = PROVIDER_ENV_KEYS['NewsAPI']
+    default_query = 'technology AI'
+    supports_since = True
+    max_page_size = 100
+    base_url = "https://newsapi.org/v2"
+
+    def page_requests(self, query, num_results, since):
+        # 免费版只能获取1天内的新闻
+        yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+        params = {
+            'q': query,
+            'from': f"{since}Z" if since else yesterday,
+            'sortBy': 'publishedAt',
+            'language': 'en',
+            'pageSize': min(num_results, self.max_page_size),
+        }
+        # 超过一页时翻页（批量获取）；Hub在某页不满或已收够时停止
+        pages = -(-num_results // self.max_page_size)
+        for page in range(1, pages + 1):
+            # 密钥放在请求头中，不会出现在URL和日志里
+            yield ProviderRequest(f"{self.base_url}/everything",
+                                  params=dict(params, page=page) if page > 1 else params,
+                                  headers={'X-Api-Key': self.api_key})
+
+    items_key = 'articles'
+
+    def check(self, meta):
+        if meta.get('status') != 'ok':
+            raise ProviderError(meta.get('message', 'Unknown error'),
+                                quota_exhausted=meta.get('code') == 'rateLimited')
+
+    def normalize(self, raw):
+        return _newsapi_style_item(raw, self.name)
+
+
+@register_provider
+class GNewsProvider(NewsProvider):
+    name = 'GNews'
+    env_key = PROVIDER_ENV_KEYS['GNews']
+    default_query = 'technology'
+    supports_since = True
+    max_page_size = 10  # 免费版每次最多10条
+    base_url = "https://gnews.io/api/v4"
+
+    def page_requests(self, query, num_results, since):
+        params = {
+            'q': query,
+            'lang': 'en',
+            'max': min(num_results, self.max_page_size),
+            'apikey': self.api_key,
+        }
+        if since:
+            params['from'] = f"{since}Z"
+        yield ProviderRequest(f"{self.base_url}/search", params=params)
+
+    items_key = 'articles'
+
+    def check(self, meta):
+        if meta.get('errors'):
+            raise ProviderError('; '.join(map(str, meta['errors'])))
+
+    def normalize(self, raw):
+        return _newsapi_style_item(raw, self.name)
+
+
+@register_provider
+class TianXingProvider(NewsProvider):
+    name = 'TianXing'
+    label = '天行数据API'
+    env_key = PROVIDER_ENV_KEYS['TianXing']
+    language = 'zh'
+    default_query = ''
+    max_page_size = 20  # 最多20条
+    url = "http://api.tianapi.com/keji/index"
+
+    def page_requests(self, query, num_results, since):
+        # 不支持服务端时间过滤，由调用方按水位线在客户端过滤
+        yield ProviderRequest(self.url, params={'key': self.api_key,
+                                                'num': min(num_results, self.max_page_size)})
+
+    items_key = 'newslist'
+
+    def check(self, meta):
+        if meta.get('code') != 200:
+            raise ProviderError(meta.get('msg', 'Unknown'))
+
+    def normalize(self, raw):
+        title = raw.get('title') or ''
+        return NewsItem(
+            title=title,
+            summary=raw.get('description') or title[:80] + '...',
+            source=raw.get('source') or '科技资讯',
+            category='',
+            hot_score=random.randint(70, 95),
+            url=raw.get('url') or '',
+            published_at=raw.get('ctime') or '',
+            from_api=self.name,
+            image_url=raw.get('picUrl') or '',
+        )
+
+
+# ---- RSS / Atom ----
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _strip_html(text: str) -> str:
+    return _SPACE_RE.sub(' ', unescape(_TAG_RE.sub(' ', text or ''))).strip()
+
+
+def _iso_date(value: str) -> str:
+    """RFC 822（RSS）或ISO 8601（Atom）时间 -> UTC ISO格式，与其他API一致"""
+    value = (value or '').strip()
+    if not value:
+        return ''
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return value
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class FeedParser:
+    """
+    增量RSS/Atom解析器
+
+    边下载边解析，每个<item>/<entry>结束时立即产出并释放其元素，
+    内存占用与订阅源大小无关
+    """
+
+    def __init__(self, feed_url: str):
+        self.feed_url = feed_url
+        self.feed_title = ''
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._stack: List[str] = []
+
+    def _events(self) -> Iterator[Dict]:
+        for event, elem in self._parser.read_events():
+            tag = _local(elem.tag)
+            if event == 'start':
+                self._stack.append(tag)
+                continue
+            self._stack.pop()
+            parent = self._stack[-1] if self._stack else ''
+            if tag == 'title' and parent in ('channel', 'feed'):
+                self.feed_title = _strip_html(elem.text or '')
+            elif tag in ('item', 'entry'):
+                yield self._entry(elem)
+                elem.clear()
+
+    def _entry(self, elem: ET.Element) -> Dict:
+        fields: Dict[str, str] = {}
+        for child in elem:
+            tag = _local(child.tag)
+            if tag in ('thumbnail', 'content', 'enclosure') and child.get('url'):
+                # media:thumbnail / media:content / <enclosure type="image/...">
+                kind = child.get('medium') or child.get('type') or ('image' if tag == 'thumbnail' else '')
+                if kind.startswith('image'):
+                    fields.setdefault('image', child.get('url'))
+            elif tag == 'link':
+                # Atom的链接在href属性中，优先rel=alternate
+                href = child.get('href')
+                if href is None:
+                    fields.setdefault('link', (child.text or '').strip())
+                elif child.get('rel', 'alternate') == 'alternate':
+                    fields.setdefault('link', href)
+            elif tag in ('description', 'summary', 'content', 'encoded'):
+                fields.setdefault('summary', child.text or '')
+            elif tag in ('pubDate', 'published', 'updated', 'date'):
+                fields.setdefault('published', child.text or '')
+            elif tag == 'title':
+                fields['title'] = child.text or ''
+        fields['source'] = self.feed_title or urlparse(self.feed_url).hostname or 'RSS'
+        return fields
+
+    def feed(self, chunk: bytes) -> List[Dict]:
+        try:
+            self._parser.feed(chunk)
+            return list(self._events())
+        except ET.ParseError as e:
+            raise ProviderError(f"订阅源格式错误: {e}")
+
+    def close(self) -> List[Dict]:
+        try:
+            self._parser.close()
+            return list(self._events())
+        except ET.ParseError as e:
+            raise ProviderError(f"订阅源格式错误: {e}")
+
+
+@register_provider
+class RSSProvider(NewsProvider):
+    name = 'RSS'
+    env_key = 'TECH_NEWS_RSS_FEEDS'
+    default_query = ''
+    parallel_pages = True  # 每个订阅源一个请求，互相独立
+    cache_ttl = 120
+
+    def __init__(self, api_key: Optional[str] = None, feeds: Optional[List[str]] = None):
+        super().__init__(api_key='')
+        if feeds is None:
+            feeds = [f.strip() for f in os.getenv('TECH_NEWS_RSS_FEEDS', '').split(',')]
+        self.feeds = [f for f in feeds if f]
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.feeds)
+
+    def page_requests(self, query, num_results, since):
+        for feed_url in self.feeds:
+            yield ProviderRequest(feed_url, headers={
+                'Accept': 'application/rss+xml, application/atom+xml, application/xml;q=0.9, */*;q=0.8'})
+
+    def new_parser(self, request):
+        return FeedParser(request.url)
+
+    def normalize(self, raw):
+        title = _strip_html(raw.get('title', ''))
+        summary = _strip_html(raw.get('summary', ''))
+        return NewsItem(
+            title=title,
+            summary=summary[:150] or title,
+            source=raw.get('source') or 'RSS',
+            category='',
+            hot_score=random.randint(65, 90),
+            url=(raw.get('link') or '').strip(),
+            published_at=_iso_date(raw.get('published', '')),
+            from_api=self.name,
+            image_url=(raw.get('image') or '').strip(),
+        )
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+新闻摘要提取模块
+并发抓取排名靠前新闻的原文页面，提取正文并生成适合卡片展示的抽取式摘要
+
+- 全局并发数有上限，所有请求共享一个连接池
+- 同一网站串行访问，且两次请求之间至少间隔一段时间（礼貌抓取）
+- HTML边下载边解析，正文够用后立即停止下载
+- 页面编码取自Content-Type响应头，没有时从页面开头的<meta charset>判断，默认UTF-8
+- 结果按URL缓存，同一篇文章不会重复抓取
+"""
+
+import asyncio
+import codecs
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from typing import Dict, List, Mapping, Optional
+from urllib.parse import urlsplit
+
+from archive_index import tokenize
+from http_client import AsyncHTTPClient, HTTPError
+from state_store import state_path
+
+# 卡片摘要长度（详情页每条摘要展示两行，约64个字符）
+CARD_SUMMARY_CHARS = 64
+
+# 正文最多收集的字符数，够用后停止下载
+MAX_TEXT_CHARS = 8000
+
+# 单个页面最多下载的字节数
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+
+# 抓取失败的缓存有效期（秒），过期后允许重试
+FAILURE_TTL = 6 * 3600
+
+_SKIP_TAGS = {'script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside',
+              'form', 'figure', 'figcaption', 'button', 'svg', 'iframe'}
+_BLOCK_TAGS = {'p', 'h2', 'h3', 'li', 'blockquote'}
+_VOID_TAGS = {'br', 'img', 'input', 'meta', 'link', 'hr', 'source', 'wbr', 'area', 'col', 'embed'}
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[。！？!?])|(?<=[.;])\s+')
+
+# 没有响应头编码时，在页面开头这么多字节内查找<meta charset>
+CHARSET_SNIFF_BYTES = 2048
+
+_HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+
+# 按浏览器的惯例把常见的旧编码名换成其超集
+_CHARSET_ALIASES = {'gb2312': 'gb18030', 'gbk': 'gb18030', 'x-gbk': 'gb18030',
+                    'iso-8859-1': 'cp1252', 'latin1': 'cp1252', 'ascii': 'cp1252', 'us-ascii': 'cp1252'}
+
+
+def normalize_charset(name: Optional[str]) -> Optional[str]:
+    """规范化编码名，Python不认识的编码返回None"""
+    if not name:
+        return None
+    name = name.strip().lower()
+    name = _CHARSET_ALIASES.get(name, name)
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+class PageDecoder:
+    """
+    增量解码页面字节
+
+    编码优先取Content-Type响应头；没有时先缓存开头CHARSET_SNIFF_BYTES字节，
+    从BOM或<meta charset>/<meta http-equiv>中判断，都没有时使用UTF-8
+    """
+
+    def __init__(self):
+        self.charset: Optional[str] = None
+        self._head = bytearray()
+        self._decoder = None
+
+    def set_headers(self, headers: Mapping[str, str]):
+        match = _HEADER_CHARSET.search(headers.get('Content-Type') or '')
+        self.charset = normalize_charset(match.group(1)) if match else None
+
+    def _start(self):
+        head = bytes(self._head)
+        if head.startswith(codecs.BOM_UTF8):
+            self.charset = 'utf-8-sig'
+        elif self.charset is None:
+            match = _META_CHARSET.search(head)
+            self.charset = normalize_charset(match.group(1).decode('ascii', 'ignore')) if match else None
+        self.charset = self.charset or 'utf-8'
+        self._decoder = codecs.getincrementaldecoder(self.charset)(errors='replace')
+        self._head = bytearray()
+        return self._decoder.decode(head)
+
+    def decode(self, chunk: bytes) -> str:
+        if self._decoder is not None:
+            return self._decoder.decode(chunk)
+        self._head += chunk
+        if self.charset is None and len(self._head) < CHARSET_SNIFF_BYTES:
+            return ''
+        return self._start()
+
+    def close(self) -> str:
+        text = self._start() if self._decoder is None else ''
+        return text + self._decoder.decode(b'', final=True)
+
+
+class ArticleTextExtractor(HTMLParser):
+    """
+    流式正文提取器
+
+    逐块feed()即可，收集<p>等正文块的文本，跳过脚本、导航、页脚等区域；
+    页面有<article>时只取其中的段落。同时记录og:description作为后备。
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.paragraphs: List[str] = []
+        self.article_paragraphs: List[str] = []
+        self.meta_description = ''
+        self._skip_depth = 0
+        self._article_depth = 0
+        self._block: Optional[List[str]] = None
+        self._chars = 0
+
+    @property
+    def done(self) -> bool:
+        """正文已足够，可以停止下载"""
+        return self._chars >= MAX_TEXT_CHARS
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_TAGS:
+            if tag == 'meta':
+                attrs = dict(attrs)
+                name = (attrs.get('property') or attrs.get('name') or '').lower()
+                if name in ('og:description', 'description') and not self.meta_description:
+                    self.meta_description = (attrs.get('content') or '').strip()
+            return
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == 'article':
+            self._article_depth += 1
+        elif tag in _BLOCK_TAGS and not self._skip_depth:
+            self._block = []
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == 'article':
+            self._article_depth = max(0, self._article_depth - 1)
+        elif tag in _BLOCK_TAGS and self._block is not None:
+            text = ' '.join(''.join(self._block).split())
+            self._block = None
+            # 过短的块多为按钮、标签或版权信息
+            if len(text) >= 20:
+                self.paragraphs.append(text)
+                if self._article_depth:
+                    self.article_paragraphs.append(text)
+                self._chars += len(text)
+
+    def handle_data(self, data):
+        if self._block is not None and not self._skip_depth:
+            self._block.append(data)
+
+    def text(self) -> str:
+        paragraphs = self.article_paragraphs or self.paragraphs
+        return '\n'.join(paragraphs)
+
+
+def _similarity(a: List[str], b: List[str]) -> float:
+    sa, sb = set(a), set(b)
+    if not sa or not sb:
+        return 0.0
+    return len(sa & sb) / len(sa | sb)
+
+
+def summarize(text: str, title: str = '', max_chars: int = CARD_SUMMARY_CHARS) -> str:
+    """
+    抽取式摘要
+
+    按词频给句子打分（靠前的句子略加分），按原文顺序选取得分最高的句子，
+    总长度不超过max_chars；与标题高度重复的句子会被跳过。
+    """
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if s and len(s.strip()) >= 8]
+    if not sentences:
+        return ''
+
+    sentence_tokens = [tokenize(s) for s in sentences]
+    freq: Dict[str, int] = {}
+    for tokens in sentence_tokens:
+        for t in tokens:
+            freq[t] = freq.get(t, 0) + 1
+
+    title_tokens = tokenize(title)
+    scored = []
+    for i, (sentence, tokens) in enumerate(zip(sentences, sentence_tokens)):
+        if not tokens or _similarity(tokens, title_tokens) > 0.6:
+            continue
+        score = sum(freq[t] for t in tokens) / len(tokens)
+        score *= 1.0 + 0.5 / (1 + i)  # 导语位置加分
+        scored.append((score, i, sentence))
+
+    chosen = []
+    length = 0
+    for score, i, sentence in sorted(scored, reverse=True):
+        if length + len(sentence) > max_chars:
+            continue
+        chosen.append((i, sentence))
+        length += len(sentence)
+
+    if not chosen and scored:
+        # 单句都超长时截断得分最高的一句
+        sentence = max(scored)[2]
+        return sentence[:max_chars - 1] + '…'
+    return ''.join(s if s[-1] in '。！？' else s + ' ' for _, s in sorted(chosen)).strip()
+
+
+class SummaryCache:
+    """按URL缓存的摘要结果（SQLite）"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or state_path('summaries.sqlite3')
+        with self._connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS summaries (
+                url TEXT PRIMARY KEY, summary TEXT, ok INTEGER, fetched_at REAL)''')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute('SELECT summary, ok, fetched_at FROM summaries WHERE url=?',
+                               (url,)).fetchone()
+        if not row:
+            return None
+        summary, ok, fetched_at = row
+        if not ok and time.time() - fetched_at > FAILURE_TTL:
+            return None
+        return {'summary': summary, 'ok': bool(ok)}
+
+    def put(self, url: str, summary: str, ok: bool):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)',
+                         (url, summary, int(ok), time.time()))
+
+
+class ArticleEnricher:
+    """并发抓取原文并替换新闻摘要"""
+
+    def __init__(self, max_concurrency: int = 6, per_host: int = 1,
+                 host_interval: float = 1.0, timeout: float = 10,
+                 max_chars: int = CARD_SUMMARY_CHARS,
+                 cache: Optional[SummaryCache] = None):
+        """
+        Args:
+            max_concurrency: 全局最大并发请求数
+            per_host: 同一网站最大并发数
+            host_interval: 同一网站两次请求的最小间隔（秒）
+            timeout: 单个页面超时（秒）
+            max_chars: 摘要最大长度
+        """
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.host_interval = host_interval
+        self.timeout = timeout
+        self.max_chars = max_chars
+        self.cache = cache or SummaryCache()
+
+        self._host_locks: Dict[str, asyncio.Semaphore] = {}
+        self._host_last: Dict[str, float] = {}
+
+    async def _polite(self, host: str):
+        """等待到该网站允许下一次请求的时间"""
+        wait = self._host_last.get(host, 0) + self.host_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._host_last[host] = time.monotonic()
+
+    async def fetch_summary(self, client: AsyncHTTPClient, url: str, title: str = '') -> str:
+        """抓取单篇文章并生成摘要（优先读缓存），失败返回空字符串"""
+        cached = self.cache.get(url)
+        if cached is not None:
+            return cached['summary'] if cached['ok'] else ''
+
+        host = urlsplit(url).netloc
+        lock = self._host_locks.setdefault(host, asyncio.Semaphore(self.per_host))
+        extractor = ArticleTextExtractor()
+        decoder = PageDecoder()
+        try:
+            async with lock:
+                await self._polite(host)
+                chunks = client.iter_chunks(url, max_bytes=MAX_PAGE_BYTES, on_headers=decoder.set_headers)
+                try:
+                    async for chunk in chunks:
+                        extractor.feed(decoder.decode(chunk))
+                        if extractor.done:
+                            break
+                finally:
+                    await chunks.aclose()
+            extractor.feed(decoder.close())
+            extractor.close()
+        except (HTTPError, asyncio.TimeoutError) as e:
+            print(f"⚠️ 原文抓取失败: {url} ({e})")
+            self.cache.put(url, '', ok=False)
+            return ''
+
+        summary = summarize(extractor.text(), title, self.max_chars) or \
+            summarize(extractor.meta_description, title, self.max_chars)
+        self.cache.put(url, summary, ok=bool(summary))
+        return summary
+
+    async def enrich_async(self, news_list: List, top_n: int = 6) -> int:
+        targets = [n for n in news_list[:top_n] if n.get('url')]
+        if not targets:
+            return 0
+
+        async with AsyncHTTPClient(max_connections=self.max_concurrency,
+                                   timeout=self.timeout,
+                                   headers={'Accept': 'text/html,application/xhtml+xml'}) as client:
+            summaries = await asyncio.gather(
+                *(asyncio.wait_for(self.fetch_summary(client, n['url'], n['title']),
+                                   self.timeout * 2) for n in targets),
+                return_exceptions=True)
+
+        updated = 0
+        for news, summary in zip(targets, summaries):
+            if isinstance(summary, str) and summary:
+                news['summary'] = summary
+                updated += 1
+        return updated
+
+    def enrich(self, news_list: List, top_n: int = 6) -> int:
+        """
+        为排名前top_n的新闻替换摘要（同步入口）
+
+        Returns:
+            成功更新摘要的新闻数
+        """
+        return asyncio.run(self.enrich_async(news_list, top_n))
+
+
+def is_enrichment_enabled() -> bool:
+    """是否开启原文摘要提取（TECH_NEWS_ENRICH，默认开启）"""
+    return os.getenv('TECH_NEWS_ENRICH', 'true').lower() != 'false'
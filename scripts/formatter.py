@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+文案格式化模块
+将新闻列表渲染为小红书文案（纯文本 / Markdown / HTML）
+
+- 模板在模块加载时预编译，渲染时只做填充
+- 所有输出格式在一次遍历中同时写入各自的缓冲区
+- 可直接传入已分好类的新闻，避免重复分类
+"""
+
+from datetime import datetime
+from html import escape
+from typing import List, Dict, Optional, Iterable
+
+SUPPORTED_FORMATS = ('text', 'markdown', 'html')
+
+# 今日热点条数 / 每个类别展示条数
+TOP_N = 5
+PER_CATEGORY = 2
+
+_SEPARATOR = "=" * 20
+
+_FOOTER_THOUGHT = "科技改变世界，每一天都有新的突破。保持关注，把握未来趋势！"
+_FOOTER_TAGS = ("#科技新闻 #AI #人工智能 #科技早报\n"
+                "#硅谷 #特斯拉 #OpenAI #谷歌 #微软")
+
+
+def _compile(templates: Dict[str, str]) -> Dict[str, callable]:
+    """预编译模板：绑定str.format，渲染时无需重复解析"""
+    return {name: template.format for name, template in templates.items()}
+
+
+# 各格式模板（键名在三种格式间保持一致）
+_TEMPLATES = {
+    'text': _compile({
+        'header': "▶ 全球科技早报 | {date}\n" + _SEPARATOR + "\n\n",
+        'top_header': "HOT 今日热点 TOP {n}\n\n",
+        'top_item': "{i}. {title}\n   {summary}...\n   热度: {hot_score}/100",
+        'top_source': " | 来源: {source}",
+        'top_end': "\n\n",
+        'section_end': _SEPARATOR + "\n\n",
+        'cat_header': "# {category}\n",
+        'cat_item': "• {title}\n",
+        'cat_end': "\n",
+        'footer': "今日思考\n" + _FOOTER_THOUGHT + "\n\n" + _FOOTER_TAGS,
+    }),
+    'markdown': _compile({
+        'header': "# 全球科技早报 | {date}\n\n",
+        'top_header': "## 今日热点 TOP {n}\n\n",
+        'top_item': "{i}. **{title}**  \n   {summary}...  \n   热度: {hot_score}/100",
+        'top_source': " | 来源: {source}",
+        'top_end': "\n\n",
+        'section_end': "---\n\n",
+        'cat_header': "### {category}\n\n",
+        'cat_item': "- {title}\n",
+        'cat_end': "\n",
+        'footer': "## 今日思考\n\n" + _FOOTER_THOUGHT + "\n\n" + _FOOTER_TAGS.replace("\n", "  \n"),
+    }),
+    'html': _compile({
+        'header': "<article class=\"tech-digest\">\n<h1>全球科技早报 | {date}</h1>\n",
+        'top_header': "<h2>今日热点 TOP {n}</h2>\n<ol>\n",
+        'top_item': "<li><strong>{title}</strong><p>{summary}...</p><p>热度: {hot_score}/100",
+        'top_source': " | 来源: {source}",
+        'top_end': "</p></li>\n",
+        'section_end': "</ol>\n",
+        'cat_header': "<h3>{category}</h3>\n<ul>\n",
+        'cat_item': "<li>{title}</li>\n",
+        'cat_end': "</ul>\n",
+        'footer': "<h2>今日思考</h2>\n<p>" + _FOOTER_THOUGHT + "</p>\n<p>"
+                  + _FOOTER_TAGS.replace("\n", "<br>") + "</p>\n</article>",
+    }),
+}
+
+
+def group_by_category(news_list: Iterable[Dict]) -> Dict[str, List[Dict]]:
+    """按类别分组新闻（保持首次出现的类别顺序）"""
+    categories = {}
+    for news in news_list:
+        categories.setdefault(news.get('category', '其他'), []).append(news)
+    return categories
+
+
+def render_digest(news_list: List[Dict],
+                  categories: Optional[Dict[str, List[Dict]]] = None,
+                  formats: Iterable[str] = ('text',),
+                  date: Optional[datetime] = None) -> Dict[str, str]:
+    """
+    一次遍历渲染多种格式的文案
+
+    Args:
+        news_list: 新闻列表（已按热度排序）
+        categories: 已分好类的新闻，为空时在遍历过程中顺带分组
+        formats: 需要输出的格式，可选 text / markdown / html
+        date: 文案日期，默认当天
+
+    Returns:
+        {格式名: 文案内容}
+    """
+    formats = tuple(formats)
+    for fmt in formats:
+        if fmt not in _TEMPLATES:
+            raise ValueError(f"不支持的格式: {fmt}（可选: {', '.join(SUPPORTED_FORMATS)}）")
+
+    today = (date or datetime.now()).strftime("%m月%d日")
+    # 每种格式一个列表缓冲区，最后统一join，避免字符串反复拼接
+    outputs = [(_TEMPLATES[fmt], fmt == 'html', []) for fmt in formats]
+
+    for tpl, _, buf in outputs:
+        buf.append(tpl['header'](date=today))
+        buf.append(tpl['top_header'](n=TOP_N))
+
+    grouped = {} if categories is None else None
+    for i, news in enumerate(news_list, 1):
+        if grouped is not None:
+            grouped.setdefault(news.get('category', '其他'), []).append(news)
+        if i > TOP_N:
+            if grouped is None:
+                break
+            continue
+
+        title = news['title']
+        summary = news['summary'][:50]
+        source = news.get('from_api')
+        for tpl, is_html, buf in outputs:
+            if is_html:
+                buf.append(tpl['top_item'](i=i, title=escape(title), summary=escape(summary),
+                                           hot_score=news['hot_score']))
+                if source:
+                    buf.append(tpl['top_source'](source=escape(source)))
+            else:
+                buf.append(tpl['top_item'](i=i, title=title, summary=summary,
+                                           hot_score=news['hot_score']))
+                if source:
+                    buf.append(tpl['top_source'](source=source))
+            buf.append(tpl['top_end']())
+
+    for tpl, _, buf in outputs:
+        buf.append(tpl['section_end']())
+
+    for cat, items in (categories if grouped is None else grouped).items():
+        for tpl, is_html, buf in outputs:
+            buf.append(tpl['cat_header'](category=escape(cat) if is_html else cat))
+            for item in items[:PER_CATEGORY]:
+                buf.append(tpl['cat_item'](title=escape(item['title']) if is_html else item['title']))
+            buf.append(tpl['cat_end']())
+
+    for tpl, is_html, buf in outputs:
+        if not is_html:
+            buf.append(tpl['section_end']())
+        buf.append(tpl['footer']())
+
+    return {fmt: ''.join(buf) for fmt, (_, _, buf) in zip(formats, outputs)}
+
+
+def format_for_xiaohongshu(news_list: List[Dict],
+                           categories: Optional[Dict[str, List[Dict]]] = None,
+                           date: Optional[datetime] = None) -> str:
+    """格式化为小红书风格文案（纯文本）"""
+    return render_digest(news_list, categories, formats=('text',), date=date)['text']
@@ -7,8 +7,13 @@ Get笔记发送模块
 import requests
 import json
 import os
+import shutil
+import time
 from datetime import datetime
-from typing import List, Dict
+from typing import Iterable, List, Dict, Optional
+
+from run_context import publish_lock
+from telemetry import record_delivery
 
 class GetNoteSender:
     def __init__(self, api_key: str = None):
@@ -109,7 +114,8 @@ class GetNoteSender:
             }
     
     def save_note_locally(self, title: str, content: str, 
-                         images: List[str], output_dir: str = None) -> str:
+                         images: List[str], output_dir: str = None,
+                         note_name: Optional[str] = None) -> str:
         """
         将笔记保存到本地，用户可以手动导入Get笔记
         
@@ -118,6 +124,7 @@ class GetNoteSender:
             content: 笔记内容
             images: 图片路径列表
             output_dir: 输出目录
+            note_name: 笔记目录名（日报传入运行ID，同一天的多次运行互不覆盖），默认为当天日期（YYYYMMDD）
             
         Returns:
             保存的文件路径
@@ -125,8 +132,9 @@ class GetNoteSender:
         if output_dir is None:
             output_dir = "/mnt/okcomputer/output/tech-news-automation/output"
         
-        # 创建笔记目录
-        note_dir = os.path.join(output_dir, datetime.now().strftime("%Y%m%d"))
+        # 先写到临时目录，写完后整体替换同名笔记目录（重跑时不会混入两次运行的文件）
+        final_dir = os.path.join(output_dir, note_name or datetime.now().strftime("%Y%m%d"))
+        note_dir = f"{final_dir}.{os.getpid()}.tmp"
         os.makedirs(note_dir, exist_ok=True)
         
         # 保存文本内容
@@ -138,7 +146,6 @@ class GetNoteSender:
             f.write(content)
         
         # 复制图片
-        import shutil
         image_list = []
         for i, img_path in enumerate(images):
             if os.path.exists(img_path):
@@ -162,9 +169,20 @@ class GetNoteSender:
             for img in image_list:
                 f.write(f"  - {os.path.basename(img)}\n")
         
-        return note_dir
+        with publish_lock(output_dir):
+            if os.path.exists(final_dir):
+                old_dir = f"{final_dir}.{os.getpid()}.old"
+                os.rename(final_dir, old_dir)
+                os.rename(note_dir, final_dir)
+                shutil.rmtree(old_dir, ignore_errors=True)
+            else:
+                os.rename(note_dir, final_dir)
+        
+        return final_dir
     
-    def send_note(self, title: str, content: str, images: List[str] = None) -> Dict:
+    def send_note(self, title: str, content: str, images: List[str] = None,
+                  output_dir: Optional[str] = None, note_name: Optional[str] = None,
+                  published: Iterable[str] = ()) -> Dict:
         """
         发送笔记到Get笔记（主入口）
         
@@ -175,16 +193,24 @@ class GetNoteSender:
         3. 保存到本地后手动导入
         
         本方法默认使用本地保存方式，确保内容不会丢失
+        
+        Args:
+            published: 笔记中新闻的发布时间，用于统计发布到送达的延迟
         """
+        start = time.time()
         
         # 首先尝试Webhook方式
         if os.getenv('GETNOTE_WEBHOOK_URL'):
             result = self.create_note_via_webhook(title, content, images)
+            record_delivery('webhook', result['success'], time.time() - start,
+                            published if result['success'] else ())
             if result['success']:
                 return result
         
         # 回退到本地保存方式
-        note_dir = self.save_note_locally(title, content, images)
+        start = time.time()
+        note_dir = self.save_note_locally(title, content, images or [], output_dir, note_name)
+        record_delivery('local_save', True, time.time() - start, published)
         
         return {
             'success': True,
@@ -195,7 +221,10 @@ class GetNoteSender:
         }
 
 def send_daily_tech_news(news_list: List[Dict], images: List[str], 
-                         api_key: str = None) -> Dict:
+                         api_key: str = None,
+                         categories: Dict[str, List[Dict]] = None,
+                         output_dir: Optional[str] = None,
+                         note_name: Optional[str] = None) -> Dict:
     """
     发送每日科技新闻到Get笔记
     
@@ -203,15 +232,17 @@ def send_daily_tech_news(news_list: List[Dict], images: List[str],
         news_list: 新闻列表
         images: 生成的图片路径列表
         api_key: Get笔记API密钥
+        categories: 已分好类的新闻（可选，避免重复分类）
+        output_dir: 本地笔记的输出目录（可选）
+        note_name: 本地笔记目录名（可选，传入运行ID）
         
     Returns:
         发送结果
     """
-    from news_fetcher import TechNewsFetcher
+    from formatter import format_for_xiaohongshu
     
     # 格式化内容
-    fetcher = TechNewsFetcher()
-    content = fetcher.format_for_xiaohongshu(news_list)
+    content = format_for_xiaohongshu(news_list, categories)
     
     # 生成标题
     today = datetime.now().strftime("%m月%d日")
@@ -219,7 +250,8 @@ def send_daily_tech_news(news_list: List[Dict], images: List[str],
     
     # 发送笔记
     sender = GetNoteSender(api_key)
-    result = sender.send_note(title, content, images)
+    result = sender.send_note(title, content, images, output_dir, note_name=note_name,
+                              published=[n.get('published_at') or '' for n in news_list])
     
     return result
 
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+进程内异步HTTP客户端
+为新闻获取等网络请求提供共享连接池，替代逐请求启动curl子进程
+
+- 安装了aiohttp时使用原生异步连接池
+- 否则回退到requests.Session连接池 + 有界线程池
+- 响应体按块读取，直接从字节解码JSON，并可限制最大体积
+"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Mapping, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:  # 可选依赖
+    aiohttp = None
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'tech-news-automation/1.0',
+    'Accept': 'application/json, text/html;q=0.9, */*;q=0.8',
+}
+
+CHUNK_SIZE = 64 * 1024
+
+
+class HTTPError(Exception):
+    """HTTP请求失败（状态码异常、超时或响应过大）"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class AsyncHTTPClient:
+    """带连接池的异步HTTP客户端，可被多个并发请求共享"""
+
+    def __init__(self, max_connections: int = 10, timeout: float = 30,
+                 max_body_bytes: int = 20 * 1024 * 1024,
+                 headers: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            max_connections: 连接池大小（同时也是最大并发请求数）
+            timeout: 单个请求超时（秒）
+            max_body_bytes: 响应体最大字节数，超出则中止读取
+            headers: 附加的默认请求头
+        """
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_body_bytes = max_body_bytes
+        self.headers = dict(DEFAULT_HEADERS, **(headers or {}))
+
+        self._session = None
+        self._executor = None
+
+    @property
+    def backend(self) -> str:
+        return 'aiohttp' if aiohttp is not None else 'requests'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _ensure_session(self):
+        if self._session is not None:
+            return
+        if aiohttp is not None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+        else:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.max_connections,
+                                  pool_maxsize=self.max_connections)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(self.headers)
+            self._session = session
+            self._executor = ThreadPoolExecutor(max_workers=self.max_connections,
+                                                thread_name_prefix='http-client')
+
+    async def close(self):
+        """关闭连接池"""
+        if self._session is None:
+            return
+        if aiohttp is not None:
+            await self._session.close()
+        else:
+            self._session.close()
+            self._executor.shutdown(wait=False)
+        self._session = None
+        self._executor = None
+
+    async def iter_chunks(self, url: str, params: Optional[Dict[str, Any]] = None,
+                          headers: Optional[Dict[str, str]] = None,
+                          max_bytes: Optional[int] = None,
+                          on_headers: Optional[Callable[[Mapping[str, str]], None]] = None
+                          ) -> AsyncIterator[bytes]:
+        """
+        GET请求并逐块产出响应体，调用方可以边下载边解析
+
+        超过max_bytes时抛出HTTPError；提前退出迭代会立即释放连接。
+        on_headers在读取响应体之前以响应头调用（键不区分大小写），如用于取Content-Type中的编码
+        """
+        self._ensure_session()
+        limit = max_bytes or self.max_body_bytes
+        received = 0
+
+        if aiohttp is not None:
+            try:
+                async with self._session.get(url, params=params, headers=headers) as resp:
+                    if resp.status >= 400:
+                        raise HTTPError(f"HTTP {resp.status}: {url}", resp.status)
+                    if on_headers is not None:
+                        on_headers(resp.headers)
+                    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                        received += len(chunk)
+                        if received > limit:
+                            raise HTTPError(f"响应超过{limit}字节: {url}")
+                        yield chunk
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise HTTPError(f"{type(e).__name__}: {e}") from e
+            return
+
+        loop = asyncio.get_running_loop()
+        resp = await loop.run_in_executor(self._executor, self._open_sync, url, params, headers)
+        try:
+            if on_headers is not None:
+                on_headers(resp.headers)
+            chunks = resp.iter_content(CHUNK_SIZE)
+            while True:
+                chunk = await loop.run_in_executor(self._executor, self._next_chunk, chunks)
+                if chunk is None:
+                    break
+                received += len(chunk)
+                if received > limit:
+                    raise HTTPError(f"响应超过{limit}字节: {url}")
+                yield chunk
+        finally:
+            resp.close()
+
+    def _open_sync(self, url, params, headers) -> requests.Response:
+        try:
+            resp = self._session.get(url, params=params, headers=headers,
+                                     timeout=self.timeout, stream=True)
+        except requests.exceptions.RequestException as e:
+            raise HTTPError(f"{type(e).__name__}: {e}") from e
+        if resp.status_code >= 400:
+            resp.close()
+            raise HTTPError(f"HTTP {resp.status_code}: {url}", resp.status_code)
+        return resp
+
+    @staticmethod
+    def _next_chunk(chunks) -> Optional[bytes]:
+        try:
+            return next(chunks)
+        except StopIteration:
+            return None
+        except requests.exceptions.RequestException as e:
+            raise HTTPError(f"{type(e).__name__}: {e}") from e
+
+    async def get_bytes(self, url: str, params: Optional[Dict[str, Any]] = None,
+                        headers: Optional[Dict[str, str]] = None,
+                        max_bytes: Optional[int] = None) -> bytes:
+        """GET请求并按块读取完整响应体"""
+        body = bytearray()
+        async for chunk in self.iter_chunks(url, params=params, headers=headers,
+                                            max_bytes=max_bytes):
+            body += chunk
+        return bytes(body)
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None,
+                       headers: Optional[Dict[str, str]] = None) -> Any:
+        """GET请求并解码JSON（直接从字节解码，不经过整段文本）"""
+        body = await self.get_bytes(url, params=params, headers=headers)
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise HTTPError(f"JSON解析失败: {e}") from e
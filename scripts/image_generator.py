@@ -5,17 +5,64 @@
 """
 
 from PIL import Image, ImageDraw, ImageFont
+import io
+import json
 import os
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 import textwrap
 
+from asset_atlas import AssetAtlas
+from profiling import profiled
+from telemetry import timed
+from trends import describe_trend
+
+# 变体名称会出现在文件名中
+_VARIANT_NAME = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+
+
+def load_variants(path: str) -> List[Dict]:
+    """
+    读取变体定义文件（JSON列表），例如：
+        [{"name": "A"},
+         {"name": "six", "cover_cards": 6},
+         {"name": "teal", "colors": {"primary": "#4ECDC4", "category_colors": {"芯片": [0, 90, 200]}}}]
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        variants = json.load(f)
+    if not isinstance(variants, list):
+        raise ValueError("变体定义必须是JSON列表")
+    return variants
+
+
+def _parse_color(value) -> tuple:
+    """'#RRGGBB' 或 [r, g, b] -> (r, g, b)"""
+    if isinstance(value, str) and re.fullmatch(r'#[0-9A-Fa-f]{6}', value):
+        return tuple(int(value[i:i + 2], 16) for i in (1, 3, 5))
+    if isinstance(value, (list, tuple)) and len(value) == 3 and all(
+            isinstance(c, int) and 0 <= c <= 255 for c in value):
+        return tuple(value)
+    raise ValueError(f"颜色格式不正确: {value!r}（应为'#RRGGBB'或[r, g, b]）")
+
+
 class XiaohongshuImageGenerator:
     def __init__(self):
         self.width = 1080
         self.height = 1920
         self.output_dir = "/mnt/okcomputer/output/tech-news-automation/output"
         
+        # 性能分析器（StageProfiler），为空时不采集
+        self.profiler = None
+        
+        # 页面上显示的日期，为空时使用当前时间（重放快照时设为原运行的时间）
+        self.render_date: Optional[datetime] = None
+        
+        # 新闻配图下载器（thumbnails.ThumbnailFetcher），为空时卡片不带配图
+        self.thumbnails = None
+        
         # 小红书风格配色
         self.colors = {
             'bg_gradient_start': (255, 245, 250),  # 淡粉色
@@ -36,24 +83,116 @@ class XiaohongshuImageGenerator:
             }
         }
         
-    def create_gradient_background(self) -> Image:
-        """创建渐变背景"""
-        img = Image.new('RGB', (self.width, self.height))
-        draw = ImageDraw.Draw(img)
+        # 预渲染的卡片、标签、序号素材（抗锯齿，按尺寸和颜色缓存）
+        self.atlas = AssetAtlas(font_loader=self.get_font)
+        
+        # 已加载的字体和渲染好的渐变背景（按配色缓存，常驻的渲染服务中跨请求复用）
+        self._fonts = {}
+        self._gradients = {}
+    
+    # 类别标签规格：(尺寸, 圆角, 字号)
+    COVER_BADGE = ((100, 35), 15, 22)
+    DETAIL_BADGE = ((85, 30), 12, 20)
+    
+    # 详情页序号圆圈：(直径, 字号)
+    NUMBER_CIRCLE = (50, 28)
+    
+    # 卡片中配图的边长和圆角
+    COVER_THUMB = (110, 12)
+    DETAIL_THUMB = (130, 12)
+    
+    # 每页默认卡片数和上限（再多会超出画布）
+    DEFAULT_CARDS = {'cover': 4, 'detail': 6}
+    MAX_CARDS = {'cover': 8, 'detail': 8}
+    
+    def warm_assets(self, count: int = 6):
+        """预渲染所有类别标签和序号圆圈（已有磁盘缓存时只是读入内存）"""
+        categories = dict(self.colors['category_colors'], 科技=self.colors['primary'])
+        for name, color in categories.items():
+            for size, radius, font_size in (self.COVER_BADGE, self.DETAIL_BADGE):
+                self.atlas.badge(name, size, radius, color, font_size)
+        diameter, font_size = self.NUMBER_CIRCLE
+        for i in range(count):
+            color = self.colors['primary'] if i < 3 else self.colors['secondary']
+            self.atlas.number_circle(i + 1, diameter, color, font_size)
+    
+    def cache_sizes(self) -> Dict[str, int]:
+        """各内存缓存的条目数（常驻进程中应在预热后保持不变）"""
+        return {'fonts': len(self._fonts), 'gradients': len(self._gradients), 'assets': len(self.atlas)}
+    
+    def paste_card(self, img, xy, radius, fill):
+        """合成圆角卡片（xy与draw_rounded_rectangle相同，为左上和右下角坐标）"""
+        x1, y1, x2, y2 = xy
+        self.atlas.paste(img, self.atlas.rounded_rect((x2 - x1, y2 - y1), radius, fill), (x1, y1))
+    
+    def paste_badge(self, img, xy, label, color, spec):
+        """合成类别标签，xy为左上角"""
+        size, radius, font_size = spec
+        self.atlas.paste(img, self.atlas.badge(label, size, radius, color, font_size), xy)
+    
+    def paste_thumbnail(self, img, thumbnail: Image, xy, radius: int):
+        """以圆角蒙版合成新闻配图（蒙版复用卡片素材的alpha通道）"""
+        mask = self.atlas.rounded_rect(thumbnail.size, radius, self.colors['white']).getchannel('A')
+        img.paste(thumbnail, (int(xy[0]), int(xy[1])), mask)
+    
+    @staticmethod
+    def _fit_text(text: str, font, max_width: float, suffix: str = "...") -> str:
+        """按实际绘制宽度截断文字（给配图让出位置时使用）"""
+        if font.getlength(text) <= max_width:
+            return text
+        while text and font.getlength(text + suffix) > max_width:
+            text = text[:-1]
+        return text + suffix
+    
+    def prefetch_thumbnails(self, news_list: List[Dict], count: int) -> Optional[Future]:
+        """在后台开始下载前count条新闻的配图（未配置下载器或没有配图时返回None）"""
+        if self.thumbnails is None:
+            return None
+        urls = [news.get('image_url') for news in news_list[:count]]
+        urls = [url for url in urls if url]
+        return self.thumbnails.prefetch(urls) if urls else None
+    
+    def collect_thumbnails(self, future: Optional[Future]) -> Dict:
+        """等待配图下载完成，超时或出错时不带配图继续渲染"""
+        if future is None:
+            return {}
+        try:
+            return future.result(timeout=self.thumbnails.deadline)
+        except Exception as e:
+            print(f"⚠️ 新闻配图下载未完成，使用无配图版式: {e or '超时'}")
+            return {}
+    
+    def _card_thumbnail(self, news, thumbnails: Optional[Dict], size: int) -> Optional[Image]:
+        """取出新闻的配图并缩放到卡片中的尺寸"""
+        thumbnail = (thumbnails or {}).get(news.get('image_url') or '')
+        if thumbnail is None:
+            return None
+        if thumbnail.size != (size, size):
+            thumbnail = thumbnail.resize((size, size), Image.LANCZOS)
+        return thumbnail
         
-        for y in range(self.height):
-            r = int(self.colors['bg_gradient_start'][0] + 
-                   (self.colors['bg_gradient_end'][0] - self.colors['bg_gradient_start'][0]) * y / self.height)
-            g = int(self.colors['bg_gradient_start'][1] + 
-                   (self.colors['bg_gradient_end'][1] - self.colors['bg_gradient_start'][1]) * y / self.height)
-            b = int(self.colors['bg_gradient_start'][2] + 
-                   (self.colors['bg_gradient_end'][2] - self.colors['bg_gradient_start'][2]) * y / self.height)
-            draw.line([(0, y), (self.width, y)], fill=(r, g, b))
+    def create_gradient_background(self, colors: Optional[Dict] = None) -> Image:
+        """创建渐变背景（每种配色只计算一次，之后返回副本）"""
+        colors = colors or self.colors
+        start, end = colors['bg_gradient_start'], colors['bg_gradient_end']
+        gradient = self._gradients.get((start, end))
+        if gradient is None:
+            # 先画1像素宽的一列再横向拉伸，逐行颜色与整幅逐行绘制相同
+            column = Image.new('RGB', (1, self.height))
+            draw = ImageDraw.Draw(column)
+            
+            for y in range(self.height):
+                r = int(start[0] + (end[0] - start[0]) * y / self.height)
+                g = int(start[1] + (end[1] - start[1]) * y / self.height)
+                b = int(start[2] + (end[2] - start[2]) * y / self.height)
+                draw.point((0, y), fill=(r, g, b))
+            
+            gradient = self._gradients[(start, end)] = column.resize((self.width, self.height), Image.NEAREST)
         
-        return img
+        return gradient.copy()
     
     def draw_rounded_rectangle(self, draw, xy, radius, fill, outline=None):
-        """绘制圆角矩形"""
+        """绘制圆角矩形（无抗锯齿，页面已改用paste_card合成素材，保留供外部调用）"""
         x1, y1, x2, y2 = xy
         
         # 绘制主体矩形
@@ -67,7 +206,13 @@ class XiaohongshuImageGenerator:
         draw.ellipse([x2 - radius * 2, y2 - radius * 2, x2, y2], fill=fill)
     
     def get_font(self, size: int, bold: bool = False):
-        """获取字体"""
+        """获取字体（按字号缓存，避免每次绘制都重新加载字体文件）"""
+        font = self._fonts.get((size, bold))
+        if font is None:
+            font = self._fonts[(size, bold)] = self._load_font(size, bold)
+        return font
+    
+    def _load_font(self, size: int, bold: bool):
         try:
             # 使用系统Noto字体
             if bold:
@@ -125,162 +270,294 @@ class XiaohongshuImageGenerator:
             text = text.replace(emoji, replacement)
         return text
     
-    def generate_cover_image(self, news_list: List[Dict]) -> str:
+    def encode(self, img: Image, fmt: str = 'JPEG', quality: int = 95) -> bytes:
+        """把渲染好的页面编码为图片字节"""
+        buffer = io.BytesIO()
+        if fmt.upper() == 'PNG':
+            img.save(buffer, 'PNG')
+        else:
+            img.save(buffer, 'JPEG', quality=quality)
+        return buffer.getvalue()
+    
+    def _save(self, img: Image, filename: str, output_dir: Optional[str] = None) -> str:
+        """写入临时文件再rename，同一路径不会出现写了一半的图片"""
+        output_path = os.path.join(output_dir or self.output_dir, filename)
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        img.save(tmp_path, "JPEG", quality=95)
+        os.replace(tmp_path, output_path)
+        return output_path
+    
+    def generate_cover_image(self, news_list: List[Dict], output_dir: Optional[str] = None,
+                             thumbnails: Optional[Dict] = None) -> str:
         """生成封面图片"""
-        img = self.create_gradient_background()
+        return self._save(self.render_cover(news_list, thumbnails=thumbnails), "tech_news_cover.jpg", output_dir)
+    
+    def render_cover(self, news_list: List[Dict], cards: int = 4,
+                     thumbnails: Optional[Dict] = None) -> Image:
+        """渲染封面页（不保存）"""
+        return self.compose_cover(self.layout_cover(news_list, cards, thumbnails))
+    
+    def layout_cover(self, news_list: List[Dict], cards: int = 4,
+                     thumbnails: Optional[Dict] = None) -> Dict:
+        """
+        封面的排版与文字处理（与配色无关，多个变体共享同一份）
+        
+        Args:
+            thumbnails: {配图URL: 缩略图}，有配图的卡片右侧放配图，文字按剩余宽度截断
+        """
+        title_y = 80
+        card_y = title_y + 280
+        card_margin = 40
+        card_width = (self.width - card_margin * 3) // 2
+        
+        items = []
+        for i, news in enumerate(news_list[:cards]):
+            row = i // 2
+            col = i % 2
+            x = card_margin + col * (card_width + card_margin)
+            y = card_y + row * 320
+            card = {
+                'box': (x, y, x + card_width, y + 280),
+                'category': news.get('category', '科技'),
+                'hot': f"🔥{news['hot_score']}",
+                'title': news['title'][:18] + "..." if len(news['title']) > 18 else news['title'],
+                'summary': news['summary'][:35] + "...",
+                'source': f"📰 {news['source']}",
+            }
+            thumbnail = self._card_thumbnail(news, thumbnails, self.COVER_THUMB[0])
+            if thumbnail is not None:
+                size = self.COVER_THUMB[0]
+                text_width = card_width - 40 - size - 15
+                card['thumbnail'] = thumbnail
+                card['thumbnail_xy'] = (x + card_width - 20 - size, y + 80)
+                card['title'] = self._fit_text(news['title'], self.get_font(28, bold=True), text_width)
+                card['summary'] = self._fit_text(news['summary'], self.get_font(22), text_width)
+            items.append(card)
+        
+        return {
+            'title_y': title_y,
+            'title': self.replace_emoji_with_text("🚀 全球科技早报"),
+            'date': (self.render_date or datetime.now()).strftime("%Y年%m月%d日"),
+            'cards': items,
+            'tip': self.replace_emoji_with_text("👇 滑动查看更多科技资讯"),
+        }
+    
+    def compose_cover(self, layout: Dict, colors: Optional[Dict] = None,
+                      cards: Optional[int] = None) -> Image:
+        """
+        按排版结果合成封面
+        
+        Args:
+            layout: layout_cover的结果
+            colors: 配色，默认self.colors
+            cards: 只绘制前几张卡片（默认排版中的全部）
+        """
+        colors = colors or self.colors
+        img = self.create_gradient_background(colors)
         draw = ImageDraw.Draw(img)
         
         # 标题区域
-        title_y = 80
+        title_y = layout['title_y']
         
         # 绘制装饰元素
-        self.draw_rounded_rectangle(draw, [60, title_y, 1020, title_y + 200], 30, self.colors['white'])
+        self.paste_card(img, [60, title_y, 1020, title_y + 200], 30, colors['white'])
         
         # 主标题
         title_font = self.get_font(72, bold=True)
-        title_text = self.replace_emoji_with_text("🚀 全球科技早报")
-        draw.text((self.width//2, title_y + 60), title_text, 
-                 fill=self.colors['text_dark'], font=title_font, anchor="mm")
+        draw.text((self.width//2, title_y + 60), layout['title'], 
+                 fill=colors['text_dark'], font=title_font, anchor="mm")
         
         # 日期
         date_font = self.get_font(40)
-        today = datetime.now().strftime("%Y年%m月%d日")
-        draw.text((self.width//2, title_y + 140), today, 
-                 fill=self.colors['text_light'], font=date_font, anchor="mm")
+        draw.text((self.width//2, title_y + 140), layout['date'], 
+                 fill=colors['text_light'], font=date_font, anchor="mm")
         
         # 热门新闻卡片
-        card_y = title_y + 280
-        card_margin = 40
-        card_width = (self.width - card_margin * 3) // 2
+        hot_font = self.get_font(20)
+        card_title_font = self.get_font(28, bold=True)
+        summary_font = self.get_font(22)
+        source_font = self.get_font(20)
         
-        for i, news in enumerate(news_list[:4]):
-            row = i // 2
-            col = i % 2
-            x = card_margin + col * (card_width + card_margin)
-            y = card_y + row * 320
+        for card in layout['cards'][:cards]:
+            x, y, x2, y2 = card['box']
             
             # 卡片背景
-            self.draw_rounded_rectangle(draw, [x, y, x + card_width, y + 280], 20, self.colors['white'])
+            self.paste_card(img, [x, y, x2, y2], 20, colors['white'])
             
             # 类别标签
-            cat = news.get('category', '科技')
-            cat_color = self.colors['category_colors'].get(cat, self.colors['primary'])
-            self.draw_rounded_rectangle(draw, [x + 20, y + 20, x + 120, y + 55], 15, cat_color)
-            
-            cat_font = self.get_font(22)
-            draw.text((x + 70, y + 37), cat, fill=self.colors['white'], font=cat_font, anchor="mm")
+            cat_color = colors['category_colors'].get(card['category'], colors['primary'])
+            self.paste_badge(img, (x + 20, y + 20), card['category'], cat_color, self.COVER_BADGE)
             
             # 热度标识
-            hot_font = self.get_font(20)
-            draw.text((x + card_width - 20, y + 37), f"🔥{news['hot_score']}", 
-                     fill=self.colors['primary'], font=hot_font, anchor="rm")
+            draw.text((x2 - 20, y + 37), card['hot'], 
+                     fill=colors['primary'], font=hot_font, anchor="rm")
             
             # 标题
-            title_font = self.get_font(28, bold=True)
-            title_text = news['title'][:18] + "..." if len(news['title']) > 18 else news['title']
-            draw.text((x + 20, y + 80), title_text, fill=self.colors['text_dark'], font=title_font)
+            draw.text((x + 20, y + 80), card['title'], fill=colors['text_dark'], font=card_title_font)
             
             # 摘要
-            summary_font = self.get_font(22)
-            summary = news['summary'][:35] + "..."
-            draw.text((x + 20, y + 130), summary, fill=self.colors['text_light'], font=summary_font)
+            draw.text((x + 20, y + 130), card['summary'], fill=colors['text_light'], font=summary_font)
+            
+            # 配图
+            if card.get('thumbnail') is not None:
+                self.paste_thumbnail(img, card['thumbnail'], card['thumbnail_xy'], self.COVER_THUMB[1])
             
             # 来源
-            source_font = self.get_font(20)
-            draw.text((x + 20, y + 240), f"📰 {news['source']}", 
-                     fill=self.colors['text_light'], font=source_font)
+            draw.text((x + 20, y + 240), card['source'], 
+                     fill=colors['text_light'], font=source_font)
         
         # 底部提示
         bottom_y = self.height - 120
         tip_font = self.get_font(28)
-        tip_text = self.replace_emoji_with_text("👇 滑动查看更多科技资讯")
-        draw.text((self.width//2, bottom_y), tip_text, 
-                 fill=self.colors['text_light'], font=tip_font, anchor="mm")
+        draw.text((self.width//2, bottom_y), layout['tip'], 
+                 fill=colors['text_light'], font=tip_font, anchor="mm")
         
-        # 保存图片
-        output_path = os.path.join(self.output_dir, "tech_news_cover.jpg")
-        img.save(output_path, "JPEG", quality=95)
-        return output_path
+        return img
     
-    def generate_detail_image(self, news_list: List[Dict]) -> str:
+    def generate_detail_image(self, news_list: List[Dict], output_dir: Optional[str] = None,
+                              thumbnails: Optional[Dict] = None) -> str:
         """生成详情图片"""
-        img = self.create_gradient_background()
+        return self._save(self.render_detail(news_list, thumbnails=thumbnails), "tech_news_detail.jpg", output_dir)
+    
+    def render_detail(self, news_list: List[Dict], cards: int = 6,
+                      thumbnails: Optional[Dict] = None) -> Image:
+        """渲染详情页（不保存）"""
+        return self.compose_detail(self.layout_detail(news_list, cards, thumbnails))
+    
+    def layout_detail(self, news_list: List[Dict], cards: int = 6,
+                      thumbnails: Optional[Dict] = None) -> Dict:
+        """详情页的排版与文字处理（摘要折行等，与配色无关；thumbnails同layout_cover）"""
+        y_offset = 140
+        item_height = 200
+        margin = 40
+        card_x = margin + 70
+        card_width = self.width - card_x - margin
+        
+        items = []
+        for i, news in enumerate(news_list[:cards]):
+            card = {
+                'number': (margin, y_offset),
+                'box': (card_x, y_offset, card_x + card_width, y_offset + item_height),
+                'category': news.get('category', '科技'),
+                'hot': self.replace_emoji_with_text(f"🔥 {news['hot_score']}"),
+                'title': news['title'],
+                'summary': textwrap.wrap(news['summary'], width=32)[:2],
+                'source': self.replace_emoji_with_text(f"📰 {news['source']}"),
+            }
+            thumbnail = self._card_thumbnail(news, thumbnails, self.DETAIL_THUMB[0])
+            if thumbnail is not None:
+                size = self.DETAIL_THUMB[0]
+                text_width = card_width - 30 - size - 15
+                summary_font = self.get_font(24)
+                card['thumbnail'] = thumbnail
+                card['thumbnail_xy'] = (card_x + card_width - 15 - size, y_offset + 55)
+                card['title'] = self._fit_text(news['title'], self.get_font(30, bold=True), text_width)
+                card['summary'] = [self._fit_text(line, summary_font, text_width)
+                                   for line in textwrap.wrap(news['summary'], width=28)[:2]]
+            items.append(card)
+            y_offset += item_height + 20
+        
+        return {
+            'title': self.replace_emoji_with_text("📋 今日科技详情"),
+            'cards': items,
+        }
+    
+    def compose_detail(self, layout: Dict, colors: Optional[Dict] = None,
+                       cards: Optional[int] = None) -> Image:
+        """按排版结果合成详情页（参数同compose_cover）"""
+        colors = colors or self.colors
+        img = self.create_gradient_background(colors)
         draw = ImageDraw.Draw(img)
         
         # 标题
-        title_y = 60
         title_font = self.get_font(56, bold=True)
-        title_text = self.replace_emoji_with_text("📋 今日科技详情")
-        draw.text((self.width//2, title_y), title_text, 
-                 fill=self.colors['text_dark'], font=title_font, anchor="mm")
+        draw.text((self.width//2, 60), layout['title'], 
+                 fill=colors['text_dark'], font=title_font, anchor="mm")
         
         # 新闻列表
-        y_offset = 140
-        item_height = 200
-        margin = 40
+        hot_font = self.get_font(20)
+        card_title_font = self.get_font(30, bold=True)
+        summary_font = self.get_font(24)
+        source_font = self.get_font(20)
+        diameter, num_size = self.NUMBER_CIRCLE
         
-        for i, news in enumerate(news_list[:6]):
+        for i, card in enumerate(layout['cards'][:cards]):
             # 序号圆圈
-            num_color = self.colors['primary'] if i < 3 else self.colors['secondary']
-            draw.ellipse([margin, y_offset, margin + 50, y_offset + 50], fill=num_color)
-            
-            num_font = self.get_font(28, bold=True)
-            draw.text((margin + 25, y_offset + 25), str(i + 1), 
-                     fill=self.colors['white'], font=num_font, anchor="mm")
+            num_color = colors['primary'] if i < 3 else colors['secondary']
+            self.atlas.paste(img, self.atlas.number_circle(i + 1, diameter, num_color, num_size),
+                             card['number'])
             
             # 内容卡片
-            card_x = margin + 70
-            card_width = self.width - card_x - margin
-            self.draw_rounded_rectangle(draw, 
-                [card_x, y_offset, card_x + card_width, y_offset + item_height], 
-                15, self.colors['white'])
+            card_x, y_offset, card_x2, card_y2 = card['box']
+            self.paste_card(img, [card_x, y_offset, card_x2, card_y2], 15, colors['white'])
             
             # 类别标签
-            cat = news.get('category', '科技')
-            cat_color = self.colors['category_colors'].get(cat, self.colors['primary'])
-            self.draw_rounded_rectangle(draw, 
-                [card_x + 15, y_offset + 15, card_x + 100, y_offset + 45], 
-                12, cat_color)
-            
-            cat_font = self.get_font(20)
-            draw.text((card_x + 57, y_offset + 30), cat, 
-                     fill=self.colors['white'], font=cat_font, anchor="mm")
+            cat_color = colors['category_colors'].get(card['category'], colors['primary'])
+            self.paste_badge(img, (card_x + 15, y_offset + 15), card['category'], cat_color, self.DETAIL_BADGE)
             
             # 热度
-            hot_font = self.get_font(20)
-            hot_text = self.replace_emoji_with_text(f"🔥 {news['hot_score']}")
-            draw.text((card_x + card_width - 15, y_offset + 30), 
-                     hot_text, 
-                     fill=self.colors['primary'], font=hot_font, anchor="rm")
+            draw.text((card_x2 - 15, y_offset + 30), card['hot'], 
+                     fill=colors['primary'], font=hot_font, anchor="rm")
             
             # 标题
-            title_font = self.get_font(30, bold=True)
-            draw.text((card_x + 15, y_offset + 65), news['title'], 
-                     fill=self.colors['text_dark'], font=title_font)
+            draw.text((card_x + 15, y_offset + 65), card['title'], 
+                     fill=colors['text_dark'], font=card_title_font)
             
             # 摘要（多行）
-            summary_font = self.get_font(24)
-            summary_lines = textwrap.wrap(news['summary'], width=32)
-            for j, line in enumerate(summary_lines[:2]):
+            for j, line in enumerate(card['summary']):
                 draw.text((card_x + 15, y_offset + 110 + j * 35), line, 
-                         fill=self.colors['text_light'], font=summary_font)
+                         fill=colors['text_light'], font=summary_font)
             
-            # 来源
-            source_font = self.get_font(20)
-            source_text = self.replace_emoji_with_text(f"📰 {news['source']}")
-            draw.text((card_x + 15, y_offset + item_height - 30), 
-                     source_text, 
-                     fill=self.colors['text_light'], font=source_font)
+            # 配图
+            if card.get('thumbnail') is not None:
+                self.paste_thumbnail(img, card['thumbnail'], card['thumbnail_xy'], self.DETAIL_THUMB[1])
             
-            y_offset += item_height + 20
+            # 来源
+            draw.text((card_x + 15, card_y2 - 30), card['source'], 
+                     fill=colors['text_light'], font=source_font)
         
-        # 保存图片
-        output_path = os.path.join(self.output_dir, "tech_news_detail.jpg")
-        img.save(output_path, "JPEG", quality=95)
-        return output_path
+        return img
+    
+    # 趋势卡片标题前缀（emoji会在绘制前替换为文字符号）
+    TREND_ICONS = {
+        '人工智能': '🤖 AI革命',
+        '自动驾驶': '🚗 智能驾驶',
+        '芯片': '💻 芯片战争',
+        '硬件设备': '🥽 AR/VR',
+    }
+    
+    def _trend_cards(self, trends: Optional[Dict]) -> List[tuple]:
+        """把趋势快照转换为 (标题, 描述, 颜色) 卡片，没有数据时使用默认趋势"""
+        if not trends or not trends.get('categories'):
+            return [
+                (self.replace_emoji_with_text("🤖 AI革命"), "大模型能力持续突破，多模态成为标配", self.colors['category_colors']['人工智能']),
+                (self.replace_emoji_with_text("🚗 智能驾驶"), "自动驾驶技术加速落地，L4级即将商用", self.colors['category_colors']['自动驾驶']),
+                (self.replace_emoji_with_text("💻 芯片战争"), "AI芯片算力竞赛白热化，3nm成主流", self.colors['category_colors']['芯片']),
+                (self.replace_emoji_with_text("🥽 AR/VR"), "空间计算时代来临，头显设备轻量化", self.colors['category_colors']['硬件设备']),
+            ]
+        cards = []
+        for trend in trends['categories'][:4]:
+            name = trend['name']
+            title = self.replace_emoji_with_text(self.TREND_ICONS.get(name, f"📈 {name}"))
+            if trend['name'] in trends.get('bursts', []):
+                title += " ↑"
+            color = self.colors['category_colors'].get(name, self.colors['primary'])
+            cards.append((title, describe_trend(trend), color))
+        return cards
+    
+    def generate_summary_image(self, trends: Optional[Dict] = None,
+                               output_dir: Optional[str] = None) -> str:
+        """
+        生成总结图片
+        
+        Args:
+            trends: 趋势快照（TrendAnalyzer.snapshot()），为空时展示默认趋势
+            output_dir: 输出目录，默认self.output_dir
+        """
+        return self._save(self.render_summary(trends), "tech_news_summary.jpg", output_dir)
     
-    def generate_summary_image(self) -> str:
-        """生成总结图片"""
+    def render_summary(self, trends: Optional[Dict] = None) -> Image:
+        """渲染总结页（不保存）"""
         img = self.create_gradient_background()
         draw = ImageDraw.Draw(img)
         
@@ -295,21 +572,16 @@ class XiaohongshuImageGenerator:
         content_y = 250
         
         # 绘制趋势卡片
-        trends = [
-            (self.replace_emoji_with_text("🤖 AI革命"), "大模型能力持续突破，多模态成为标配", self.colors['category_colors']['人工智能']),
-            (self.replace_emoji_with_text("🚗 智能驾驶"), "自动驾驶技术加速落地，L4级即将商用", self.colors['category_colors']['自动驾驶']),
-            (self.replace_emoji_with_text("💻 芯片战争"), "AI芯片算力竞赛白热化，3nm成主流", self.colors['category_colors']['芯片']),
-            (self.replace_emoji_with_text("🥽 AR/VR"), "空间计算时代来临，头显设备轻量化", self.colors['category_colors']['硬件设备']),
-        ]
+        trend_cards = self._trend_cards(trends)
         
         card_height = 180
         card_margin = 50
         
-        for i, (title, desc, color) in enumerate(trends):
+        for i, (title, desc, color) in enumerate(trend_cards):
             y = content_y + i * (card_height + card_margin)
             
             # 卡片背景
-            self.draw_rounded_rectangle(draw, 
+            self.paste_card(img, 
                 [80, y, self.width - 80, y + card_height], 
                 25, self.colors['white'])
             
@@ -326,12 +598,16 @@ class XiaohongshuImageGenerator:
         
         # 底部语录
         quote_y = self.height - 200
-        self.draw_rounded_rectangle(draw, [80, quote_y, self.width - 80, quote_y + 150], 20, 
-                                   (255, 250, 240))
+        self.paste_card(img, [80, quote_y, self.width - 80, quote_y + 150], 20, 
+                        (255, 250, 240))
         
         quote_font = self.get_font(32)
+        quote = "\"科技改变世界，创新引领未来\""
+        hot_entities = [e['name'] for e in (trends or {}).get('entities', []) if e['count'] > 0][:3]
+        if hot_entities:
+            quote = "今日焦点：" + " · ".join(hot_entities)
         draw.text((self.width//2, quote_y + 40), 
-                 "\"科技改变世界，创新引领未来\"", 
+                 quote, 
                  fill=self.colors['text_dark'], font=quote_font, anchor="mm")
         
         sub_font = self.get_font(24)
@@ -340,31 +616,236 @@ class XiaohongshuImageGenerator:
                  sub_text, 
                  fill=self.colors['text_light'], font=sub_font, anchor="mm")
         
-        # 保存图片
-        output_path = os.path.join(self.output_dir, "tech_news_summary.jpg")
-        img.save(output_path, "JPEG", quality=95)
-        return output_path
+        return img
+    
+    def render_breaking(self, news: Dict, sources: Optional[List[str]] = None) -> Image:
+        """
+        渲染单条突发新闻卡片（不保存）
+        
+        Args:
+            news: 突发新闻
+            sources: 报道该新闻的媒体（多家媒体同时报道时展示）
+        """
+        img = self.create_gradient_background()
+        draw = ImageDraw.Draw(img)
+        
+        # 顶部"突发"标签和时间
+        self.atlas.paste(img, self.atlas.badge("突发", (180, 64), 32, self.colors['primary'], 36), (60, 100))
+        time_font = self.get_font(32)
+        draw.text((self.width - 60, 132), (self.render_date or datetime.now()).strftime("%m月%d日 %H:%M"), 
+                 fill=self.colors['text_light'], font=time_font, anchor="rm")
+        
+        # 内容卡片
+        card_top = 220
+        card_bottom = 1500
+        self.paste_card(img, [60, card_top, self.width - 60, card_bottom], 30, self.colors['white'])
+        
+        cat = news.get('category', '科技')
+        cat_color = self.colors['category_colors'].get(cat, self.colors['primary'])
+        self.paste_badge(img, (100, card_top + 40), cat, cat_color, self.COVER_BADGE)
+        
+        hot_font = self.get_font(28)
+        hot_text = self.replace_emoji_with_text(f"🔥 {news.get('hot_score', 0)}")
+        draw.text((self.width - 100, card_top + 57), hot_text, 
+                 fill=self.colors['primary'], font=hot_font, anchor="rm")
+        
+        # 标题（最多4行，英文按字符数折行时每行可以放更多字符）
+        title_font = self.get_font(52, bold=True)
+        y = card_top + 130
+        for line in textwrap.wrap(news['title'], width=30 if news['title'].isascii() else 16)[:4]:
+            draw.text((100, y), line, fill=self.colors['text_dark'], font=title_font)
+            y += 76
+        
+        # 摘要（最多8行）
+        summary_font = self.get_font(34)
+        y += 40
+        summary = news.get('summary', '')
+        for line in textwrap.wrap(summary, width=44 if summary.isascii() else 24)[:8]:
+            draw.text((100, y), line, fill=self.colors['text_light'], font=summary_font)
+            y += 54
+        
+        # 来源
+        source_font = self.get_font(30)
+        sources = sources or [news.get('source', '')]
+        source_text = f"📰 {news.get('source', '')}" if len(sources) <= 1 else \
+            f"📰 {len(sources)}家媒体报道: " + "、".join(sources[:4])
+        draw.text((100, card_bottom - 80), self.replace_emoji_with_text(source_text), 
+                 fill=self.colors['text_light'], font=source_font)
+        
+        # 底部提示
+        tip_font = self.get_font(28)
+        tip_text = self.replace_emoji_with_text("📌 完整解读见明早科技早报")
+        draw.text((self.width//2, self.height - 200), tip_text, 
+                 fill=self.colors['text_light'], font=tip_font, anchor="mm")
+        
+        return img
+    
+    def generate_breaking_image(self, news: Dict, sources: Optional[List[str]] = None,
+                                output_dir: Optional[str] = None, filename: str = "breaking.jpg") -> str:
+        """生成突发新闻卡片"""
+        return self._save(self.render_breaking(news, sources), filename, output_dir)
+    
+    # ---- A/B变体 ----
+    
+    def variant_spec(self, variant: Dict) -> Dict:
+        """
+        校验变体定义，合并出完整配色，并记录与默认版式的差异
+        
+        Raises:
+            ValueError: 变体定义不合法
+        """
+        name = str(variant.get('name', ''))
+        if not _VARIANT_NAME.match(name):
+            raise ValueError(f"变体名称只能包含字母、数字、-和_: {name!r}")
+        
+        differs = {}
+        cards = {}
+        for page, default in self.DEFAULT_CARDS.items():
+            count = variant.get(f"{page}_cards", default)
+            if not isinstance(count, int) or not 1 <= count <= self.MAX_CARDS[page]:
+                raise ValueError(f"变体{name}: {page}_cards 应为1-{self.MAX_CARDS[page]}")
+            cards[page] = count
+            if count != default:
+                differs[f"{page}_cards"] = {'base': default, 'variant': count}
+        
+        colors = dict(self.colors, category_colors=dict(self.colors['category_colors']))
+        for key, value in (variant.get('colors') or {}).items():
+            if key == 'category_colors':
+                for category, color in value.items():
+                    colors['category_colors'][category] = _parse_color(color)
+            elif key in self.colors:
+                colors[key] = _parse_color(value)
+            else:
+                raise ValueError(f"变体{name}: 未知的颜色项 {key}")
+        for key, value in colors.items():
+            if key == 'category_colors':
+                for category, color in value.items():
+                    base = self.colors['category_colors'].get(category)
+                    if color != base:
+                        differs[f"colors.category_colors.{category}"] = {
+                            'base': list(base) if base else None, 'variant': list(color)}
+            elif value != self.colors[key]:
+                differs[f"colors.{key}"] = {'base': list(self.colors[key]), 'variant': list(value)}
+        
+        return {'name': name, 'cards': cards, 'colors': colors, 'differs': differs}
+    
+    def _write(self, img: Image, path: str, fmt: str, quality: int) -> str:
+        """编码并原子写入（在线程池中执行，Pillow编码时释放GIL）"""
+        data = self.encode(img, fmt, quality)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
     
-    def generate_all_images(self, news_list: List[Dict]) -> List[str]:
-        """生成所有图片"""
-        images = []
+    def render_variants(self, news_list: List[Dict], variants: List[Dict], output_dir: str,
+                        pages: tuple = ('cover', 'detail'), fmt: str = 'JPEG',
+                        quality: int = 95, workers: Optional[int] = None,
+                        thumbnails: Optional[Dict] = None) -> List[Dict]:
+        """
+        一次渲染多个版式变体
+        
+        所有变体共享同一次排版和文字处理、同一套字体/背景/卡片素材缓存，
+        只有最终合成按变体分别进行；合成好的页面交给线程池并行编码写盘，
+        与下一个变体的合成重叠。输出目录中写入variants.json记录每个变体的差异
+        
+        Args:
+            news_list: 新闻列表
+            variants: 变体定义（见load_variants）
+            output_dir: 输出目录
+            pages: 渲染的页面（cover / detail）
+            fmt: 'JPEG' 或 'PNG'
+            workers: 编码线程数，默认CPU核数
+            thumbnails: 新闻配图（见layout_cover），默认用self.thumbnails下载
+        
+        Returns:
+            每个变体的元数据 {'name', 'images': {页面: 路径}, 'cards', 'differs'}
+        """
+        specs = [self.variant_spec(v) for v in variants]
+        if thumbnails is None:
+            # 与generate_all_images下载的是同一批配图，此时都已在磁盘缓存中
+            thumbnails = self.collect_thumbnails(self.prefetch_thumbnails(
+                news_list, max(spec['cards'][page] for spec in specs for page in pages)))
+        names = [spec['name'] for spec in specs]
+        duplicated = sorted({n for n in names if names.count(n) > 1})
+        if duplicated:
+            raise ValueError(f"变体名称重复: {', '.join(duplicated)}")
+        
+        os.makedirs(output_dir, exist_ok=True)
+        ext = 'png' if fmt.upper() == 'PNG' else 'jpg'
+        layout_funcs = {'cover': self.layout_cover, 'detail': self.layout_detail}
+        compose_funcs = {'cover': self.compose_cover, 'detail': self.compose_detail}
+        
+        start = time.perf_counter()
+        with profiled(self.profiler, 'variant_layout'):
+            layouts = {page: layout_funcs[page](news_list, max(spec['cards'][page] for spec in specs),
+                                                thumbnails)
+                       for page in pages}
+        
+        results = []
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 2,
+                                thread_name_prefix='variant-encode') as pool:
+            for spec in specs:
+                images = {}
+                for page in pages:
+                    img = compose_funcs[page](layouts[page], spec['colors'], spec['cards'][page])
+                    path = os.path.join(output_dir, f"{page}_{spec['name']}.{ext}")
+                    images[page] = pool.submit(self._write, img, path, fmt, quality)
+                results.append((spec, images))
+            
+            metadata = [{
+                'name': spec['name'],
+                'images': {page: future.result() for page, future in images.items()},
+                'cards': {page: spec['cards'][page] for page in pages},
+                'differs': spec['differs'],
+            } for spec, images in results]
+        
+        manifest = {
+            'generated_at': datetime.now().isoformat(),
+            'pages': list(pages),
+            'render_ms': round((time.perf_counter() - start) * 1000, 1),
+            'variants': [dict(m, images={page: os.path.basename(p) for page, p in m['images'].items()})
+                         for m in metadata],
+        }
+        with open(os.path.join(output_dir, 'variants.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return metadata
+    
+    def generate_all_images(self, news_list: List[Dict], trends: Optional[Dict] = None,
+                            output_dir: Optional[str] = None) -> List[str]:
+        """
+        生成所有图片
+        
+        Args:
+            news_list: 新闻列表
+            trends: 趋势快照，用于总结页
+            output_dir: 输出目录（例如本次运行的工作目录），默认self.output_dir
+        """
+        # 配图在后台下载，与素材预热和总结页渲染重叠
+        pending = self.prefetch_thumbnails(news_list, max(self.DEFAULT_CARDS.values()))
+        
+        with profiled(self.profiler, 'warm_assets'):
+            self.warm_assets(min(len(news_list), 6))
+        
+        # 生成总结页（不需要配图，先渲染）
+        with profiled(self.profiler, 'render_summary'), timed('tech_news_render_seconds', page='summary'):
+            summary_path = self.generate_summary_image(trends, output_dir)
+        
+        with profiled(self.profiler, 'wait_thumbnails'):
+            thumbnails = self.collect_thumbnails(pending)
         
         # 生成封面
-        cover_path = self.generate_cover_image(news_list)
-        images.append(cover_path)
+        with profiled(self.profiler, 'render_cover'), timed('tech_news_render_seconds', page='cover'):
+            cover_path = self.generate_cover_image(news_list, output_dir, thumbnails)
         print(f"✅ 封面图片已生成: {cover_path}")
         
         # 生成详情页
-        detail_path = self.generate_detail_image(news_list)
-        images.append(detail_path)
+        with profiled(self.profiler, 'render_detail'), timed('tech_news_render_seconds', page='detail'):
+            detail_path = self.generate_detail_image(news_list, output_dir, thumbnails)
         print(f"✅ 详情图片已生成: {detail_path}")
-        
-        # 生成总结页
-        summary_path = self.generate_summary_image()
-        images.append(summary_path)
         print(f"✅ 总结图片已生成: {summary_path}")
         
-        return images
+        return [cover_path, detail_path, summary_path]
 
 if __name__ == "__main__":
     # 测试
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+流式JSON解析
+新闻API的响应通常是 {"status": ..., "articles": [{...}, {...}, ...]}，
+按块喂入响应体，每当数组中的一篇文章完整到达就立即解码产出，
+解析器只缓存当前这一篇文章（以及一个网络块），峰值内存与页大小无关
+
+顶层其他字段（status、code、message等）解码后保存在meta中，用于判断业务错误
+"""
+
+import codecs
+import json
+import re
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+_SKIP = re.compile(r'[ \t\r\n,]*')
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+_DELIMITERS = ' \t\r\n,]}'
+
+# 单个元素的上限：响应损坏时不会无限缓存
+MAX_ITEM_CHARS = 4 * 1024 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+class JSONStreamError(ValueError):
+    """响应不是合法的JSON，或在数组结束前中断"""
+
+
+class ArrayItemStream:
+    """
+    增量解析顶层对象中某个数组字段的元素
+
+    每个值用C实现的JSONDecoder.raw_decode从缓冲区原位解码；
+    块边界处不完整的元素留在缓冲区，等下一块到达后再解码
+
+    用法：
+        stream = ArrayItemStream('articles')
+        for chunk in chunks:
+            for article in stream.feed(chunk):
+                ...
+        stream.close()
+    """
+
+    def __init__(self, key: str, on_array_start: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Args:
+            key: 顶层对象中数组字段的名称
+            on_array_start: 数组开始时以meta调用（此时已解析数组之前的顶层字段，可提前判断错误）
+        """
+        self.key = key
+        self.on_array_start = on_array_start
+        self.meta: Dict[str, Any] = {}
+        self.items_seen = 0
+
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._state = 'start'   # start -> key -> colon -> value -> (array) -> ... -> done
+        self._current_key: Optional[str] = None
+
+    def _value(self, pos: int, final: bool):
+        """
+        解码pos处的一个值
+
+        Returns:
+            (值, 结束位置)；数据不完整时返回None
+        """
+        buf = self._buf
+        try:
+            value, end = _decoder.raw_decode(buf, pos)
+        except ValueError as e:
+            if final:
+                raise JSONStreamError(f"JSON解析失败: {e}") from e
+            if len(buf) - pos > MAX_ITEM_CHARS:
+                raise JSONStreamError(f"单个元素超过{MAX_ITEM_CHARS}字符: {e}") from e
+            return None
+        # 数字、true等后面没有分隔符时可能还没接收完整（如"-2"之后还有".5"）
+        if not final and buf[pos] not in '{["' and (end == len(buf) or buf[end] not in _DELIMITERS):
+            return None
+        return value, end
+
+    def _advance(self, final: bool = False) -> List[Any]:
+        items = []
+        pos = 0
+        buf = self._buf
+        try:
+            while True:
+                # 数组元素之间和对象成员之间的逗号直接跳过
+                skip = _SKIP if self._state in ('key', 'array') else _WHITESPACE
+                pos = skip.match(buf, pos).end()
+                if pos >= len(buf):
+                    return items
+                c = buf[pos]
+
+                if self._state == 'start':
+                    if c != '{':
+                        raise JSONStreamError("响应不是JSON对象")
+                    self._state = 'key'
+                    pos += 1
+                elif self._state == 'key':
+                    if c == '}':
+                        self._state = 'done'
+                        pos += 1
+                        continue
+                    if c != '"':
+                        raise JSONStreamError("JSON对象的键格式错误")
+                    decoded = self._value(pos, final)
+                    if decoded is None:
+                        return items
+                    self._current_key, pos = decoded
+                    self._state = 'colon'
+                elif self._state == 'colon':
+                    if c != ':':
+                        raise JSONStreamError("JSON对象缺少冒号")
+                    self._state = 'value'
+                    pos += 1
+                elif self._state == 'value':
+                    if self._current_key == self.key and c == '[':
+                        self._state = 'array'
+                        pos += 1
+                        if self.on_array_start is not None:
+                            self.on_array_start(self.meta)
+                        continue
+                    decoded = self._value(pos, final)
+                    if decoded is None:
+                        return items
+                    self.meta[self._current_key], pos = decoded
+                    self._state = 'key'
+                elif self._state == 'array':
+                    if c == ']':
+                        self._state = 'key'
+                        pos += 1
+                        continue
+                    decoded = self._value(pos, final)
+                    if decoded is None:
+                        return items
+                    items.append(decoded[0])
+                    pos = decoded[1]
+                    self.items_seen += 1
+                else:
+                    raise JSONStreamError("JSON对象之后还有多余内容")
+        finally:
+            # 只保留未解码的部分
+            self._buf = buf[pos:]
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """喂入一块响应体，返回已完整到达的数组元素"""
+        try:
+            self._buf += self._text.decode(chunk)
+        except UnicodeDecodeError as e:
+            raise JSONStreamError(f"响应不是合法的UTF-8: {e}") from e
+        return self._advance()
+
+    def close(self) -> List[Any]:
+        """响应体结束，返回剩余元素；JSON不完整时抛出JSONStreamError"""
+        try:
+            self._buf += self._text.decode(b'', final=True)
+        except UnicodeDecodeError as e:
+            raise JSONStreamError(f"响应不是合法的UTF-8: {e}") from e
+        items = self._advance(final=True)
+        if self._state != 'done':
+            raise JSONStreamError("响应在JSON结束前中断")
+        return items
+
+
+# ---- 基准测试 ----
+
+def synthetic_page(articles: int = 5000) -> bytes:
+    """生成NewsAPI格式的大页响应（没有录制的响应时用于基准测试）"""
+    page = {
+        'status': 'ok',
+        'totalResults': articles,
+        'articles': [{
+            'source': {'id': None, 'name': f"Source {i % 37}"},
+            'author': f"Author {i}",
+            'title': f"Tech company {i} announces new AI chip with {i % 9 + 2}nm process",
+            'description': "Detailed description of the announcement, " * 4,
+            'url': f"https://example.com/news/{i}",
+            'urlToImage': f"https://example.com/img/{i}.jpg",
+            'publishedAt': '2026-10-19T08:00:00Z',
+            'content': "Full article content with quotes \"like this\" and [brackets] {braces}. " * 8,
+        } for i in range(articles)],
+    }
+    return json.dumps(page, ensure_ascii=False).encode('utf-8')
+
+
+def _measure(func: Callable[[], int]) -> Dict[str, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'articles': count, 'ms': round(elapsed * 1000, 1), 'peak_kib': round(peak / 1024, 1)}
+
+
+def benchmark(body: bytes, key: str = 'articles', chunk_size: int = 64 * 1024) -> Dict[str, Dict]:
+    """
+    对比整页解码与流式解码
+
+    两种方式都模拟按块接收响应体：整页方式先拼接完整响应再json.loads，
+    流式方式边接收边产出文章，峰值内存只统计解析过程（不含原始响应本身）
+    """
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+
+    def buffered() -> int:
+        data = bytearray()
+        for chunk in chunks:
+            data += chunk
+        return sum(1 for _ in json.loads(data).get(key, []))
+
+    def streaming() -> int:
+        stream = ArrayItemStream(key)
+        count = 0
+        for chunk in chunks:
+            count += len(stream.feed(chunk))
+        return count + len(stream.close())
+
+    return {'buffered': _measure(buffered), 'streaming': _measure(streaming)}
+
+
+def print_benchmark(body: bytes, key: str = 'articles'):
+    results = benchmark(body, key)
+    print(f"⏱️ JSON解析基准（响应 {len(body) / 1024 / 1024:.1f} MiB）:")
+    for name, r in results.items():
+        print(f"   {name:<10} {r['articles']:>6} 篇  {r['ms']:>8.1f} ms  峰值内存 {r['peak_kib']:>10.1f} KiB")
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+新闻本地化模块
+NewsAPI、GNews返回英文标题，而卡片和小红书文案面向中文读者。
+本模块逐条检测标题和摘要的语言，把非中文内容翻译为中文：
+
+- 语言检测只统计字符类别，单条耗时微秒级
+- 翻译后端可插拔：本地离线模型（transformers的MarianMT，需自行安装）或测试用的stub
+- 译文按"后端 + 目标语言 + 原文"的哈希持久缓存，同一标题跨运行、跨版本只翻译一次
+- 同一次运行中重复的原文只翻译一次，未命中缓存的原文按批提交给后端
+
+通过 TECH_NEWS_TRANSLATOR 选择后端（marian / stub），留空则不翻译。
+"""
+
+import abc
+import hashlib
+import inspect
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Type
+
+from state_store import state_path
+
+_CJK = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+_LATIN = re.compile(r'[A-Za-z]')
+
+# 中文字符占文字字符的比例达到该值即视为中文（英文品牌名夹在中文标题中很常见）
+CJK_RATIO = 0.2
+
+DEFAULT_BATCH_SIZE = 16
+
+
+def detect_language(text: str) -> str:
+    """
+    检测文本语言
+
+    Returns:
+        'zh' / 'en'，没有文字字符时返回''
+    """
+    cjk = len(_CJK.findall(text or ''))
+    latin = len(_LATIN.findall(text or ''))
+    if not cjk and not latin:
+        return ''
+    # 一个汉字的信息量约等于一个英文单词，按单词长度折算拉丁字母
+    return 'zh' if cjk >= CJK_RATIO * (cjk + latin / 5) else 'en'
+
+
+# ---- 翻译后端 ----
+
+class TranslationBackend(abc.ABC):
+    """翻译后端基类：一次翻译一批文本"""
+
+    name = ''
+
+    @abc.abstractmethod
+    def translate_batch(self, texts: List[str], source: str, target: str) -> List[str]:
+        """按顺序返回与texts一一对应的译文"""
+
+
+_BACKENDS: Dict[str, Type[TranslationBackend]] = {}
+
+
+def register_backend(cls: Type[TranslationBackend]) -> Type[TranslationBackend]:
+    """
+    注册翻译后端（可作为类装饰器使用）
+
+    Raises:
+        TypeError: 后端没有实现全部抽象方法
+    """
+    if inspect.isabstract(cls):
+        raise TypeError(f"翻译后端 {cls.__name__} 未实现: {', '.join(sorted(cls.__abstractmethods__))}")
+    _BACKENDS[cls.name] = cls
+    return cls
+
+
+def create_backend(name: str) -> TranslationBackend:
+    """
+    Raises:
+        ValueError: 未知的后端名称
+    """
+    if name not in _BACKENDS:
+        raise ValueError(f"未知的翻译后端: {name}（可选: {', '.join(_BACKENDS)}）")
+    return _BACKENDS[name]()
+
+
+@register_backend
+class StubBackend(TranslationBackend):
+    """测试用后端：不做真实翻译，只在原文前加上目标语言标记"""
+
+    name = 'stub'
+
+    def __init__(self):
+        self.calls = 0
+
+    def translate_batch(self, texts, source, target):
+        self.calls += 1
+        return [f"[{target}] {text}" for text in texts]
+
+
+@register_backend
+class MarianBackend(TranslationBackend):
+    """
+    本地离线翻译模型（Helsinki-NLP的MarianMT，经transformers加载）
+
+    需要安装 transformers、sentencepiece 和 torch；模型名称可通过
+    TECH_NEWS_TRANSLATOR_MODEL 修改，首次使用时下载并缓存到本地
+    """
+
+    name = 'marian'
+    default_model = 'Helsinki-NLP/opus-mt-en-zh'
+
+    def __init__(self, model_name: Optional[str] = None):
+        try:
+            from transformers import MarianMTModel, MarianTokenizer
+        except ImportError as e:
+            raise RuntimeError("使用marian翻译后端需要安装transformers、sentencepiece和torch") from e
+        model_name = model_name or os.getenv('TECH_NEWS_TRANSLATOR_MODEL', self.default_model)
+        self.tokenizer = MarianTokenizer.from_pretrained(model_name)
+        self.model = MarianMTModel.from_pretrained(model_name)
+
+    def translate_batch(self, texts, source, target):
+        # 整批一次前向推理，比逐条翻译快得多
+        inputs = self.tokenizer(texts, return_tensors='pt', padding=True, truncation=True)
+        outputs = self.model.generate(**inputs, max_new_tokens=256)
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+
+# ---- 译文缓存 ----
+
+def text_key(backend: str, target: str, text: str) -> str:
+    return hashlib.sha256(f"{backend}\0{target}\0{text}".encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """按原文哈希缓存的译文（SQLite）"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or state_path('translations.sqlite3')
+        with self._connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY, translation TEXT, created_at REAL)''')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(keys)
+        found: Dict[str, str] = {}
+        with self._connect() as conn:
+            # SQLite默认最多999个参数
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT key, translation FROM translations WHERE key IN ({','.join('?' * len(part))})",
+                    part).fetchall()
+                found.update(rows)
+        return found
+
+    def put_many(self, translations: Dict[str, str]):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO translations VALUES (?, ?, ?)',
+                             [(key, value, now) for key, value in translations.items()])
+
+
+class Localizer:
+    """检测语言并把新闻标题、摘要翻译为目标语言"""
+
+    def __init__(self, backend: TranslationBackend, cache: Optional[TranslationCache] = None,
+                 target: str = 'zh', batch_size: int = DEFAULT_BATCH_SIZE,
+                 fields: Iterable[str] = ('title', 'summary')):
+        """
+        Args:
+            backend: 翻译后端
+            cache: 译文缓存，默认放在状态目录
+            target: 目标语言
+            batch_size: 每批提交给后端的文本数
+            fields: 需要本地化的新闻字段
+        """
+        self.backend = backend
+        self.cache = cache or TranslationCache()
+        self.target = target
+        self.batch_size = batch_size
+        self.fields = tuple(fields)
+
+    def translate(self, texts: Iterable[str], source: str = 'en') -> Dict[str, Dict]:
+        """
+        翻译一组文本（去重 -> 查缓存 -> 未命中的分批翻译并写回缓存）
+
+        Returns:
+            {'translations': {原文: 译文}, 'cached': 命中缓存数, 'translated': 新翻译数, 'batches': 批数}
+        """
+        unique = list(dict.fromkeys(t for t in texts if t))
+        keys = {text: text_key(self.backend.name, self.target, text) for text in unique}
+        cached = self.cache.get_many(keys.values())
+
+        translations = {text: cached[key] for text, key in keys.items() if key in cached}
+        missing = [text for text in unique if text not in translations]
+        batches = 0
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            results = self.backend.translate_batch(batch, source, self.target)
+            batches += 1
+            fresh = {text: result.strip() for text, result in zip(batch, results) if result and result.strip()}
+            translations.update(fresh)
+            self.cache.put_many({keys[text]: value for text, value in fresh.items()})
+
+        return {'translations': translations, 'cached': len(cached),
+                'translated': len(translations) - len(cached), 'batches': batches}
+
+    def localize(self, news_list: List) -> Dict[str, int]:
+        """
+        就地替换新闻中非目标语言的字段
+
+        Returns:
+            {'items': 本地化的新闻数, 'translated': 新翻译数, 'cached': 命中缓存数, 'batches': 批数}
+        """
+        pending = []  # (新闻, 字段, 原文)
+        for news in news_list:
+            for field in self.fields:
+                text = news.get(field) or ''
+                language = detect_language(text)
+                if language and language != self.target:
+                    pending.append((news, field, text))
+
+        result = self.translate(text for _, _, text in pending)
+        translations = result['translations']
+        localized = set()
+        for news, field, text in pending:
+            if text in translations:
+                news[field] = translations[text]
+                localized.add(id(news))
+        return {'items': len(localized), 'translated': result['translated'],
+                'cached': result['cached'], 'batches': result['batches']}
+
+
+def get_localizer() -> Optional[Localizer]:
+    """根据 TECH_NEWS_TRANSLATOR 创建本地化器，未配置时返回None"""
+    name = os.getenv('TECH_NEWS_TRANSLATOR', '').strip().lower()
+    if not name:
+        return None
+    return Localizer(create_backend(name))
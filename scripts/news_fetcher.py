@@ -7,197 +7,113 @@
 - NewsAPI (https://newsapi.org/) - 免费100请求/天
 - GNews (https://gnews.io/) - 免费100请求/天  
 - 中文科技新闻API (api.aa1.cn) - 免费
+- RSS/Atom订阅源（TECH_NEWS_RSS_FEEDS）
+
+各新闻源的请求与解析见builtin_providers，新增新闻源见provider_sdk
 """
 
-import requests
+import asyncio
 import json
+import logging
 import os
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-import random
+from operator import attrgetter
+from typing import List, Dict, Optional, Tuple
 import time
 
+from formatter import format_for_xiaohongshu, group_by_category
+from news_item import NewsItem
+from provider_router import ProviderRouter
+from provider_sdk import NewsProvider, ProviderHub, create_provider, provider_names
+from rate_limiter import QuotaManager
+from telemetry import event
+from watermarks import WatermarkStore
+
 class TechNewsFetcher:
     def __init__(self):
-        # API密钥配置（从环境变量读取）
-        self.newsapi_key = os.getenv('NEWSAPI_KEY', '')
-        self.gnews_key = os.getenv('GNEWS_KEY', '')
-        
-        # API基础URL
-        self.newsapi_url = "https://newsapi.org/v2"
-        self.gnews_url = "https://gnews.io/api/v4"
-        
-        # 中文新闻API（可选）
-        self.tianxing_key = os.getenv('TIANXING_KEY', '')  # 天行数据 https://www.tianapi.com/
-        self.tianxing_url = "http://api.tianapi.com/keji/index"
+        # 新闻源插件（内置 + entry point注册的第三方源），密钥从各自的环境变量读取
+        self.providers: Dict[str, NewsProvider] = {name: create_provider(name) for name in provider_names()}
         
         # 缓存配置
         self.cache_file = "/tmp/tech_news_cache.json"
         self.cache_duration = 3600  # 缓存1小时
         
-    def _get_cache(self) -> Optional[List[Dict]]:
+        # 配额与限速（跨进程共享），以及API健康度路由（熔断、排序）
+        self.quota = QuotaManager()
+        self.router = ProviderRouter(quota_lookup=self._remaining_quota)
+        
+        # 所有新闻源共享的连接池、响应缓存、配额和健康度记录
+        self.hub = ProviderHub(quota=self.quota, router=self.router, categorize=self._categorize)
+        
+        # 增量获取水位线（TECH_NEWS_INCREMENTAL=true时默认开启增量模式）
+        self.watermarks = WatermarkStore()
+        self.incremental = os.getenv('TECH_NEWS_INCREMENTAL', 'false').lower() == 'true'
+        
+    def _get_cache(self) -> Optional[List[NewsItem]]:
         """从缓存读取新闻"""
         try:
             if os.path.exists(self.cache_file):
                 with open(self.cache_file, 'r', encoding='utf-8') as f:
                     cache = json.load(f)
                     if time.time() - cache.get('timestamp', 0) < self.cache_duration:
-                        return cache.get('news', [])
+                        return [NewsItem.from_dict(n) for n in cache.get('news', [])]
         except Exception as e:
             print(f"缓存读取失败: {e}")
         return None
     
-    def _set_cache(self, news: List[Dict]):
+    def _set_cache(self, news: List[NewsItem]):
         """保存新闻到缓存"""
         try:
             cache = {
                 'timestamp': time.time(),
-                'news': news
+                'news': [n.to_dict() for n in news]
             }
             with open(self.cache_file, 'w', encoding='utf-8') as f:
                 json.dump(cache, f, ensure_ascii=False)
         except Exception as e:
             print(f"缓存保存失败: {e}")
     
-    def fetch_from_newsapi(self, query: str = "technology", num_results: int = 10) -> List[Dict]:
-        """
-        从NewsAPI获取科技新闻
-        免费版限制：100请求/天
-        """
-        if not self.newsapi_key:
-            print("⚠️ 未配置NEWSAPI_KEY，跳过NewsAPI")
-            return []
-        
-        url = f"{self.newsapi_url}/everything"
-        
-        # 计算昨天日期（免费版只能获取1天内的新闻）
-        yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-        
-        params = {
-            'q': query,
-            'from': yesterday,
-            'sortBy': 'publishedAt',
-            'language': 'en',
-            'pageSize': num_results,
-            'apiKey': self.newsapi_key
-        }
-        
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get('status') == 'ok':
-                articles = data.get('articles', [])
-                news_list = []
-                for article in articles:
-                    news_list.append({
-                        'title': article.get('title', ''),
-                        'summary': article.get('description', '') or article.get('content', '')[:150],
-                        'source': article.get('source', {}).get('name', 'Unknown'),
-                        'category': self._categorize_news(article.get('title', '')),
-                        'hot_score': random.randint(70, 98),
-                        'url': article.get('url', ''),
-                        'published_at': article.get('publishedAt', ''),
-                        'from_api': 'NewsAPI'
-                    })
-                print(f"✅ NewsAPI获取成功: {len(news_list)}条")
-                return news_list
-            else:
-                print(f"⚠️ NewsAPI返回错误: {data.get('message', 'Unknown error')}")
-                return []
-                
-        except requests.exceptions.RequestException as e:
-            print(f"❌ NewsAPI请求失败: {e}")
-            return []
+    @property
+    def api_keys(self) -> Dict[str, str]:
+        """各新闻源的密钥（无需密钥的源为空字符串）"""
+        return {name: provider.api_key for name, provider in self.providers.items()}
     
-    def fetch_from_gnews(self, query: str = "technology", num_results: int = 10) -> List[Dict]:
-        """
-        从GNews获取科技新闻
-        免费版限制：100请求/天，每次最多10条
-        """
-        if not self.gnews_key:
-            print("⚠️ 未配置GNEWS_KEY，跳过GNews")
-            return []
-        
-        url = f"{self.gnews_url}/search"
-        
-        params = {
-            'q': query,
-            'lang': 'en',
-            'max': min(num_results, 10),  # 免费版每次最多10条
-            'apikey': self.gnews_key
-        }
-        
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            articles = data.get('articles', [])
-            news_list = []
-            for article in articles:
-                news_list.append({
-                    'title': article.get('title', ''),
-                    'summary': article.get('description', '') or article.get('content', '')[:150],
-                    'source': article.get('source', {}).get('name', 'Unknown'),
-                    'category': self._categorize_news(article.get('title', '')),
-                    'hot_score': random.randint(70, 98),
-                    'url': article.get('url', ''),
-                    'published_at': article.get('publishedAt', ''),
-                    'from_api': 'GNews'
-                })
-            print(f"✅ GNews获取成功: {len(news_list)}条")
-            return news_list
-            
-        except requests.exceptions.RequestException as e:
-            print(f"❌ GNews请求失败: {e}")
-            return []
+    def configured_providers(self) -> List[str]:
+        """已配置（有密钥或订阅源）的新闻源"""
+        return [name for name, provider in self.providers.items() if provider.configured]
     
-    def fetch_from_tianxing(self, num_results: int = 10) -> List[Dict]:
-        """
-        从天行数据API获取中文科技新闻
-        免费版：100次/天
-        官网：https://www.tianapi.com/apiview/10
+    def _remaining_quota(self, name: str) -> Optional[int]:
+        provider = self.providers.get(name)
+        if provider is None or not provider.uses_quota:
+            return None
+        return self.quota.remaining(name, provider.api_key)
+    
+    def _categorize(self, title: str, language: str) -> str:
+        return self._categorize_cn_news(title) if language == 'zh' else self._categorize_news(title)
+    
+    def fetch_from_provider(self, name: str, query: str = '', num_results: int = 10,
+                            since: Optional[str] = None) -> List[NewsItem]:
         """
-        if not self.tianxing_key:
-            print("⚠️ 未配置TIANXING_KEY，跳过天行数据API")
-            return []
+        从指定新闻源获取新闻
         
-        url = self.tianxing_url
-        params = {
-            'key': self.tianxing_key,
-            'num': min(num_results, 20)  # 最多20条
-        }
-        
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get('code') == 200:
-                articles = data.get('newslist', [])
-                news_list = []
-                for article in articles:
-                    news_list.append({
-                        'title': article.get('title', ''),
-                        'summary': article.get('description', '') or article.get('title', '')[:80] + '...',
-                        'source': article.get('source', '科技资讯'),
-                        'category': self._categorize_cn_news(article.get('title', '')),
-                        'hot_score': random.randint(70, 95),
-                        'url': article.get('url', ''),
-                        'published_at': article.get('ctime', ''),
-                        'from_api': 'TianXing'
-                    })
-                print(f"✅ 天行数据API获取成功: {len(news_list)}条")
-                return news_list
-            else:
-                print(f"⚠️ 天行数据API返回错误: {data.get('msg', 'Unknown')}")
-                return []
-                
-        except requests.exceptions.RequestException as e:
-            print(f"❌ 天行数据API请求失败: {e}")
-            return []
+        Args:
+            query: 查询词，为空时使用该源的默认查询
+            since: 只获取该时间之后的新闻（UTC ISO格式），不支持服务端过滤的源会忽略
+        """
+        return self.hub.fetch_sync(self.providers[name], query, num_results, since)
+    
+    def fetch_from_newsapi(self, query: str = "technology", num_results: int = 10,
+                           since: Optional[str] = None) -> List[NewsItem]:
+        """从NewsAPI获取科技新闻（免费版限制：100请求/天）"""
+        return self.fetch_from_provider('NewsAPI', query, num_results, since)
+    
+    def fetch_from_gnews(self, query: str = "technology", num_results: int = 10,
+                         since: Optional[str] = None) -> List[NewsItem]:
+        """从GNews获取科技新闻（免费版限制：100请求/天，每次最多10条）"""
+        return self.fetch_from_provider('GNews', query, num_results, since)
+    
+    def fetch_from_tianxing(self, num_results: int = 10, since: Optional[str] = None) -> List[NewsItem]:
+        """从天行数据API获取中文科技新闻（免费版：100次/天）"""
+        return self.fetch_from_provider('TianXing', '', num_results, since)
     
     def _categorize_news(self, title: str) -> str:
         """根据标题分类英文新闻"""
@@ -240,177 +156,195 @@ class TechNewsFetcher:
         
         return '科技'
     
-    def fetch_news(self, num_results: int = 10) -> List[Dict]:
+    def fetch_news(self, num_results: int = 10, incremental: Optional[bool] = None,
+                   providers: Optional[List[str]] = None) -> List[NewsItem]:
         """
         获取高科技新闻（聚合多个API）
         
         优先级：
         1. 先检查缓存
-        2. 尝试NewsAPI
-        3. 尝试GNews
-        4. 尝试中文API
+        2-4. 按健康度排序尝试已注册的新闻源（NewsAPI / GNews / 中文API / RSS等，熔断中的源直接跳过）
         5. 使用模拟数据作为后备
+        
+        Args:
+            num_results: 返回新闻数量
+            incremental: 增量模式，只获取上次运行之后的新闻（不读写缓存，
+                         没有新内容时返回空列表而不是模拟数据）。水位线按返回的新闻暂存（被条数截掉的新闻不越过），
+                         调用方处理成功后调用commit_watermarks()才会推进
+            providers: 只使用这些新闻源（默认全部已配置的新闻源）
         """
-        print("📰 开始获取科技新闻...")
+        if incremental is None:
+            incremental = self.incremental
+        print("📰 开始获取科技新闻..." if not incremental else "📰 开始增量获取科技新闻...")
         
         # 1. 检查缓存
-        cached_news = self._get_cache()
-        if cached_news:
-            print(f"✅ 使用缓存数据: {len(cached_news)}条")
-            return cached_news[:num_results]
-        
-        all_news = []
-        
-        # 2. 尝试NewsAPI
-        if self.newsapi_key:
-            newsapi_news = self.fetch_from_newsapi("technology AI", num_results // 2)
-            all_news.extend(newsapi_news)
-        
-        # 3. 尝试GNews
-        if self.gnews_key and len(all_news) < num_results:
-            gnews_news = self.fetch_from_gnews("technology", num_results // 2)
-            # 去重
-            existing_titles = {n['title'] for n in all_news}
-            for news in gnews_news:
-                if news['title'] not in existing_titles:
-                    all_news.append(news)
-        
-        # 4. 尝试天行数据中文API
-        if len(all_news) < num_results:
-            cn_news = self.fetch_from_tianxing(num_results - len(all_news))
-            all_news.extend(cn_news)
+        if not incremental:
+            cached_news = self._get_cache()
+            if cached_news:
+                print(f"✅ 使用缓存数据: {len(cached_news)}条")
+                event('news.fetch', origin='cache', articles=len(cached_news[:num_results]))
+                return cached_news[:num_results]
+        
+        # 2-4. 按健康度路由依次尝试各新闻源（熔断中的源直接跳过）
+        configured = [name for name in self.configured_providers()
+                      if providers is None or name in providers]
+        for name in self.router.skipped(configured):
+            print(f"⏭️ 跳过{name}（熔断中或配额已用完）")
+            event('provider.skipped', provider=name)
+        
+        all_news, fetched = asyncio.run(self._fetch_routed(configured, num_results, incremental))
+        self.router.save()
+        
+        if incremental:
+            all_news.sort(key=attrgetter('hot_score'), reverse=True)
+            selected = all_news[:num_results]
+            # 只有被条数截掉的新闻下次还能获取到；与其他源标题重复而去掉的新闻视为已看过，
+            # 否则下次会从另一个源重复推送
+            held_back = {id(n) for n in all_news[num_results:]}
+            self.watermarks.discard()
+            for name, items in fetched.items():
+                self.watermarks.stage(name, self.providers[name].default_query,
+                                      [n for n in items if id(n) not in held_back],
+                                      [n for n in items if id(n) in held_back])
+            print(f"✅ 增量获取 {len(all_news)} 条新新闻")
+            event('news.fetch', origin='providers', incremental=True, articles=len(selected))
+            return selected
         
         # 5. 如果都没有获取到，使用模拟数据
         if not all_news:
             print("⚠️ 所有API都失败，使用模拟数据")
             all_news = self._get_mock_news()
+            event('news.fetch.fallback', logging.WARNING, origin='mock')
         
         # 按热度排序
-        all_news.sort(key=lambda x: x['hot_score'], reverse=True)
+        all_news.sort(key=attrgetter('hot_score'), reverse=True)
         
         # 保存到缓存
         self._set_cache(all_news)
         
         print(f"✅ 共获取 {len(all_news)} 条新闻")
+        event('news.fetch', origin='providers', articles=len(all_news[:num_results]))
         return all_news[:num_results]
     
-    def _get_mock_news(self) -> List[Dict]:
+    def commit_watermarks(self):
+        """提交上次增量获取暂存的水位线（流程发布/发送成功后调用）"""
+        self.watermarks.commit()
+    
+    async def _fetch_routed(self, configured: List[str], num_results: int,
+                            incremental: bool) -> Tuple[List[NewsItem], Dict[str, List[NewsItem]]]:
+        """
+        按健康度顺序依次请求各新闻源（共享一个连接池），凑够num_results条为止，按标题去重
+        
+        Returns:
+            (去重后的新闻, {新闻源: 该源获取到的新新闻})
+        """
+        all_news = []
+        existing_titles = set()
+        fetched: Dict[str, List[NewsItem]] = {}
+        
+        async with self.hub.client() as client:
+            for name in self.router.order(configured):
+                if len(all_news) >= num_results:
+                    break
+                provider = self.providers[name]
+                query = provider.default_query
+                # 第一个源只取一半，为其他源留出多样性
+                wanted = num_results // 2 if not all_news else num_results - len(all_news)
+                since = self.watermarks.since(name, query) if incremental else None
+                items = await self.hub.fetch(client, provider, query, max(wanted, 1), since)
+                self.router.record_yield(name, len(items))
+                
+                # 增量模式：客户端再按水位线过滤一次（覆盖不支持时间过滤的API和边界重复）
+                if incremental:
+                    received = len(items)
+                    items = self.watermarks.filter_new(name, query, items)
+                    fetched[name] = items
+                    print(f"   {name}: {received}条中新增{len(items)}条")
+                
+                # 去重
+                for news in items:
+                    if news.title not in existing_titles:
+                        existing_titles.add(news.title)
+                        all_news.append(news)
+        return all_news, fetched
+    
+    def _get_mock_news(self) -> List[NewsItem]:
         """模拟新闻数据（后备方案）"""
         return [
-            {
-                "title": "OpenAI发布GPT-5，多模态能力大幅提升",
-                "summary": "OpenAI今日发布新一代大模型GPT-5，支持文本、图像、音频、视频多模态输入，推理能力较前代提升40%。",
-                "source": "TechCrunch",
-                "category": "人工智能",
-                "hot_score": 98,
-                "from_api": "Mock"
-            },
-            {
-                "title": "苹果Vision Pro 2代曝光：更轻更薄，价格减半",
-                "summary": "据供应链消息，苹果第二代Vision Pro头显设备重量将减轻30%，售价有望降至1999美元起。",
-                "source": "Bloomberg",
-                "category": "硬件设备",
-                "hot_score": 95,
-                "from_api": "Mock"
-            },
-            {
-                "title": "特斯拉FSD V13实现完全无人驾驶，马斯克称即将全球推送",
-                "summary": "特斯拉宣布FSD V13版本在内部测试中实现零干预驾驶，计划下月向美国用户全面推送。",
-                "source": "Reuters",
-                "category": "自动驾驶",
-                "hot_score": 92,
-                "from_api": "Mock"
-            },
-            {
-                "title": "英伟达发布H200 GPU，AI算力再翻倍",
-                "summary": "英伟达在GTC大会上发布新一代AI芯片H200，采用3nm工艺，训练大模型速度提升2.5倍。",
-                "source": "The Verge",
-                "category": "芯片",
-                "hot_score": 90,
-                "from_api": "Mock"
-            },
-            {
-                "title": "微软Copilot整合GPT-5，Office套件全面AI化",
-                "summary": "微软宣布将GPT-5深度整合进Office 365，Word、Excel、PPT将迎来革命性AI功能升级。",
-                "source": "Wired",
-                "category": "人工智能",
-                "hot_score": 88,
-                "from_api": "Mock"
-            },
-            {
-                "title": "谷歌Gemini 2.0挑战GPT-5，多语言支持领先",
-                "summary": "谷歌发布Gemini 2.0，支持超过100种语言，在代码生成和数学推理方面表现优异。",
-                "source": "Ars Technica",
-                "category": "人工智能",
-                "hot_score": 85,
-                "from_api": "Mock"
-            },
-            {
-                "title": "Meta元宇宙部门首次盈利，VR用户破千万",
-                "summary": "Meta Reality Labs季度营收首次超过成本，Quest系列VR头显全球销量突破1000万台。",
-                "source": "CNBC",
-                "category": "元宇宙",
-                "hot_score": 82,
-                "from_api": "Mock"
-            },
-            {
-                "title": "SpaceX星舰第五次试飞成功，火星计划提速",
-                "summary": "星舰成功完成第五次轨道试飞，马斯克表示2026年载人火星任务准备就绪。",
-                "source": "SpaceNews",
-                "category": "航天",
-                "hot_score": 80,
-                "from_api": "Mock"
-            }
+            NewsItem(
+                title="OpenAI发布GPT-5，多模态能力大幅提升",
+                summary="OpenAI今日发布新一代大模型GPT-5，支持文本、图像、音频、视频多模态输入，推理能力较前代提升40%。",
+                source="TechCrunch",
+                category="人工智能",
+                hot_score=98,
+                from_api="Mock"
+            ),
+            NewsItem(
+                title="苹果Vision Pro 2代曝光：更轻更薄，价格减半",
+                summary="据供应链消息，苹果第二代Vision Pro头显设备重量将减轻30%，售价有望降至1999美元起。",
+                source="Bloomberg",
+                category="硬件设备",
+                hot_score=95,
+                from_api="Mock"
+            ),
+            NewsItem(
+                title="特斯拉FSD V13实现完全无人驾驶，马斯克称即将全球推送",
+                summary="特斯拉宣布FSD V13版本在内部测试中实现零干预驾驶，计划下月向美国用户全面推送。",
+                source="Reuters",
+                category="自动驾驶",
+                hot_score=92,
+                from_api="Mock"
+            ),
+            NewsItem(
+                title="英伟达发布H200 GPU，AI算力再翻倍",
+                summary="英伟达在GTC大会上发布新一代AI芯片H200，采用3nm工艺，训练大模型速度提升2.5倍。",
+                source="The Verge",
+                category="芯片",
+                hot_score=90,
+                from_api="Mock"
+            ),
+            NewsItem(
+                title="微软Copilot整合GPT-5，Office套件全面AI化",
+                summary="微软宣布将GPT-5深度整合进Office 365，Word、Excel、PPT将迎来革命性AI功能升级。",
+                source="Wired",
+                category="人工智能",
+                hot_score=88,
+                from_api="Mock"
+            ),
+            NewsItem(
+                title="谷歌Gemini 2.0挑战GPT-5，多语言支持领先",
+                summary="谷歌发布Gemini 2.0，支持超过100种语言，在代码生成和数学推理方面表现优异。",
+                source="Ars Technica",
+                category="人工智能",
+                hot_score=85,
+                from_api="Mock"
+            ),
+            NewsItem(
+                title="Meta元宇宙部门首次盈利，VR用户破千万",
+                summary="Meta Reality Labs季度营收首次超过成本，Quest系列VR头显全球销量突破1000万台。",
+                source="CNBC",
+                category="元宇宙",
+                hot_score=82,
+                from_api="Mock"
+            ),
+            NewsItem(
+                title="SpaceX星舰第五次试飞成功，火星计划提速",
+                summary="星舰成功完成第五次轨道试飞，马斯克表示2026年载人火星任务准备就绪。",
+                source="SpaceNews",
+                category="航天",
+                hot_score=80,
+                from_api="Mock"
+            )
         ]
     
     def categorize_news(self, news_list: List[Dict]) -> Dict[str, List[Dict]]:
         """按类别分类新闻"""
-        categories = {}
-        for news in news_list:
-            cat = news.get('category', '其他')
-            if cat not in categories:
-                categories[cat] = []
-            categories[cat].append(news)
-        return categories
+        return group_by_category(news_list)
     
-    def format_for_xiaohongshu(self, news_list: List[Dict]) -> str:
-        """格式化为小红书风格文案"""
-        today = datetime.now().strftime("%m月%d日")
-        
-        content = f"▶ 全球科技早报 | {today}\n"
-        content += "=" * 20 + "\n\n"
-        
-        # 添加今日热点
-        content += "HOT 今日热点 TOP 5\n\n"
-        
-        for i, news in enumerate(news_list[:5], 1):
-            content += f"{i}. {news['title']}\n"
-            content += f"   {news['summary'][:50]}...\n"
-            content += f"   热度: {news['hot_score']}/100"
-            if news.get('from_api'):
-                content += f" | 来源: {news['from_api']}"
-            content += "\n\n"
-        
-        content += "=" * 20 + "\n\n"
-        
-        # 按类别分类
-        categories = self.categorize_news(news_list)
-        
-        for cat, items in categories.items():
-            content += f"# {cat}\n"
-            for item in items[:2]:
-                content += f"• {item['title']}\n"
-            content += "\n"
-        
-        content += "=" * 20 + "\n\n"
-        content += "今日思考\n"
-        content += "科技改变世界，每一天都有新的突破。"
-        content += "保持关注，把握未来趋势！\n\n"
-        
-        content += "#科技新闻 #AI #人工智能 #科技早报\n"
-        content += "#硅谷 #特斯拉 #OpenAI #谷歌 #微软"
-        
-        return content
+    def format_for_xiaohongshu(self, news_list: List[Dict],
+                               categories: Optional[Dict[str, List[Dict]]] = None) -> str:
+        """格式化为小红书风格文案（委托给formatter模块）"""
+        return format_for_xiaohongshu(news_list, categories)
 
 if __name__ == "__main__":
     fetcher = TechNewsFetcher()
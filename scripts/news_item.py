@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+新闻条目数据结构
+- NewsItem: 单条新闻（__slots__，比dict更省内存，缺省字段有默认值）
+- NewsBatch: 列式存储的新闻集合，用于排序、过滤、打分等批量操作
+
+NewsItem 保留了 item['title'] / item.get('url') 形式的访问，
+图片生成、文案格式化等按dict读取新闻的代码无需修改。
+"""
+
+import json
+import sqlite3
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+@dataclass(slots=True)
+class NewsItem:
+    """单条新闻"""
+    title: str
+    summary: str = ''
+    source: str = 'Unknown'
+    category: str = '科技'
+    hot_score: int = 0
+    url: str = ''
+    published_at: str = ''
+    from_api: str = ''
+    image_url: str = ''
+
+    # ---- 兼容dict式访问 ----
+
+    # 只有数据字段可以按键访问，方法名（如'get'、'to_dict'）与dict一样视为不存在的键
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in FIELD_NAMES:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in FIELD_NAMES:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in FIELD_NAMES
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in FIELD_NAMES:
+            return default
+        value = getattr(self, key)
+        # 空字符串视为缺失，与原先 dict.get 在缺少键时的行为一致
+        return default if value == '' and default is not None else value
+
+    def keys(self) -> List[str]:
+        return list(FIELD_NAMES)
+
+    # ---- 序列化 ----
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in FIELD_NAMES}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'NewsItem':
+        """从dict构造，忽略未知字段，缺失字段使用默认值"""
+        return cls(**{k: v for k, v in data.items() if k in FIELD_NAMES and v is not None})
+
+    def to_row(self) -> tuple:
+        """SQLite行（按FIELD_NAMES顺序）"""
+        return tuple(getattr(self, name) for name in FIELD_NAMES)
+
+    @classmethod
+    def from_row(cls, row: Iterable) -> 'NewsItem':
+        return cls(*row)
+
+
+FIELD_NAMES = tuple(f.name for f in fields(NewsItem))
+
+
+def to_news_items(news_list: Iterable) -> List[NewsItem]:
+    """把dict或NewsItem混合列表统一转换为NewsItem"""
+    return [n if isinstance(n, NewsItem) else NewsItem.from_dict(n) for n in news_list]
+
+
+class NewsBatch:
+    """
+    列式新闻集合
+
+    每个字段一个列表，批量排序/过滤只需移动下标，
+    在保存成千上万条历史新闻用于去重和排序时比逐条dict更快、更省内存。
+    """
+
+    __slots__ = ('columns',)
+
+    def __init__(self, columns: Optional[Dict[str, List]] = None):
+        self.columns = columns or {name: [] for name in FIELD_NAMES}
+
+    @classmethod
+    def from_items(cls, items: Iterable) -> 'NewsBatch':
+        batch = cls()
+        for item in items:
+            batch.append(item)
+        return batch
+
+    def append(self, item):
+        if not isinstance(item, NewsItem):
+            item = NewsItem.from_dict(item)
+        for name in FIELD_NAMES:
+            self.columns[name].append(getattr(item, name))
+
+    def __len__(self) -> int:
+        return len(self.columns['title'])
+
+    def __getitem__(self, index: int) -> NewsItem:
+        return NewsItem(*(self.columns[name][index] for name in FIELD_NAMES))
+
+    def __iter__(self) -> Iterator[NewsItem]:
+        for row in zip(*(self.columns[name] for name in FIELD_NAMES)):
+            yield NewsItem(*row)
+
+    def column(self, name: str) -> List:
+        return self.columns[name]
+
+    def take(self, indices: Iterable[int]) -> 'NewsBatch':
+        """按下标选取，返回新的集合"""
+        indices = list(indices)
+        return NewsBatch({name: [col[i] for i in indices] for name, col in self.columns.items()})
+
+    def sort_by(self, name: str, reverse: bool = False) -> 'NewsBatch':
+        col = self.columns[name]
+        return self.take(sorted(range(len(col)), key=col.__getitem__, reverse=reverse))
+
+    def filter(self, name: str, predicate: Callable[[Any], bool]) -> 'NewsBatch':
+        """按某一列的值过滤"""
+        return self.take(i for i, v in enumerate(self.columns[name]) if predicate(v))
+
+    def score(self, func: Callable[..., float], *names: str) -> List[float]:
+        """对若干列逐行打分，例如 batch.score(lambda s, t: s + len(t), 'hot_score', 'title')"""
+        return [func(*values) for values in zip(*(self.columns[n] for n in names))]
+
+    def top_k(self, k: int, name: str = 'hot_score') -> 'NewsBatch':
+        col = self.columns[name]
+        order = sorted(range(len(col)), key=col.__getitem__, reverse=True)[:k]
+        return self.take(order)
+
+    def dedup(self, name: str = 'title') -> 'NewsBatch':
+        """按某一列去重，保留首次出现的条目"""
+        seen = set()
+        keep = []
+        for i, value in enumerate(self.columns[name]):
+            if value not in seen:
+                seen.add(value)
+                keep.append(i)
+        return self.take(keep)
+
+    def to_list(self) -> List[NewsItem]:
+        return list(self)
+
+    # ---- 序列化 ----
+
+    def to_jsonl(self, fp):
+        for row in zip(*(self.columns[name] for name in FIELD_NAMES)):
+            fp.write(json.dumps(dict(zip(FIELD_NAMES, row)), ensure_ascii=False))
+            fp.write('\n')
+
+    @classmethod
+    def from_jsonl(cls, fp) -> 'NewsBatch':
+        return cls.from_items(NewsItem.from_dict(json.loads(line)) for line in fp if line.strip())
+
+    def to_sqlite(self, conn: sqlite3.Connection, table: str = 'news'):
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(FIELD_NAMES)})")
+        placeholders = ', '.join('?' * len(FIELD_NAMES))
+        conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})",
+                         zip(*(self.columns[name] for name in FIELD_NAMES)))
+
+    @classmethod
+    def from_sqlite(cls, conn: sqlite3.Connection, table: str = 'news',
+                    where: str = '', params: tuple = ()) -> 'NewsBatch':
+        rows = conn.execute(f"SELECT {', '.join(FIELD_NAMES)} FROM {table} {where}", params).fetchall()
+        columns = {name: list(col) for name, col in zip(FIELD_NAMES, zip(*rows))} if rows else None
+        return cls(columns)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+性能分析模块
+为流水线各阶段和每次图片渲染采集cProfile、tracemalloc和调用栈采样数据
+
+输出（放在运行报告旁的 profile_<时间戳>/ 目录）：
+- <阶段>.pstats        cProfile统计，可用 python -m pstats 或 snakeviz 查看
+- stacks.collapsed     折叠调用栈，可直接交给 flamegraph.pl / speedscope 生成火焰图
+- allocations.txt      各阶段新增内存最多的代码位置
+- summary.json         各阶段耗时、内存增量和峰值
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+# 调用栈采样间隔（秒）
+SAMPLE_INTERVAL = 0.005
+
+# 每个阶段记录的内存分配位置数
+TOP_ALLOCATIONS = 15
+
+
+def profiled(profiler: Optional['StageProfiler'], name: str):
+    """profiler为空时返回空上下文，调用方无需判断是否开启了分析"""
+    return profiler.stage(name) if profiler is not None else nullcontext()
+
+
+class StageProfiler:
+    """按阶段采集性能数据"""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.stages: List[Dict] = []
+        self.stacks: Dict[str, int] = {}
+        self.allocations: List[str] = []
+
+        # 各线程当前所在的阶段路径，以及对应的cProfile实例
+        self._active: Dict[int, List[str]] = {}
+        self._profiles: Dict[int, List[cProfile.Profile]] = {}
+        # 各层阶段在子阶段重置tracemalloc峰值之前已达到的峰值
+        self._peaks: Dict[int, List[int]] = {}
+        # 只停止由本分析器开启的tracemalloc（调用方可能自己在跟踪，如soak --tracemalloc）
+        self._started_tracing = False
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ---- 调用栈采样 ----
+
+    def _start_sampler(self):
+        if self._sampler is not None:
+            return
+        self._sampler = threading.Thread(target=self._sample_loop, name='stack-sampler', daemon=True)
+        self._sampler.start()
+
+    def _sample_loop(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            frames = sys._current_frames()
+            with self._lock:
+                active = {tid: list(path) for tid, path in self._active.items() if path}
+            for tid, path in active.items():
+                frame = frames.get(tid)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                key = ';'.join(path + stack[::-1])
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    # ---- 阶段 ----
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        分析一个阶段
+
+        阶段可以嵌套（例如"生成图片"中的每次渲染）。cProfile同一时间只能有一个在采集，
+        进入子阶段时会暂停外层的cProfile，因此外层pstats不包含子阶段的耗时，
+        而折叠调用栈中子阶段会挂在外层阶段下面。内存峰值则包含子阶段。
+        """
+        tid = threading.get_ident()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._start_sampler()
+
+        with self._lock:
+            path = self._active.setdefault(tid, [])
+            path.append(name)
+            label = '.'.join(path)
+
+        outer = self._profiles.setdefault(tid, [])
+        if outer:
+            outer[-1].disable()
+        profile = cProfile.Profile()
+        outer.append(profile)
+
+        # 重置峰值前先记下外层阶段到目前为止的峰值
+        peaks = self._peaks.setdefault(tid, [])
+        if peaks:
+            peaks[-1] = max(peaks[-1], tracemalloc.get_traced_memory()[1])
+        peaks.append(0)
+
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        mem_start = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            mem_end, mem_peak = tracemalloc.get_traced_memory()
+            mem_peak = max(mem_peak, peaks.pop())
+            after = tracemalloc.take_snapshot()
+
+            outer.pop()
+            if outer:
+                outer[-1].enable()
+            with self._lock:
+                path.pop()
+
+            os.makedirs(self.output_dir, exist_ok=True)
+            profile.dump_stats(os.path.join(self.output_dir, f"{label}.pstats"))
+
+            diff = after.compare_to(before, 'lineno')
+            self.allocations.append(f"== {label} ==")
+            for stat in diff[:TOP_ALLOCATIONS]:
+                if stat.size_diff <= 0:
+                    break
+                frame = stat.traceback[0]
+                self.allocations.append(
+                    f"  {stat.size_diff / 1024:>10.1f} KiB  {stat.count_diff:>+7d} blocks  "
+                    f"{frame.filename}:{frame.lineno}")
+
+            self.stages.append({
+                'stage': label,
+                'seconds': round(elapsed, 4),
+                'memory_delta_kib': round((mem_end - mem_start) / 1024, 1),
+                'memory_peak_kib': round(mem_peak / 1024, 1),
+            })
+
+    def finish(self) -> Dict:
+        """停止采样并写出所有分析文件"""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1)
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self._started_tracing = False
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, 'stacks.collapsed'), 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        with open(os.path.join(self.output_dir, 'allocations.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.allocations) + '\n')
+
+        summary = {'output_dir': self.output_dir, 'stages': self.stages}
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return summary
+
+
+def print_profile_summary(summary: Dict):
+    """命令行输出各阶段耗时和内存"""
+    print("⏱️ 性能分析结果:")
+    for stage in summary['stages']:
+        print(f"   {stage['stage']:<32} {stage['seconds'] * 1000:>9.1f} ms  "
+              f"峰值 {stage['memory_peak_kib'] / 1024:>7.1f} MiB  "
+              f"增量 {stage['memory_delta_kib'] / 1024:>+7.1f} MiB")
+    print(f"   分析文件: {summary['output_dir']}")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+新闻源路由模块
+记录每个新闻API的延迟、错误率、产出和当日配额，并持久化到状态目录
+
+- 连续失败达到阈值后打开熔断器，冷却期内直接跳过该API（零耗时）
+- 冷却结束后进入半开状态，只放行一次试探请求
+- 按"期望产出 / 期望耗时"对可用API排序，优先请求又快又稳的源
+"""
+
+import time
+from datetime import datetime
+from typing import Callable, List, Dict, Optional
+
+from rate_limiter import PROVIDER_LIMITS
+from state_store import state_path, load_json, save_json_atomic
+
+# 各API免费版每日请求上限
+DAILY_LIMITS = {name: limits['daily'] for name, limits in PROVIDER_LIMITS.items()}
+
+# 平滑系数（指数加权移动平均）
+EWMA_ALPHA = 0.3
+
+# 熔断参数
+FAILURE_THRESHOLD = 3          # 连续失败次数
+BASE_COOLDOWN = 15 * 60        # 首次熔断冷却15分钟
+MAX_COOLDOWN = 24 * 3600       # 最长冷却24小时
+
+# 请求超时范围（秒）
+MIN_TIMEOUT = 3
+MAX_TIMEOUT = 10
+
+
+class ProviderRouter:
+    """新闻API健康度跟踪与路由"""
+
+    def __init__(self, state_file: Optional[str] = None,
+                 quota_lookup: Optional[Callable[[str], Optional[int]]] = None):
+        """
+        Args:
+            state_file: 健康度状态文件路径
+            quota_lookup: 查询某API当日剩余配额的函数（通常来自QuotaManager），
+                          未提供时按本地计数估算
+        """
+        self.state_file = state_file or state_path('provider_health.json')
+        self.state = load_json(self.state_file, {}) or {}
+        self.quota_lookup = quota_lookup
+
+    def _stats(self, name: str) -> Dict:
+        stats = self.state.setdefault(name, {
+            'latency': None,
+            'error_rate': 0.0,
+            'yield': None,
+            'consecutive_failures': 0,
+            'open_count': 0,
+            'circuit_open_until': 0,
+            'half_open': False,
+            'day': '',
+            'used_today': 0,
+            'exhausted': False,
+            'last_error': '',
+        })
+        today = datetime.now().strftime('%Y-%m-%d')
+        if stats['day'] != today:
+            stats['day'] = today
+            stats['used_today'] = 0
+            stats['exhausted'] = False
+        return stats
+
+    def remaining_quota(self, name: str) -> Optional[int]:
+        """当日剩余配额（未知上限的API返回None）"""
+        stats = self._stats(name)
+        limit = DAILY_LIMITS.get(name)
+        if stats['exhausted']:
+            return 0
+        if self.quota_lookup is not None:
+            return self.quota_lookup(name)
+        if limit is None:
+            return None
+        return max(0, limit - stats['used_today'])
+
+    def is_available(self, name: str) -> bool:
+        """熔断器关闭（或已到半开试探时间）且仍有配额"""
+        stats = self._stats(name)
+        if self.remaining_quota(name) == 0:
+            return False
+        if stats['circuit_open_until'] > time.time():
+            return False
+        if stats['consecutive_failures'] >= FAILURE_THRESHOLD:
+            # 冷却结束，进入半开状态放行一次试探
+            stats['half_open'] = True
+        return True
+
+    def timeout_for(self, name: str) -> float:
+        """根据历史延迟给出请求超时，慢源不再白等满额超时"""
+        latency = self._stats(name)['latency']
+        if latency is None:
+            return MAX_TIMEOUT
+        return max(MIN_TIMEOUT, min(MAX_TIMEOUT, latency * 4))
+
+    def _expected_value(self, name: str) -> float:
+        stats = self._stats(name)
+        # 没有历史数据的源给一个中性估计，保证会被尝试
+        latency = stats['latency'] if stats['latency'] is not None else 2.0
+        expected_yield = stats['yield'] if stats['yield'] is not None else 5.0
+        return expected_yield * (1 - stats['error_rate']) / max(latency, 0.05)
+
+    def order(self, names: List[str]) -> List[str]:
+        """过滤掉不可用的源，并按期望收益从高到低排序（同分时保持原有优先级）"""
+        available = [n for n in names if self.is_available(n)]
+        return sorted(available, key=self._expected_value, reverse=True)
+
+    def skipped(self, names: List[str]) -> List[str]:
+        """当前被熔断或配额耗尽而跳过的源"""
+        return [n for n in names if not self.is_available(n)]
+
+    def record_success(self, name: str, latency: float):
+        stats = self._stats(name)
+        stats['used_today'] += 1
+        stats['latency'] = latency if stats['latency'] is None else \
+            EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * stats['latency']
+        stats['error_rate'] = (1 - EWMA_ALPHA) * stats['error_rate']
+        stats['consecutive_failures'] = 0
+        stats['open_count'] = 0
+        stats['circuit_open_until'] = 0
+        stats['half_open'] = False
+
+    def record_yield(self, name: str, count: int):
+        stats = self._stats(name)
+        stats['yield'] = count if stats['yield'] is None else \
+            EWMA_ALPHA * count + (1 - EWMA_ALPHA) * stats['yield']
+
+    def record_failure(self, name: str, latency: float, error: str = '',
+                       quota_exhausted: bool = False, counted: bool = True):
+        """
+        记录一次失败
+
+        Args:
+            quota_exhausted: 收到429等配额耗尽响应，当日不再请求
+            counted: 该请求是否消耗了配额（网络层失败通常不计）
+        """
+        stats = self._stats(name)
+        if counted:
+            stats['used_today'] += 1
+        if quota_exhausted:
+            stats['exhausted'] = True
+        if stats['latency'] is None:
+            stats['latency'] = latency
+        stats['error_rate'] = EWMA_ALPHA + (1 - EWMA_ALPHA) * stats['error_rate']
+        stats['consecutive_failures'] += 1
+        stats['last_error'] = error[:200]
+
+        if stats['half_open'] or stats['consecutive_failures'] >= FAILURE_THRESHOLD:
+            stats['open_count'] += 1
+            cooldown = min(MAX_COOLDOWN, BASE_COOLDOWN * 2 ** (stats['open_count'] - 1))
+            stats['circuit_open_until'] = time.time() + cooldown
+            stats['half_open'] = False
+            print(f"🔌 {name} 熔断 {int(cooldown // 60)} 分钟（连续失败 {stats['consecutive_failures']} 次）")
+
+    def reset(self, names: Optional[List[str]] = None):
+        """清除健康度记录（熔断、配额耗尽标记、延迟统计），默认清除全部"""
+        for name in names if names is not None else list(self.state):
+            self.state.pop(name, None)
+
+    def save(self):
+        """持久化健康度状态"""
+        try:
+            save_json_atomic(self.state_file, self.state)
+        except OSError as e:
+            print(f"健康度状态保存失败: {e}")
+
+    def summary(self, names: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """健康度摘要（写入运行报告）"""
+        names = names or list(self.state)
+        report = {}
+        for name in names:
+            stats = self._stats(name)
+            report[name] = {
+                'available': self.is_available(name),
+                'latency': round(stats['latency'], 3) if stats['latency'] is not None else None,
+                'error_rate': round(stats['error_rate'], 3),
+                'remaining_quota': self.remaining_quota(name),
+                'circuit_open_until': stats['circuit_open_until'] or None,
+            }
+        return report
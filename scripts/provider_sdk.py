@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+新闻源插件接口
+新增新闻源只需继承NewsProvider，实现"构造请求"和"文章转换"两步，并用@register_provider注册；
+请求、解析、缓存、配额、健康度记录和并发都由ProviderHub统一处理
+
+第三方包可以通过entry point（组名 tech_news.providers）注册新闻源，例如pyproject.toml中：
+
+    [project.entry-points."tech_news.providers"]
+    hackernews = "my_package.hn:HackerNewsProvider"
+"""
+
+import abc
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from http_client import AsyncHTTPClient, HTTPError
+from json_stream import ArrayItemStream, JSONStreamError
+from news_item import NewsItem
+from state_store import state_path
+from telemetry import bind, event, metrics
+
+ENTRY_POINT_GROUP = 'tech_news.providers'
+
+# 单个新闻源响应体上限（流式解析，不会整体驻留内存）
+MAX_RESPONSE_BYTES = 64 * 1024 * 1024
+
+# 超过该大小的响应不写入响应缓存（大页批量获取时不为缓存保留整页）
+MAX_CACHED_BYTES = 512 * 1024
+
+
+class ProviderError(Exception):
+    """新闻源返回了业务错误（HTTP成功但内容表示失败，如密钥无效、限流）"""
+
+    def __init__(self, message: str, quota_exhausted: bool = False):
+        super().__init__(message)
+        self.quota_exhausted = quota_exhausted
+
+
+@dataclass
+class ProviderRequest:
+    url: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class _TrackedMeta(dict):
+    """记录check读取了哪些尚未出现的字段"""
+
+    def __init__(self, meta: Dict[str, Any]):
+        super().__init__(meta)
+        self.missing = set()
+
+    def __getitem__(self, key):
+        if key not in self.keys():
+            self.missing.add(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        if key not in self.keys():
+            self.missing.add(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        if not super().__contains__(key):
+            self.missing.add(key)
+            return False
+        return True
+
+
+class StreamingJSONParser:
+    """
+    流式JSON解析器：文章数组中的每篇文章一到达就产出，不缓存整页响应
+
+    数组开始时用已解析的顶层字段提前检查：只有check的判断完全基于已出现的字段时才提前报错
+    （如 {"status":"error",...}）；判断依赖的字段在数组之后时（如 {"newslist":[...],"code":200}）
+    留到close()，在收齐全部顶层字段后做最终检查
+    """
+
+    def __init__(self, items_key: str, check: Callable[[Dict[str, Any]], None]):
+        self.check = check
+        self._stream = ArrayItemStream(items_key, on_array_start=self._early_check)
+        # 提前检查还没有得出结论（数组尚未开始，或判断依赖数组之后的字段）
+        self._deferred = True
+
+    @property
+    def needs_tail(self) -> bool:
+        """收够文章后是否仍需读完响应，才能判断业务错误"""
+        return self._deferred
+
+    def _early_check(self, meta: Dict[str, Any]):
+        tracked = _TrackedMeta(meta)
+        try:
+            self.check(tracked)
+        except ProviderError:
+            if not tracked.missing:
+                raise
+        else:
+            self._deferred = bool(tracked.missing)
+
+    def feed(self, chunk: bytes) -> Iterable[Dict]:
+        try:
+            return self._stream.feed(chunk)
+        except JSONStreamError as e:
+            raise ProviderError(str(e))
+
+    def close(self) -> Iterable[Dict]:
+        try:
+            items = self._stream.close()
+        except JSONStreamError as e:
+            raise ProviderError(str(e))
+        self.check(self._stream.meta)
+        return items
+
+
+class BufferedJSONParser:
+    """收齐响应体后解码JSON，再交给extract取出文章（用于文章不在顶层数组中的API）"""
+
+    needs_tail = True
+
+    def __init__(self, extract: Callable[[Any], Iterable[Dict]]):
+        self.extract = extract
+        self._body = bytearray()
+
+    def feed(self, chunk: bytes) -> Iterable[Dict]:
+        self._body += chunk
+        return ()
+
+    def close(self) -> Iterable[Dict]:
+        try:
+            payload = json.loads(self._body)
+        except ValueError as e:
+            raise ProviderError(f"JSON解析失败: {e}")
+        return self.extract(payload)
+
+
+class NewsProvider(abc.ABC):
+    """
+    新闻源插件基类
+
+    子类需要设置name，并实现：
+    - page_requests(): 按页产出请求（大多数API只需一页）
+    - items_key + check(): 文章所在的顶层数组字段，以及根据其他顶层字段判断业务错误
+      （抛出ProviderError），响应按流式解析；文章不在顶层数组中时改为覆盖extract()
+    - normalize(): 原始文章 -> NewsItem（category留空时由Hub按标题分类）
+    """
+
+    name = ''
+    label = ''                      # 日志中显示的名称，默认同name
+    env_key: Optional[str] = None   # 保存API密钥（或其他必需配置）的环境变量，None表示无需配置
+    language = 'en'                 # 标题语言，决定使用哪套分类关键词
+    default_query = 'technology'
+    supports_since = False          # 是否支持服务端按时间过滤
+    max_page_size = 10
+    parallel_pages = False          # 各页互相独立（如多个RSS源）时并发请求
+    cache_ttl = 60                  # 相同请求的响应缓存秒数
+    items_key: Optional[str] = None # 响应中文章数组的顶层字段名
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key if api_key is not None else os.getenv(self.env_key or '', '')
+
+    @property
+    def display_name(self) -> str:
+        return self.label or self.name
+
+    @property
+    def configured(self) -> bool:
+        return self.env_key is None or bool(self.api_key)
+
+    @property
+    def uses_quota(self) -> bool:
+        """只有需要密钥的API计入每日配额"""
+        return bool(self.api_key)
+
+    @abc.abstractmethod
+    def page_requests(self, query: str, num_results: int,
+                      since: Optional[str]) -> Iterator[ProviderRequest]:
+        """按页产出请求"""
+
+    def new_parser(self, request: ProviderRequest):
+        """
+        响应解析器：feed(chunk)和close()都返回已解析完的原始文章，close()同时做最终的业务错误检查；
+        needs_tail为False时收够文章即可提前停止下载（没有该属性时总是读完）
+        """
+        if self.items_key:
+            return StreamingJSONParser(self.items_key, self.check)
+        return BufferedJSONParser(self.extract)
+
+    def check(self, meta: Dict[str, Any]):
+        """根据响应的顶层字段判断业务错误"""
+
+    def extract(self, payload: Any) -> Iterable[Dict]:
+        self.check(payload)
+        return payload.get(self.items_key) or []
+
+    @abc.abstractmethod
+    def normalize(self, raw: Dict) -> Optional[NewsItem]:
+        """原始文章 -> NewsItem，返回None表示跳过该文章"""
+
+
+_REGISTRY: Dict[str, Type[NewsProvider]] = {}
+_entry_points_loaded = False
+
+
+def register_provider(cls: Type[NewsProvider]) -> Type[NewsProvider]:
+    """
+    注册新闻源（可作为类装饰器使用），同名时后注册的覆盖先注册的
+
+    Raises:
+        ValueError: 没有设置name
+        TypeError: 没有实现全部抽象方法
+    """
+    if not cls.name:
+        raise ValueError(f"{cls.__name__} 没有设置name")
+    if inspect.isabstract(cls):
+        raise TypeError(f"新闻源 {cls.__name__} 未实现: {', '.join(sorted(cls.__abstractmethods__))}")
+    _REGISTRY[cls.name] = cls
+    return cls
+
+
+def load_entry_point_providers() -> List[str]:
+    """加载通过entry point注册的第三方新闻源（只加载一次）"""
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return []
+    _entry_points_loaded = True
+
+    from importlib.metadata import entry_points
+    loaded = []
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            register_provider(ep.load())
+            loaded.append(ep.name)
+        except Exception as e:
+            print(f"⚠️ 加载新闻源插件失败 {ep.name}: {e}")
+    return loaded
+
+
+def provider_names() -> List[str]:
+    """已注册的新闻源（按注册顺序，即默认优先级）"""
+    import builtin_providers  # noqa: F401  注册内置新闻源
+    load_entry_point_providers()
+    return list(_REGISTRY)
+
+
+def create_provider(name: str, **kwargs) -> NewsProvider:
+    provider_names()
+    return _REGISTRY[name](**kwargs)
+
+
+class ResponseCache:
+    """新闻源响应缓存（SQLite，按请求哈希），短时间内重复请求不再消耗配额"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or state_path('provider_cache.sqlite3')
+        with self._connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY, body BLOB, fetched_at REAL)''')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def key(provider: str, request: ProviderRequest) -> str:
+        raw = json.dumps([provider, request.url, request.params, request.headers],
+                         sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, ttl: float) -> Optional[bytes]:
+        with self._connect() as conn:
+            row = conn.execute('SELECT body, fetched_at FROM responses WHERE key=?', (key,)).fetchone()
+        if row and time.time() - row[1] <= ttl:
+            return row[0]
+        return None
+
+    def put(self, key: str, body: bytes):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?)', (key, body, time.time()))
+            # 顺带清理一天前的条目
+            conn.execute('DELETE FROM responses WHERE fetched_at < ?', (time.time() - 86400,))
+
+
+class ProviderHub:
+    """为所有新闻源提供共享连接池、响应缓存、配额、健康度记录和并发"""
+
+    def __init__(self, quota=None, router=None,
+                 categorize: Optional[Callable[[str, str], str]] = None,
+                 cache: Optional[ResponseCache] = None, max_connections: int = 8):
+        """
+        Args:
+            quota: QuotaManager，为空时不做配额控制
+            router: ProviderRouter，为空时不记录健康度
+            categorize: (标题, 语言) -> 类别
+            cache: 响应缓存，默认放在状态目录
+            max_connections: 连接池大小（也是最大并发请求数）
+        """
+        self.quota = quota
+        self.router = router
+        self.categorize = categorize
+        self.cache = cache or ResponseCache()
+        self.max_connections = max_connections
+
+    # ---- 单个请求 ----
+
+    async def _acquire(self, provider: NewsProvider) -> bool:
+        if self.quota is None or not provider.uses_quota:
+            return True
+        # 配额在SQLite中加锁扣减，可能等待令牌，放到线程里避免阻塞事件循环
+        return await asyncio.to_thread(self.quota.acquire, provider.name, provider.api_key)
+
+    def _failure(self, provider: NewsProvider, latency: float, error: str,
+                 quota_exhausted: bool = False, counted: bool = True):
+        if quota_exhausted and self.quota is not None and provider.uses_quota:
+            self.quota.mark_exhausted(provider.name, provider.api_key)
+        if self.router is not None:
+            self.router.record_failure(provider.name, latency, error,
+                                       quota_exhausted=quota_exhausted, counted=counted)
+
+    @staticmethod
+    def _observe(provider: NewsProvider, request: ProviderRequest, start: float, outcome: str,
+                 articles: int, **fields):
+        latency = time.time() - start
+        metrics.observe('tech_news_fetch_seconds', latency, provider=provider.name)
+        metrics.inc('tech_news_fetch_requests_total', provider=provider.name, outcome=outcome)
+        event('provider.request', logging.INFO if outcome == 'ok' else logging.WARNING,
+              url=request.url, outcome=outcome, latency_ms=round(latency * 1000, 1),
+              articles=articles, **fields)
+
+    async def _request(self, client: AsyncHTTPClient, provider: NewsProvider,
+                       request: ProviderRequest, accept: Callable[[Dict], bool], wanted: int) -> int:
+        """
+        请求一页并边下载边解析，每篇文章解析完立即交给accept（转换、去重），收够wanted篇后提前停止
+
+        收够之后，如果业务错误要看文章数组之后的字段，则继续读完响应（不再处理文章），
+        由parser.close()做最终检查，避免把错误响应记为成功
+
+        Returns:
+            本页解析出的原始文章数
+        """
+        parser = provider.new_parser(request)
+        seen = accepted = 0
+
+        def consume(raw_articles) -> bool:
+            nonlocal seen, accepted
+            if accepted >= wanted:
+                return True
+            for raw in raw_articles:
+                seen += 1
+                if accept(raw):
+                    accepted += 1
+                    if accepted >= wanted:
+                        break
+            return accepted >= wanted
+
+        key = ResponseCache.key(provider.name, request)
+        cached = self.cache.get(key, provider.cache_ttl) if provider.cache_ttl else None
+        if cached is not None:
+            consume(parser.feed(cached))
+            consume(parser.close())
+            metrics.inc('tech_news_fetch_requests_total', provider=provider.name, outcome='cached')
+            event('provider.request', url=request.url, outcome='cached', articles=seen)
+            return seen
+
+        if not await self._acquire(provider):
+            remaining = self.quota.remaining(provider.name, provider.api_key)
+            raise HTTPError(f"本次运行配额已用完（当日剩余 {remaining} 次）")
+
+        timeout = self.router.timeout_for(provider.name) if self.router is not None else client.timeout
+        start = time.time()
+        body: Optional[bytearray] = bytearray() if provider.cache_ttl else None
+        complete = False
+        try:
+            chunks = client.iter_chunks(request.url, params=request.params, headers=request.headers,
+                                        max_bytes=MAX_RESPONSE_BYTES)
+            try:
+                async with asyncio.timeout(timeout):
+                    async for chunk in chunks:
+                        if body is not None:
+                            body += chunk
+                            if len(body) > MAX_CACHED_BYTES:
+                                body = None
+                        if consume(parser.feed(chunk)) and not getattr(parser, 'needs_tail', True):
+                            break
+                    else:
+                        complete = True
+            finally:
+                await chunks.aclose()
+            if complete:
+                consume(parser.close())
+        except (HTTPError, TimeoutError) as e:
+            status = getattr(e, 'status', None)
+            self._failure(provider, time.time() - start, str(e) or '请求超时',
+                          quota_exhausted=status == 429, counted=status is not None)
+            self._observe(provider, request, start, 'http_error', seen, status=status, error=str(e))
+            raise HTTPError(str(e) or '请求超时', status) from e
+        except ProviderError as e:
+            self._failure(provider, time.time() - start, str(e),
+                          quota_exhausted=e.quota_exhausted, counted=False)
+            self._observe(provider, request, start, 'provider_error', seen, error=str(e))
+            raise
+
+        if self.router is not None:
+            self.router.record_success(provider.name, time.time() - start)
+        self._observe(provider, request, start, 'ok', seen)
+        if complete and body is not None:
+            self.cache.put(key, bytes(body))
+        return seen
+
+    # ---- 单个新闻源 ----
+
+    def _to_item(self, provider: NewsProvider, raw: Dict) -> Optional[NewsItem]:
+        item = provider.normalize(raw)
+        if item is None or not item.title:
+            return None
+        item.from_api = item.from_api or provider.name
+        if not item.category and self.categorize is not None:
+            item.category = self.categorize(item.title, provider.language)
+        item.category = item.category or '科技'
+        return item
+
+    async def fetch(self, client: AsyncHTTPClient, provider: NewsProvider, query: str = '',
+                    num_results: int = 10, since: Optional[str] = None) -> List[NewsItem]:
+        """
+        从一个新闻源获取新闻（按标题去重）
+
+        请求失败或返回业务错误时打印原因并返回已获取的部分（可能为空）
+        """
+        with bind(provider=provider.name):
+            items = await self._fetch(client, provider, query, num_results, since)
+            event('provider.fetch', articles=len(items), since=since)
+        return items
+
+    async def _fetch(self, client: AsyncHTTPClient, provider: NewsProvider, query: str,
+                     num_results: int, since: Optional[str]) -> List[NewsItem]:
+        if not provider.configured:
+            print(f"⚠️ 未配置{provider.env_key}，跳过{provider.display_name}")
+            return []
+
+        items: List[NewsItem] = []
+        titles = set()
+
+        def accept(raw: Dict) -> bool:
+            item = self._to_item(provider, raw)
+            if item is None or item.title in titles:
+                return False
+            titles.add(item.title)
+            items.append(item)
+            return True
+
+        requests_iter = provider.page_requests(query or provider.default_query, num_results, since)
+        try:
+            if provider.parallel_pages:
+                semaphore = asyncio.Semaphore(self.max_connections)
+
+                async def one(request):
+                    async with semaphore:
+                        try:
+                            await self._request(client, provider, request, accept, num_results)
+                        except (HTTPError, ProviderError) as e:
+                            print(f"⚠️ {provider.display_name}请求失败 [{request.url}]: {e}")
+
+                await asyncio.gather(*(one(r) for r in requests_iter))
+                # 多个源合并后按发布时间取最新的
+                items.sort(key=lambda n: n.published_at, reverse=True)
+            else:
+                for request in requests_iter:
+                    page_size = await self._request(client, provider, request, accept,
+                                                    num_results - len(items))
+                    if len(items) >= num_results or page_size < provider.max_page_size:
+                        break
+        except ProviderError as e:
+            print(f"⚠️ {provider.display_name}返回错误: {e}")
+            return items[:num_results]
+        except HTTPError as e:
+            print(f"❌ {provider.display_name}请求失败: {e}")
+            return items[:num_results]
+
+        items = items[:num_results]
+        print(f"✅ {provider.display_name}获取成功: {len(items)}条")
+        return items
+
+    def client(self) -> AsyncHTTPClient:
+        """新建连接池，供一批请求共享（async with使用，结束时关闭）"""
+        return AsyncHTTPClient(max_connections=self.max_connections)
+
+    async def fetch_many(self, jobs: Iterable[Tuple[NewsProvider, str, int, Optional[str]]]
+                         ) -> List[List[NewsItem]]:
+        """共享一个连接池并发获取多个(新闻源, 查询, 数量, since)"""
+        async with self.client() as client:
+            return await asyncio.gather(*(self.fetch(client, provider, query, n, since)
+                                          for provider, query, n, since in jobs))
+
+    def fetch_sync(self, provider: NewsProvider, query: str = '', num_results: int = 10,
+                   since: Optional[str] = None) -> List[NewsItem]:
+        """同步入口"""
+        return asyncio.run(self.fetch_many([(provider, query, num_results, since)]))[0]
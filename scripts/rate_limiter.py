@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+API配额与限速模块
+按API密钥维护令牌桶和每日请求预算，状态保存在SQLite中，多个进程共享
+
+- 令牌桶限制短时间内的突发请求
+- 每日预算按当天剩余的定时运行次数平均分配，避免前几次运行用光配额
+- 每次请求API前都要先调用acquire()
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+from state_store import state_path
+
+# 各API限额：daily=每日请求数，burst=令牌桶容量，rate=每秒补充令牌数
+PROVIDER_LIMITS = {
+    'NewsAPI': {'daily': 100, 'burst': 5, 'rate': 1.0},
+    'GNews': {'daily': 100, 'burst': 5, 'rate': 1.0},
+    'TianXing': {'daily': 100, 'burst': 5, 'rate': 1.0},
+}
+
+DEFAULT_LIMITS = {'daily': 100, 'burst': 5, 'rate': 1.0}
+
+# 内置API的密钥环境变量（status等轻量命令据此读取密钥，不需要加载新闻源插件）
+PROVIDER_ENV_KEYS = {
+    'NewsAPI': 'NEWSAPI_KEY',
+    'GNews': 'GNEWS_KEY',
+    'TianXing': 'TIANXING_KEY',
+}
+
+# 令牌不足时最多等待的秒数
+MAX_WAIT = 5.0
+
+
+def _key_id(provider: str, api_key: str) -> str:
+    """配额按API密钥区分，数据库中只保存密钥的哈希"""
+    digest = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+    return f"{provider}:{digest}"
+
+
+class QuotaManager:
+    """跨进程共享的令牌桶 + 每日预算"""
+
+    def __init__(self, db_path: Optional[str] = None, runs_per_day: Optional[int] = None):
+        """
+        Args:
+            db_path: SQLite数据库路径，默认放在状态目录
+            runs_per_day: 每天定时运行次数（默认读取TECH_NEWS_RUNS_PER_DAY，否则为1）
+        """
+        self.db_path = db_path or state_path('quota.sqlite3')
+        self.runs_per_day = runs_per_day or int(os.getenv('TECH_NEWS_RUNS_PER_DAY', '1') or 1)
+        # 本次运行中各密钥已使用的请求数
+        self.run_used: Dict[str, int] = {}
+        self._init_db()
+
+    def begin_run(self):
+        """开始新的一次运行：清空本次运行的用量（同一进程中多次运行或轮询时每次开始前调用）"""
+        self.run_used.clear()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS budget (
+                key TEXT NOT NULL, day TEXT NOT NULL, used INTEGER NOT NULL,
+                PRIMARY KEY (key, day))''')
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now().strftime('%Y-%m-%d')
+
+    def _remaining_runs(self) -> int:
+        """按当天剩余时间估算还有几次定时运行（包括本次）"""
+        now = datetime.now()
+        seconds_left = 86400 - (now.hour * 3600 + now.minute * 60 + now.second)
+        return max(1, math.ceil(self.runs_per_day * seconds_left / 86400))
+
+    def _used_today(self, conn: sqlite3.Connection, key: str) -> int:
+        row = conn.execute('SELECT used FROM budget WHERE key=? AND day=?',
+                           (key, self._today())).fetchone()
+        return row[0] if row else 0
+
+    def _plan(self, provider: str, key: str, used: int) -> Dict[str, int]:
+        limits = PROVIDER_LIMITS.get(provider, DEFAULT_LIMITS)
+        remaining = max(0, limits['daily'] - used)
+        run_used = self.run_used.get(key, 0)
+        # 本次运行可用 = 运行开始时的剩余量 / 剩余运行次数
+        allowance = math.ceil((remaining + run_used) / self._remaining_runs())
+        return {
+            'daily_limit': limits['daily'],
+            'used_today': used,
+            'remaining': remaining,
+            'run_allowance': allowance,
+            'run_used': run_used,
+        }
+
+    def acquire(self, provider: str, api_key: str, cost: int = 1,
+                max_wait: float = MAX_WAIT) -> bool:
+        """
+        请求前申请配额
+
+        Returns:
+            True表示可以发起请求（已扣除令牌和当日预算），False表示应跳过
+        """
+        key = _key_id(provider, api_key)
+        limits = PROVIDER_LIMITS.get(provider, DEFAULT_LIMITS)
+        deadline = time.time() + max_wait
+
+        while True:
+            with self._connect() as conn:
+                # BEGIN IMMEDIATE 获取写锁，保证多进程下读-改-写是原子的
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    plan = self._plan(provider, key, self._used_today(conn, key))
+                    if plan['remaining'] < cost or plan['run_used'] + cost > plan['run_allowance']:
+                        conn.execute('ROLLBACK')
+                        return False
+
+                    now = time.time()
+                    row = conn.execute('SELECT tokens, updated FROM buckets WHERE key=?',
+                                       (key,)).fetchone()
+                    tokens, updated = row if row else (limits['burst'], now)
+                    tokens = min(limits['burst'], tokens + (now - updated) * limits['rate'])
+
+                    if tokens >= cost:
+                        conn.execute('INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)',
+                                     (key, tokens - cost, now))
+                        conn.execute('''INSERT INTO budget VALUES (?, ?, ?)
+                                        ON CONFLICT(key, day) DO UPDATE SET used = used + ?''',
+                                     (key, self._today(), cost, cost))
+                        conn.execute('COMMIT')
+                        self.run_used[key] = self.run_used.get(key, 0) + cost
+                        return True
+
+                    conn.execute('ROLLBACK')
+                    wait = (cost - tokens) / limits['rate']
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    raise
+
+            if time.time() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def mark_exhausted(self, provider: str, api_key: str):
+        """收到429时把当日预算记满，后续运行不再请求"""
+        key = _key_id(provider, api_key)
+        daily = PROVIDER_LIMITS.get(provider, DEFAULT_LIMITS)['daily']
+        with self._connect() as conn:
+            conn.execute('''INSERT INTO budget VALUES (?, ?, ?)
+                            ON CONFLICT(key, day) DO UPDATE SET used = MAX(used, ?)''',
+                         (key, self._today(), daily, daily))
+
+    def remaining(self, provider: str, api_key: str) -> int:
+        """当日剩余请求数"""
+        key = _key_id(provider, api_key)
+        with self._connect() as conn:
+            return self._plan(provider, key, self._used_today(conn, key))['remaining']
+
+    def report(self, api_keys: Dict[str, str]) -> Dict[str, Dict[str, int]]:
+        """
+        配额使用报告（写入运行报告）
+
+        Args:
+            api_keys: {API名称: 密钥}，未配置密钥的API会被忽略
+        """
+        report = {}
+        with self._connect() as conn:
+            for provider, api_key in api_keys.items():
+                if not api_key:
+                    continue
+                key = _key_id(provider, api_key)
+                report[provider] = self._plan(provider, key, self._used_today(conn, key))
+        return report
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+图片渲染服务
+常驻进程，通过本地HTTP接口按需渲染新闻卡片，避免每次都启动完整流程
+
+- 每个工作线程持有一个预热好的XiaohongshuImageGenerator（字体、渐变背景、卡片素材常驻内存）
+- 请求进入有界队列，队列满时立即返回503（附Retry-After），不会无限堆积
+- 接口：
+    POST /render   {"news": [...], "pages": ["cover", "detail", "summary"],
+                    "trends": {...}, "format": "jpeg"|"png", "quality": 90}
+                   -> {"images": {"cover": "<base64>", ...}, "format": "jpeg", "render_ms": 123.4}
+    GET  /healthz  -> {"status": "ok", "workers": 2, "queued": 0, ...}
+    GET  /metrics  -> 渲染耗时直方图、队列长度等（Prometheus文本格式）
+"""
+
+import base64
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from image_generator import XiaohongshuImageGenerator
+from news_item import NewsItem
+from telemetry import metrics, timed
+
+PAGES = ('cover', 'detail', 'summary')
+
+# 单个请求最多等待渲染的时间（秒）
+REQUEST_TIMEOUT = 60
+
+# 请求体上限
+MAX_REQUEST_BYTES = 1024 * 1024
+
+
+class ServiceBusy(Exception):
+    """渲染队列已满"""
+
+
+class RenderService:
+    """渲染工作线程池 + 有界请求队列"""
+
+    def __init__(self, workers: int = 2, queue_size: int = 8):
+        """
+        Args:
+            workers: 工作线程数（每个线程一个生成器实例）
+            queue_size: 等待中的请求上限，超出时拒绝新请求
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: 'queue.Queue' = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        self._ready = threading.Barrier(workers + 1)
+        self.stats = {'rendered': 0, 'rejected': 0, 'failed': 0}
+        self._stats_lock = threading.Lock()
+
+    def start(self):
+        """启动工作线程，并等待所有生成器预热完成"""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"render-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._ready.wait()
+
+    def stop(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _worker(self):
+        generator = XiaohongshuImageGenerator()
+        generator.warm_assets()
+        generator.create_gradient_background()
+        self._ready.wait()
+
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            future, request = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._render(generator, request))
+                self._count('rendered')
+            except Exception as e:
+                future.set_exception(e)
+                self._count('failed')
+
+    @staticmethod
+    def _render(generator: XiaohongshuImageGenerator, request: Dict) -> Dict:
+        start = time.perf_counter()
+        news_list = request['news']
+        fmt = request['format']
+        images = {}
+        for page in request['pages']:
+            with timed('tech_news_render_seconds', page=page):
+                if page == 'cover':
+                    img = generator.render_cover(news_list)
+                elif page == 'detail':
+                    img = generator.render_detail(news_list)
+                else:
+                    img = generator.render_summary(request.get('trends'))
+                images[page] = generator.encode(img, fmt, request['quality'])
+        return {
+            'images': images,
+            'format': fmt.lower(),
+            'render_ms': round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    def submit(self, request: Dict) -> Future:
+        """
+        提交渲染请求
+
+        Raises:
+            ServiceBusy: 队列已满
+        """
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((future, request))
+        except queue.Full:
+            self._count('rejected')
+            raise ServiceBusy(f"渲染队列已满（{self.queue_size}）")
+        return future
+
+    def health(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return dict(stats, status='ok', workers=len(self._threads),
+                    queued=self._queue.qsize(), queue_size=self.queue_size)
+
+
+def parse_render_request(payload: Dict) -> Dict:
+    """
+    校验并规范化请求体
+
+    Raises:
+        ValueError: 请求体不合法
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("请求体必须是JSON对象")
+    news = payload.get('news')
+    if not isinstance(news, list) or not all(isinstance(n, dict) for n in news):
+        raise ValueError("news必须是新闻对象列表")
+    try:
+        news_list = [NewsItem.from_dict(n) for n in news]
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"新闻格式不正确: {e}")
+
+    pages = payload.get('pages') or list(PAGES)
+    if not isinstance(pages, list):
+        raise ValueError("pages必须是页面列表")
+    unknown = [p for p in pages if p not in PAGES]
+    if unknown:
+        raise ValueError(f"未知页面: {', '.join(map(str, unknown))}")
+
+    fmt = str(payload.get('format', 'jpeg')).upper()
+    if fmt not in ('JPEG', 'JPG', 'PNG'):
+        raise ValueError(f"不支持的格式: {fmt}")
+
+    quality = payload.get('quality', 90)
+    if isinstance(quality, bool) or not isinstance(quality, (int, float)):
+        raise ValueError(f"quality必须是数字: {quality!r}")
+    quality = int(quality)
+    return {
+        'news': news_list,
+        'pages': pages,
+        'trends': payload.get('trends'),
+        'format': 'PNG' if fmt == 'PNG' else 'JPEG',
+        'quality': max(1, min(quality, 95)),
+    }
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    service: RenderService = None
+
+    def _send_json(self, status: int, data: Dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/healthz':
+            self._send_json(200, self.service.health())
+        elif self.path == '/metrics':
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/render':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_REQUEST_BYTES:
+            self._send_json(413, {'error': f"请求体超过{MAX_REQUEST_BYTES}字节"})
+            return
+        try:
+            request = parse_render_request(json.loads(self.rfile.read(length) or b'{}'))
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        try:
+            future = self.service.submit(request)
+        except ServiceBusy as e:
+            self._send_json(503, {'error': str(e)}, {'Retry-After': '1'})
+            return
+
+        try:
+            result = future.result(timeout=REQUEST_TIMEOUT)
+        except Exception as e:
+            future.cancel()
+            self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+
+        result['images'] = {page: base64.b64encode(data).decode('ascii')
+                            for page, data in result['images'].items()}
+        self._send_json(200, result)
+
+    def log_message(self, format, *args):
+        print(f"🖼️ {self.address_string()} {format % args}")
+
+
+def serve(host: str = '127.0.0.1', port: int = 8808, workers: int = 2, queue_size: int = 8):
+    """启动渲染服务（阻塞直到Ctrl+C）"""
+    service = RenderService(workers=workers, queue_size=queue_size)
+    metrics.gauge_callback('tech_news_render_queue_depth', service._queue.qsize)
+    print(f"🔥 预热 {workers} 个渲染线程...")
+    service.start()
+
+    handler = type('Handler', (RenderRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"🚀 渲染服务已启动: http://{host}:{port}/render （队列上限 {queue_size}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        print("👋 渲染服务已停止")
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+输出目录保留与压缩模块
+每次运行结束后增量整理output/，让磁盘占用和目录扫描量不随运行年数增长
+
+- 超过REPORT_DAYS天的运行报告按月追加到压缩的JSONL归档（archive/reports-YYYY-MM.jsonl.gz，
+  安装了zstandard时为.jsonl.zst），原文件删除
+- 运行目录和笔记目录中内容相同的图片按sha256去重，重复文件改为硬链接
+- 超过DOWNSAMPLE_DAYS天的图片缩小一半重新编码；超过PRUNE_DAYS天的运行目录整体删除，
+  笔记目录只保留文字（note.txt仍在检索索引中）
+- 超过REPORT_DAYS天的性能分析目录删除
+- 状态目录中久未使用的新闻配图缩略图删除（见thumbnails.ThumbnailCache.prune）
+
+已处理的运行和图片记录在清单文件（.retention.json）中，每次只处理新增和到期的内容。
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from PIL import Image
+
+from run_context import is_note_dir_name, publish_lock
+from state_store import load_json, save_json_atomic
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖，未安装时使用gzip
+    zstandard = None
+
+# 运行报告和性能分析保留天数
+REPORT_DAYS = 7
+
+# 图片缩小重编码、删除的天数
+DOWNSAMPLE_DAYS = 14
+PRUNE_DAYS = 90
+
+# 缩小后的JPEG质量
+DOWNSAMPLE_QUALITY = 80
+
+MANIFEST_NAME = '.retention.json'
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+
+
+def _date_from_name(name: str) -> Optional[str]:
+    """从 report_YYYYMMDD_...、profile_YYYYMMDD_...、YYYYMMDD_...（运行ID）或 YYYYMMDD 中取日期"""
+    if name[:1].isdigit():
+        digits = name[:8]
+    else:
+        digits = name.partition('_')[2][:8]
+    if len(digits) != 8 or not digits.isdigit():
+        return None
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:]}"
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _relink(src: str, dst: str) -> bool:
+    """用指向src的硬链接原子替换dst（跨设备或不支持硬链接时返回False）"""
+    tmp_link = f"{dst}.{os.getpid()}.link"
+    try:
+        os.link(src, tmp_link)
+        os.replace(tmp_link, dst)
+        return True
+    except OSError:
+        try:
+            os.unlink(tmp_link)
+        except OSError:
+            pass
+        return False
+
+
+def _append_compressed(path: str, data: bytes):
+    """追加一个压缩帧/成员，gzip和zstd都支持多段拼接，不需要重写整个归档"""
+    if zstandard is not None and path.endswith('.zst'):
+        with open(path, 'ab') as f:
+            f.write(zstandard.ZstdCompressor(level=10).compress(data))
+    else:
+        with gzip.open(path, 'ab') as f:
+            f.write(data)
+
+
+def iter_archived_reports(output_dir: str) -> Iterator[Dict]:
+    """按时间顺序读出归档中的运行报告"""
+    archive_dir = os.path.join(output_dir, 'archive')
+    if not os.path.isdir(archive_dir):
+        return
+    for name in sorted(os.listdir(archive_dir)):
+        path = os.path.join(archive_dir, name)
+        if name.endswith('.jsonl.gz'):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        elif name.endswith('.jsonl.zst') and zstandard is not None:
+            with open(path, 'rb') as f:
+                reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+                lines = reader.read().decode('utf-8').splitlines()
+        else:
+            continue
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+class RetentionManager:
+    """按策略整理输出目录"""
+
+    def __init__(self, output_dir: str, report_days: int = REPORT_DAYS,
+                 downsample_days: int = DOWNSAMPLE_DAYS, prune_days: int = PRUNE_DAYS):
+        self.output_dir = output_dir
+        self.report_days = report_days
+        self.downsample_days = downsample_days
+        self.prune_days = prune_days
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        self.manifest = load_json(self.manifest_path, {})
+        self.manifest.setdefault('runs', [])          # 已去重的运行ID
+        self.manifest.setdefault('notes', [])         # 已去重的笔记目录名
+        self.manifest.setdefault('pruned_notes', [])  # 已删除图片、只保留文字的笔记目录名
+        # sha256 -> {paths: {路径: 所在目录的日期}, downsampled, reduced: 缩小后文件的sha256}
+        self.manifest.setdefault('images', {})
+        for group in self.manifest['images'].values():
+            # 旧版清单整组只记一个日期
+            if isinstance(group['paths'], list):
+                group['paths'] = dict.fromkeys(group['paths'], group.pop('date', None))
+
+    def _cutoff(self, today: str, days: int) -> str:
+        return (datetime.strptime(today, '%Y-%m-%d') - timedelta(days=days)).strftime('%Y-%m-%d')
+
+    def run(self, today: Optional[str] = None) -> Dict[str, int]:
+        """
+        执行一次整理
+
+        Returns:
+            各项处理数量
+        """
+        today = today or datetime.now().strftime('%Y-%m-%d')
+        stats = {'reports_archived': 0, 'profiles_removed': 0, 'images_deduped': 0,
+                 'images_downsampled': 0, 'runs_pruned': 0, 'notes_pruned': 0,
+                 'thumbnails_pruned': 0, 'bytes_freed': 0}
+
+        # 与发布互斥，避免整理到正在发布的运行
+        with publish_lock(self.output_dir):
+            self._compact_top_level(today, stats)
+            self._dedup_new_images(today, stats)
+            self._downsample(today, stats)
+            self._prune(today, stats)
+            save_json_atomic(self.manifest_path, self.manifest)
+        self._prune_thumbnails(stats)
+        return stats
+
+    # ---- 报告与性能分析 ----
+
+    def _compact_top_level(self, today: str, stats: Dict[str, int]):
+        cutoff = self._cutoff(today, self.report_days)
+        archive_dir = os.path.join(self.output_dir, 'archive')
+        ext = '.jsonl.zst' if zstandard is not None else '.jsonl.gz'
+
+        monthly: Dict[str, List[str]] = {}
+        for entry in os.scandir(self.output_dir):
+            date = _date_from_name(entry.name)
+            if date is None or date >= cutoff:
+                continue
+            if entry.is_file() and entry.name.startswith('report_') and entry.name.endswith('.json'):
+                monthly.setdefault(date[:7], []).append(entry.path)
+            elif entry.is_dir() and entry.name.startswith('profile_'):
+                stats['bytes_freed'] += self._tree_size(entry.path)
+                shutil.rmtree(entry.path, ignore_errors=True)
+                stats['profiles_removed'] += 1
+
+        for month, paths in sorted(monthly.items()):
+            lines = []
+            for path in sorted(paths):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        report = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                report.setdefault('report_file', os.path.basename(path))
+                lines.append(json.dumps(report, ensure_ascii=False, separators=(',', ':')))
+            if lines:
+                os.makedirs(archive_dir, exist_ok=True)
+                _append_compressed(os.path.join(archive_dir, f"reports-{month}{ext}"),
+                                   ('\n'.join(lines) + '\n').encode('utf-8'))
+            # 先写入归档再删除原文件，中途失败最多导致下次重复归档，不会丢报告
+            for path in paths:
+                stats['bytes_freed'] += os.path.getsize(path)
+                os.unlink(path)
+                stats['reports_archived'] += 1
+
+    # ---- 图片去重 ----
+
+    def _new_image_dirs(self, today: str) -> List[tuple]:
+        """尚未去重的 (类型, 名称, 目录, 日期)"""
+        dirs = []
+        done_runs = set(self.manifest['runs'])
+        runs_root = os.path.join(self.output_dir, 'runs')
+        if os.path.isdir(runs_root):
+            for entry in os.scandir(runs_root):
+                if entry.is_dir() and entry.name not in done_runs:
+                    dirs.append(('runs', entry.name, entry.path, _date_from_name(entry.name)))
+        # 旧版按日期命名的当天笔记目录还可能被重跑整体替换，第二天再处理
+        done_notes = set(self.manifest['notes']) | set(self.manifest['pruned_notes'])
+        done_notes.add(today.replace('-', ''))
+        for entry in os.scandir(self.output_dir):
+            if entry.is_dir() and is_note_dir_name(entry.name) and entry.name not in done_notes:
+                dirs.append(('notes', entry.name, entry.path, _date_from_name(entry.name)))
+        return dirs
+
+    def _dedup_new_images(self, today: str, stats: Dict[str, int]):
+        images = self.manifest['images']
+        for kind, name, directory, date in sorted(self._new_image_dirs(today), key=lambda d: d[1]):
+            for file_name in sorted(os.listdir(directory)):
+                if not file_name.lower().endswith(IMAGE_EXTS):
+                    continue
+                path = os.path.join(directory, file_name)
+                digest = _sha256(path)
+                group = images.setdefault(digest, {'paths': {}, 'downsampled': False})
+                if path in group['paths']:
+                    continue
+                canonical = next((p for p in group['paths'] if os.path.exists(p)), None)
+                if canonical is not None and not os.path.samefile(canonical, path):
+                    size = os.path.getsize(path)
+                    if _relink(canonical, path):
+                        stats['images_deduped'] += 1
+                        stats['bytes_freed'] += size
+                # 每个路径记自己的日期，同组中较新的副本不会随最早的副本一起被缩小
+                group['paths'][path] = date
+            self.manifest[kind].append(name)
+
+    # ---- 缩小与删除 ----
+
+    def _downsample(self, today: str, stats: Dict[str, int]):
+        """
+        缩小本身已超过DOWNSAMPLE_DAYS天的路径
+
+        原图组中到期的路径移到缩小后的组，较新的副本仍保留原图；原图组保留reduced指向缩小后的组，
+        之后到期的相同原图直接链接到已缩小的文件，不会重复重编码
+        """
+        cutoff = self._cutoff(today, self.downsample_days)
+        images = self.manifest['images']
+        for digest, group in list(images.items()):
+            if group['downsampled']:
+                continue
+            group['paths'] = {p: d for p, d in group['paths'].items() if os.path.exists(p)}
+            expired = [p for p, d in group['paths'].items() if d and d < cutoff]
+            if not expired:
+                continue
+
+            reduced = images.get(group.get('reduced'))
+            target = next((p for p in reduced['paths'] if os.path.exists(p)), None) if reduced else None
+            if target is None:
+                target = expired[0]
+                size = os.path.getsize(target)
+                if not self._reduce(target):
+                    continue
+                stats['images_downsampled'] += 1
+                stats['bytes_freed'] += max(0, size - os.path.getsize(target))
+                group['reduced'] = _sha256(target)
+                reduced = images.setdefault(group['reduced'], {'paths': {}, 'downsampled': True})
+
+            for path in expired:
+                if path != target:
+                    _relink(target, path)
+                reduced['paths'][path] = group['paths'].pop(path)
+
+    @staticmethod
+    def _reduce(path: str) -> bool:
+        """把图片缩小一半后原子替换该路径（同一文件的其他硬链接仍指向原图）"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            # 重编码时保持与扩展名一致的格式
+            with Image.open(path) as img:
+                if path.lower().endswith('.png'):
+                    img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info
+                                      else 'RGB')
+                    img.reduce(2).save(tmp_path, 'PNG', optimize=True)
+                else:
+                    img = img.convert('RGB')
+                    img.reduce(2).save(tmp_path, 'JPEG', quality=DOWNSAMPLE_QUALITY, optimize=True)
+            os.replace(tmp_path, path)
+            return True
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 缩小图片失败: {path} ({e})")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return False
+
+    def _prune(self, today: str, stats: Dict[str, int]):
+        cutoff = self._cutoff(today, self.prune_days)
+        removed = set()
+
+        runs_root = os.path.join(self.output_dir, 'runs')
+        if os.path.isdir(runs_root):
+            for entry in os.scandir(runs_root):
+                date = _date_from_name(entry.name)
+                if entry.is_dir() and date and date < cutoff:
+                    removed.update(os.path.join(entry.path, n) for n in os.listdir(entry.path))
+                    stats['bytes_freed'] += self._tree_size(entry.path)
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    stats['runs_pruned'] += 1
+                    if entry.name in self.manifest['runs']:
+                        self.manifest['runs'].remove(entry.name)
+
+        for name in list(self.manifest['notes']):
+            date = _date_from_name(name)
+            if not date or date >= cutoff:
+                continue
+            directory = os.path.join(self.output_dir, name)
+            if os.path.isdir(directory):
+                for file_name in os.listdir(directory):
+                    if file_name.lower().endswith(IMAGE_EXTS):
+                        path = os.path.join(directory, file_name)
+                        removed.add(path)
+                        stats['bytes_freed'] += os.path.getsize(path)
+                        os.unlink(path)
+                stats['notes_pruned'] += 1
+            # 目录里还有文字，记下名称，避免下次又被当作新目录去重
+            self.manifest['notes'].remove(name)
+            self.manifest['pruned_notes'].append(name)
+
+        images = self.manifest['images']
+        for group in images.values():
+            for path in removed.intersection(group['paths']):
+                del group['paths'][path]
+        # 先删空的缩小组；原图组只要缩小后的组还在就保留，之后到期的相同原图还能链接过去
+        for digest, group in list(images.items()):
+            if group['downsampled'] and not group['paths']:
+                del images[digest]
+        for digest, group in list(images.items()):
+            if not group['paths'] and group.get('reduced') not in images:
+                del images[digest]
+
+    @staticmethod
+    def _prune_thumbnails(stats: Dict[str, int]):
+        # 缩略图缓存在状态目录中，不受发布锁保护，也不需要
+        from thumbnails import ThumbnailCache
+        pruned = ThumbnailCache().prune()
+        stats['thumbnails_pruned'] += pruned['removed']
+        stats['bytes_freed'] += pruned['bytes_freed']
+
+    @staticmethod
+    def _tree_size(path: str) -> int:
+        """目录总大小（硬链接只要还有其他引用就不算释放）"""
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                if st.st_nlink <= 1:
+                    total += st.st_size
+        return total
+
+
+def print_retention_stats(stats: Dict[str, int]):
+    print(f"🧹 输出目录整理: 归档报告 {stats['reports_archived']} 份, "
+          f"去重图片 {stats['images_deduped']} 张, 缩小 {stats['images_downsampled']} 张, "
+          f"删除运行 {stats['runs_pruned']} 个, 清理缩略图 {stats['thumbnails_pruned']} 张, 释放 {stats['bytes_freed'] / 1024 / 1024:.1f} MiB")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+运行隔离模块
+每次运行有独立的运行ID和工作目录，结果完整生成后再原子发布，重叠运行互不覆盖
+
+目录结构（均在输出目录下）：
+- .work/<运行ID>/     运行中的工作目录，只有本次运行写入
+- runs/<运行ID>/      发布后的完整结果（工作目录整体rename过来）
+- latest -> runs/<运行ID>   指向最近一次发布的符号链接
+- tech_news_*.jpg     兼容旧路径的最新图片（临时文件 + rename 原子替换）
+
+发布步骤用文件锁串行化，保证最新图片和latest链接来自同一次运行。
+"""
+
+import os
+import re
+import secrets
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows没有fcntl，发布时不加锁
+    fcntl = None
+
+# 崩溃残留的工作目录超过该时间（秒）后清理
+STALE_WORK_AGE = 24 * 3600
+
+_RUN_ID = re.compile(r'\d{8}_\d{6}_[0-9a-f]{6}$')
+
+
+def new_run_id() -> str:
+    """时间戳 + 随机后缀，按字典序即按时间排序"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(3)}"
+
+
+def is_note_dir_name(name: str) -> bool:
+    """本地笔记目录名：每次运行一个（运行ID），或旧版的每天一个（YYYYMMDD）"""
+    return (name.isdigit() and len(name) == 8) or bool(_RUN_ID.match(name))
+
+
+@contextmanager
+def publish_lock(output_dir: str):
+    """输出目录的发布锁（跨进程）"""
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, '.publish.lock'), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def atomic_copy(src: str, dst: str):
+    """复制到同目录的临时文件再rename，读者不会看到写了一半的文件"""
+    tmp_path = f"{dst}.{os.getpid()}.tmp"
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_symlink(target: str, link: str):
+    tmp_link = f"{link}.{os.getpid()}.tmp"
+    if os.path.lexists(tmp_link):
+        os.unlink(tmp_link)
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, link)
+
+
+class RunContext:
+    """一次运行的工作目录与发布"""
+
+    def __init__(self, output_dir: str, run_id: Optional[str] = None):
+        self.output_dir = output_dir
+        self.run_id = run_id or new_run_id()
+        self.work_dir = os.path.join(output_dir, '.work', self.run_id)
+        self.run_dir = os.path.join(output_dir, 'runs', self.run_id)
+        self.published = False
+
+    def create(self) -> str:
+        """创建工作目录（顺便清理崩溃残留的旧工作目录）"""
+        self._cleanup_stale()
+        os.makedirs(self.work_dir)
+        return self.work_dir
+
+    def _cleanup_stale(self):
+        work_root = os.path.dirname(self.work_dir)
+        if not os.path.isdir(work_root):
+            return
+        cutoff = time.time() - STALE_WORK_AGE
+        for entry in os.scandir(work_root):
+            try:
+                if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                continue
+
+    def published_path(self, path: str) -> str:
+        """工作目录中的路径发布后对应的路径"""
+        if path.startswith(self.work_dir + os.sep):
+            return os.path.join(self.run_dir, os.path.relpath(path, self.work_dir))
+        return path
+
+    def publish(self, latest: Optional[Dict[str, str]] = None) -> str:
+        """
+        发布本次运行：工作目录整体移动到runs/，再更新latest链接和兼容旧路径的文件
+
+        Args:
+            latest: {运行目录中的文件名: 输出目录下的固定文件名}
+
+        Returns:
+            发布后的运行目录
+        """
+        with publish_lock(self.output_dir):
+            os.makedirs(os.path.dirname(self.run_dir), exist_ok=True)
+            os.rename(self.work_dir, self.run_dir)
+            self.published = True
+
+            for name, public_name in (latest or {}).items():
+                src = os.path.join(self.run_dir, name)
+                if os.path.exists(src):
+                    atomic_copy(src, os.path.join(self.output_dir, public_name))
+            try:
+                atomic_symlink(os.path.join('runs', self.run_id),
+                               os.path.join(self.output_dir, 'latest'))
+            except (OSError, NotImplementedError) as e:
+                print(f"⚠️ 更新latest链接失败: {e}")
+        return self.run_dir
+
+    def discard(self):
+        """未完成的运行丢弃工作目录，不影响已发布的结果"""
+        if not self.published:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def list_runs(output_dir: str) -> List[str]:
+    """已发布的运行ID（按时间排序）"""
+    runs_dir = os.path.join(output_dir, 'runs')
+    if not os.path.isdir(runs_dir):
+        return []
+    return sorted(entry.name for entry in os.scandir(runs_dir) if entry.is_dir())
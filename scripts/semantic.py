@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+语义聚类模块
+按关键词分类时，"OpenAI"和"GPT-5"的新闻可能落在不同卡片里，或同一事件被多家媒体重复报道。
+本模块把标题和摘要转换为向量，按语义相似度分组：
+
+- 向量化：本地CPU小模型（sentence-transformers，需自行安装）或无依赖的哈希向量化（默认）
+- 向量按内容哈希缓存在float16数组文件中（内存映射读取），同一篇文章只向量化一次
+- 近邻检索用随机超平面LSH（多表 + 单比特多探针），签名随向量持久化，
+  数万篇历史文章的索引加载和单次近邻查询都在毫秒级
+- 分组结果用于去重（几乎相同的报道只保留热度最高的一条）和排版（同组新闻归入同一类别并相邻展示）
+
+通过 TECH_NEWS_SEMANTIC=true 开启，TECH_NEWS_EMBEDDER 选择向量化方式（hashing / minilm）。
+"""
+
+import abc
+import hashlib
+import heapq
+import inspect
+import math
+import mmap
+import os
+import random
+import sqlite3
+import statistics
+import struct
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from archive_index import tokenize
+from state_store import state_path
+from trends import extract_entities
+
+try:
+    import numpy
+except ImportError:  # 可选依赖：有numpy时批量计算相似度
+    numpy = None
+
+Vector = Sequence[float]
+
+# 超过该数量的集合聚类时改用LSH近邻，否则两两精确比较
+EXACT_CLUSTER_LIMIT = 200
+
+# 每次近邻查询最多计算精确相似度的候选数
+MAX_CANDIDATES = 128
+
+_STOPWORDS = frozenset(
+    'a an the and or of to in on for with by at from as is are was were be been its it this that '
+    'new says said after over into about than more how why what will can could would may up out '
+    'has have had not but just now get gets'.split())
+
+
+def document_text(news: Dict) -> str:
+    return f"{news.get('title') or ''}\n{news.get('summary') or ''}"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+# ---- 向量化 ----
+
+class Embedder(abc.ABC):
+    """向量化基类：输出L2归一化的向量"""
+
+    name = ''
+    dim = 0
+    # 余弦相似度阈值：达到related归为同组，达到duplicate视为重复报道
+    related_threshold = 0.5
+    duplicate_threshold = 0.9
+
+    @abc.abstractmethod
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """按顺序返回与texts一一对应的向量"""
+
+
+_EMBEDDERS: Dict[str, Type[Embedder]] = {}
+
+
+def register_embedder(cls: Type[Embedder]) -> Type[Embedder]:
+    """
+    注册向量化方式（可作为类装饰器使用）
+
+    Raises:
+        TypeError: 没有实现全部抽象方法
+    """
+    if inspect.isabstract(cls):
+        raise TypeError(f"向量化方式 {cls.__name__} 未实现: {', '.join(sorted(cls.__abstractmethods__))}")
+    _EMBEDDERS[cls.name] = cls
+    return cls
+
+
+def create_embedder(name: str) -> Embedder:
+    """
+    Raises:
+        ValueError: 未知的向量化方式
+    """
+    if name not in _EMBEDDERS:
+        raise ValueError(f"未知的向量化方式: {name}（可选: {', '.join(_EMBEDDERS)}）")
+    return _EMBEDDERS[name]()
+
+
+@register_embedder
+class HashingEmbedder(Embedder):
+    """
+    哈希向量化（无需模型）
+
+    词（英文单词、中文二元组）按哈希映射到固定维度并带随机符号，词频取对数；
+    识别出的公司/产品实体额外加权，"GPT-5"与"OpenAI"因此共享同一维度
+    """
+
+    name = 'hashing'
+    dim = 256
+    related_threshold = 0.35
+    duplicate_threshold = 0.8
+    ENTITY_WEIGHT = 3.0
+
+    def _features(self, text: str) -> Dict[str, float]:
+        counts: Dict[str, float] = {}
+        for token in tokenize(text):
+            if token not in _STOPWORDS and len(token) > 1:
+                counts[token] = counts.get(token, 0.0) + 1.0
+        features = {token: 1.0 + math.log(count) for token, count in counts.items()}
+        for entity in extract_entities(text):
+            features['@' + entity] = self.ENTITY_WEIGHT
+        return features
+
+    def embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for feature, weight in self._features(text).items():
+            h = zlib.crc32(feature.encode('utf-8'))
+            vector[h % self.dim] += weight if h & 0x80000000 else -weight
+        return _normalize(vector)
+
+    def embed_batch(self, texts):
+        return [self.embed(t) for t in texts]
+
+
+@register_embedder
+class MiniLMEmbedder(Embedder):
+    """
+    本地CPU小模型（sentence-transformers的all-MiniLM-L6-v2，384维）
+
+    需要安装 sentence-transformers；模型名称可通过 TECH_NEWS_EMBEDDER_MODEL 修改
+    """
+
+    name = 'minilm'
+    dim = 384
+    related_threshold = 0.55
+    duplicate_threshold = 0.9
+    default_model = 'sentence-transformers/all-MiniLM-L6-v2'
+
+    def __init__(self):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError("使用minilm向量化需要安装sentence-transformers") from e
+        self.model = SentenceTransformer(os.getenv('TECH_NEWS_EMBEDDER_MODEL', self.default_model),
+                                         device='cpu')
+
+    def embed_batch(self, texts):
+        vectors = self.model.encode(texts, batch_size=64, normalize_embeddings=True)
+        return [list(map(float, v)) for v in vectors]
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = sum(v * v for v in vector) ** 0.5
+    return [v / norm for v in vector] if norm else vector
+
+
+def _dot(a: Vector, b: Vector) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+# ---- LSH ----
+
+class SimHasher:
+    """随机超平面签名：每张表bits个超平面，向量落在超平面哪一侧决定对应比特"""
+
+    def __init__(self, dim: int, bits: int = 10, tables: int = 12, seed: int = 20240601):
+        self.dim = dim
+        self.bits = bits
+        self.tables = tables
+        rng = random.Random(seed * 1000003 + dim)
+        self.planes = [[rng.gauss(0, 1) for _ in range(dim)] for _ in range(bits * tables)]
+
+    def signature(self, vector: Vector) -> Tuple[int, ...]:
+        # 哈希向量化的结果很稀疏，只计算非零维度
+        nonzero = [(i, v) for i, v in enumerate(vector) if v]
+        signature = []
+        for t in range(self.tables):
+            code = 0
+            for b in range(self.bits):
+                plane = self.planes[t * self.bits + b]
+                if sum(plane[i] * v for i, v in nonzero) >= 0:
+                    code |= 1 << b
+            signature.append(code)
+        return tuple(signature)
+
+    def probes(self, code: int) -> List[int]:
+        """本桶及只差一个比特的相邻桶"""
+        return [code] + [code ^ (1 << b) for b in range(self.bits)]
+
+    def as_int(self, signature: Tuple[int, ...]) -> int:
+        value = 0
+        for code in signature:
+            value = (value << self.bits) | code
+        return value
+
+    def pack(self, signature: Tuple[int, ...]) -> bytes:
+        return struct.pack(f'<{self.tables}H', *signature)
+
+    def unpack(self, blob: bytes) -> Tuple[int, ...]:
+        return struct.unpack(f'<{self.tables}H', blob)
+
+
+# ---- 向量存储 ----
+
+class EmbeddingStore:
+    """
+    按内容哈希缓存的向量
+
+    - <名称>-<维度>.f16：定长float16行，只追加，内存映射读取
+    - <名称>-<维度>.sqlite3：内容哈希 -> 行号 和 LSH签名
+    写入时在SQLite的写事务中分配行号并按偏移写入，多个进程可以同时追加
+    """
+
+    def __init__(self, name: str, dim: int, directory: Optional[str] = None):
+        self.dim = dim
+        self.row_bytes = 2 * dim
+        self._row_format = f'<{dim}e'
+        directory = directory or state_path('embeddings')
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, f"{name}-{dim}.f16")
+        self.db_path = os.path.join(directory, f"{name}-{dim}.sqlite3")
+        open(self.vectors_path, 'ab').close()
+
+        with self._connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS vectors (
+                hash TEXT PRIMARY KEY, row INTEGER UNIQUE, sig BLOB)''')
+
+        self._map: Optional[mmap.mmap] = None
+        self._array = None
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def close(self):
+        self._array = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _view(self, row: int) -> mmap.mmap:
+        """当前的内存映射，文件在映射后又追加了行时重新映射"""
+        if self._map is None or (row + 1) * self.row_bytes > len(self._map):
+            self.close()
+            with open(self.vectors_path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if numpy is not None:
+                self._array = numpy.frombuffer(self._map, dtype='<f2').reshape(-1, self.dim)
+        return self._map
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM vectors').fetchone()[0]
+
+    @staticmethod
+    def _select_rows(conn: sqlite3.Connection, hashes: List[str]) -> Dict[str, int]:
+        # 分批查询，单条语句的占位符数不超过SQLite的上限
+        found: Dict[str, int] = {}
+        for i in range(0, len(hashes), 500):
+            part = hashes[i:i + 500]
+            found.update(conn.execute(
+                f"SELECT hash, row FROM vectors WHERE hash IN ({','.join('?' * len(part))})",
+                part).fetchall())
+        return found
+
+    def lookup(self, hashes: Iterable[str]) -> Dict[str, int]:
+        with self._connect() as conn:
+            return self._select_rows(conn, list(hashes))
+
+    def add(self, vectors: Dict[str, Vector], signatures: Dict[str, bytes]) -> Dict[str, int]:
+        """
+        追加向量（已存在的哈希跳过）
+
+        Returns:
+            {内容哈希: 行号}（包括已存在的）
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = self._select_rows(conn, list(vectors))
+            next_row = conn.execute('SELECT COALESCE(MAX(row) + 1, 0) FROM vectors').fetchone()[0]
+
+            fd = os.open(self.vectors_path, os.O_WRONLY)
+            try:
+                for h, vector in vectors.items():
+                    if h in rows:
+                        continue
+                    os.pwrite(fd, struct.pack(self._row_format, *vector), next_row * self.row_bytes)
+                    conn.execute('INSERT INTO vectors VALUES (?, ?, ?)', (h, next_row, signatures[h]))
+                    rows[h] = next_row
+                    next_row += 1
+            finally:
+                os.close(fd)
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return rows
+
+    def vector(self, row: int) -> Tuple[float, ...]:
+        return struct.unpack_from(self._row_format, self._view(row), row * self.row_bytes)
+
+    def similarities(self, query: Vector, rows: List[int]) -> List[float]:
+        """query与各行的余弦相似度（向量已归一化）"""
+        if not rows:
+            return []
+        self._view(max(rows))
+        if self._array is not None:
+            matrix = self._array[rows].astype('float32')
+            return (matrix @ numpy.asarray(query, dtype='float32')).tolist()
+        return [_dot(query, self.vector(row)) for row in rows]
+
+    def signatures(self) -> Iterable[Tuple[int, bytes]]:
+        with self._connect() as conn:
+            yield from conn.execute('SELECT row, sig FROM vectors')
+
+
+# ---- 索引 ----
+
+class SemanticIndex:
+    """向量缓存 + LSH近邻索引"""
+
+    def __init__(self, embedder: Optional[Embedder] = None, directory: Optional[str] = None):
+        self.embedder = embedder or HashingEmbedder()
+        self.store = EmbeddingStore(self.embedder.name, self.embedder.dim, directory)
+        self.hasher = SimHasher(self.embedder.dim)
+        self._buckets: Optional[List[Dict[int, List[int]]]] = None
+        self._signatures: Dict[int, Tuple[int, ...]] = {}
+        self._bits: Dict[int, int] = {}  # 各表签名拼接成的整数，用于计算汉明距离
+
+    def _load(self):
+        if self._buckets is not None:
+            return
+        self._buckets = [{} for _ in range(self.hasher.tables)]
+        for row, blob in self.store.signatures():
+            self._insert(row, self.hasher.unpack(blob))
+
+    def _insert(self, row: int, signature: Tuple[int, ...]):
+        self._signatures[row] = signature
+        self._bits[row] = self.hasher.as_int(signature)
+        for table, code in zip(self._buckets, signature):
+            table.setdefault(code, []).append(row)
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._signatures)
+
+    def embed_texts(self, texts: List[str]) -> List[int]:
+        """向量化文本（命中缓存的直接复用），返回各文本的行号"""
+        self._load()
+        hashes = [content_hash(t) for t in texts]
+        rows = self.store.lookup(set(hashes))
+        missing = list(dict.fromkeys(h for h in hashes if h not in rows))
+        if missing:
+            text_of = dict(zip(hashes, texts))
+            vectors = dict(zip(missing, self.embedder.embed_batch([text_of[h] for h in missing])))
+            signatures = {h: self.hasher.signature(v) for h, v in vectors.items()}
+            added = self.store.add(vectors, {h: self.hasher.pack(s) for h, s in signatures.items()})
+            for h in missing:
+                if added[h] not in self._signatures:
+                    self._insert(added[h], signatures[h])
+            rows.update(added)
+        return [rows[h] for h in hashes]
+
+    def embed_news(self, news_list: Iterable[Dict]) -> List[int]:
+        return self.embed_texts([document_text(n) for n in news_list])
+
+    def candidates(self, row: int, limit: int = MAX_CANDIDATES) -> List[int]:
+        """
+        候选近邻：在各表的本桶和相邻桶中出现的行，按完整签名的汉明距离取最近的limit个
+
+        汉明距离与向量夹角成正比，只对最近的候选计算精确相似度，查询耗时有上限
+        """
+        self._load()
+        pool = set()
+        for table, code in zip(self._buckets, self._signatures[row]):
+            for probe in self.hasher.probes(code):
+                pool.update(table.get(probe, ()))
+        pool.discard(row)
+        if len(pool) <= limit:
+            return list(pool)
+        bits = self._bits
+        query = bits[row]
+        return heapq.nsmallest(limit, pool, key=lambda other: (bits[other] ^ query).bit_count())
+
+    def neighbors(self, row: int, k: int = 10, min_similarity: float = 0.0,
+                  within: Optional[set] = None) -> List[Tuple[int, float]]:
+        """
+        近似最近邻
+
+        Args:
+            within: 只在这些行中查找
+        """
+        if within is not None:
+            candidates = [c for c in self.candidates(row, limit=len(self._signatures)) if c in within]
+            candidates = candidates[:MAX_CANDIDATES]
+        else:
+            candidates = self.candidates(row)
+        scored = zip(candidates, self.store.similarities(self.store.vector(row), candidates))
+        results = [(c, s) for c, s in scored if s >= min_similarity]
+        results.sort(key=lambda x: x[1], reverse=True)
+        return results[:k]
+
+    def similarity(self, a: int, b: int) -> float:
+        return self.store.similarities(self.store.vector(a), [b])[0]
+
+    def cluster(self, rows: List[int], threshold: float) -> List[List[int]]:
+        """
+        相似度达到threshold的行归为一组（并查集）
+
+        Returns:
+            组列表，每组是rows中的下标，按首次出现顺序
+        """
+        positions: Dict[int, List[int]] = {}
+        for i, row in enumerate(rows):
+            positions.setdefault(row, []).append(i)
+        parent = list(range(len(rows)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i, j):
+            parent[find(i)] = find(j)
+
+        # 同一内容（相同行号）直接合并
+        for same in positions.values():
+            for i in same[1:]:
+                union(same[0], i)
+
+        unique = list(positions)
+        if len(unique) <= EXACT_CLUSTER_LIMIT:
+            for a in range(len(unique)):
+                sims = self.store.similarities(self.store.vector(unique[a]), unique[a + 1:])
+                for b, sim in enumerate(sims, a + 1):
+                    if sim >= threshold:
+                        union(positions[unique[a]][0], positions[unique[b]][0])
+        else:
+            within = set(unique)
+            for row in unique:
+                for other, _ in self.neighbors(row, k=50, min_similarity=threshold, within=within):
+                    union(positions[row][0], positions[other][0])
+
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(rows)):
+            groups.setdefault(find(i), []).append(i)
+        return list(groups.values())
+
+
+def group_news(news_list: List, index: SemanticIndex) -> Dict:
+    """
+    语义分组：去掉重复报道，同组新闻统一为组内热度最高者的类别并相邻排列
+
+    Returns:
+        {'news': 分组排序后的新闻, 'groups': [[标题, ...], ...]（多于一条的组）, 'duplicates': 去掉的条数}
+    """
+    embedder = index.embedder
+    rows = index.embed_news(news_list)
+    groups = index.cluster(rows, embedder.related_threshold)
+
+    ordered_groups = []
+    duplicates = 0
+    for members in groups:
+        members.sort(key=lambda i: news_list[i].get('hot_score', 0) or 0, reverse=True)
+        kept: List[int] = []
+        for i in members:
+            if any(rows[i] == rows[j] or index.similarity(rows[i], rows[j]) >= embedder.duplicate_threshold
+                   for j in kept):
+                duplicates += 1
+                continue
+            kept.append(i)
+        lead = news_list[kept[0]]
+        for i in kept[1:]:
+            news_list[i]['category'] = lead.get('category')
+        ordered_groups.append([news_list[i] for i in kept])
+
+    ordered_groups.sort(key=lambda g: g[0].get('hot_score', 0) or 0, reverse=True)
+    return {
+        'news': [n for group in ordered_groups for n in group],
+        'groups': [[n['title'] for n in group] for group in ordered_groups if len(group) > 1],
+        'duplicates': duplicates,
+    }
+
+
+def get_semantic_index() -> Optional[SemanticIndex]:
+    """根据 TECH_NEWS_SEMANTIC / TECH_NEWS_EMBEDDER 创建语义索引，未开启时返回None"""
+    if os.getenv('TECH_NEWS_SEMANTIC', 'false').lower() != 'true':
+        return None
+    return SemanticIndex(create_embedder(os.getenv('TECH_NEWS_EMBEDDER', 'hashing').strip().lower()))
+
+
+# ---- 基准测试 ----
+
+def benchmark(articles: int = 20000, queries: int = 200, seed: int = 7) -> Dict[str, float]:
+    """在临时目录中生成合成文章，测量向量化、索引加载和近邻查询耗时，以及相对精确检索的召回率"""
+    rng = random.Random(seed)
+    # 合成语料：约每20篇一个话题（同一事件的不同报道），每篇取话题词中的5个再加3个随机词
+    vocabulary = [f"w{i}" for i in range(5000)]
+    topics = [rng.sample(vocabulary, k=6) for _ in range(max(1, articles // 20))]
+    texts = [' '.join(rng.sample(rng.choice(topics), k=5) + rng.sample(vocabulary, k=3))
+             for _ in range(articles)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = SemanticIndex(HashingEmbedder(), directory)
+        start = time.perf_counter()
+        rows = index.embed_texts(texts)
+        embed_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = SemanticIndex(HashingEmbedder(), directory)
+        index._load()
+        load_ms = (time.perf_counter() - start) * 1000
+
+        sample = rng.sample(rows, k=min(queries, len(rows)))
+        timings = []
+        recalls = []
+        for i, row in enumerate(sample):
+            start = time.perf_counter()
+            found = index.neighbors(row, k=10)
+            timings.append((time.perf_counter() - start) * 1000)
+            if i < 20:
+                # 少量查询与暴力检索比较召回率（按相似度计，与第10名相似度并列的也算命中）
+                query = index.store.vector(row)
+                others = [r for r in range(len(index)) if r != row]
+                exact = sorted(index.store.similarities(query, others), reverse=True)[:10]
+                exact = [s for s in exact if s >= HashingEmbedder.related_threshold]
+                if exact:
+                    hits = sum(1 for _, s in found if s >= exact[-1] - 1e-6)
+                    recalls.append(min(hits, len(exact)) / len(exact))
+        index.store.close()
+
+    timings.sort()
+    return {
+        'articles': articles,
+        'embed_per_article_ms': round(embed_s * 1000 / articles, 3),
+        'index_load_ms': round(load_ms, 1),
+        'query_median_ms': round(statistics.median(timings), 2),
+        'query_p95_ms': round(timings[int(len(timings) * 0.95) - 1], 2),
+        'recall_at_10': round(statistics.mean(recalls), 3) if recalls else None,
+    }
+
+
+def print_benchmark(articles: int = 20000):
+    r = benchmark(articles)
+    print(f"⏱️ 语义索引基准（{r['articles']} 篇, numpy: {'是' if numpy is not None else '否'}）:")
+    print(f"   向量化+写入   {r['embed_per_article_ms']:>8.3f} ms/篇")
+    print(f"   索引加载      {r['index_load_ms']:>8.1f} ms")
+    print(f"   近邻查询      {r['query_median_ms']:>8.2f} ms（中位数）  {r['query_p95_ms']:.2f} ms（p95）")
+    print(f"   召回率@10     {r['recall_at_10']}")
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+运行输入快照与重放
+新闻缓存在/tmp中会被覆盖，hot_score又是随机的，出问题的图片事后无法复现。
+每次运行在生成图片之前把渲染所需的全部输入保存为快照，之后可以离线重新渲染：
+
+- 内容寻址：每篇新闻、趋势快照、配置各存为一个对象，文件名是规范化JSON的sha256，
+  内容相同的对象只存一份（连续几天重复出现的新闻不会重复占用空间），zlib压缩
+- 每次运行一个清单对象，记录各对象的哈希、生成时间和模板文件的版本；
+  runs/<运行ID> 指向清单
+- 读取时校验哈希，损坏的快照会报错而不是渲染出错误的图片
+- 超过SNAPSHOT_DAYS天的快照及不再被引用的对象在保存新快照时清理
+
+重放（python3 main.py replay <运行ID>）只做渲染和文案排版，不访问网络，
+使用快照中的新闻、趋势和运行日期，以及当前代码中的模板。
+新闻配图只取本机缩略图缓存，缓存中已没有的配图会在结果中列出（对应卡片按无配图版式渲染）。
+"""
+
+import hashlib
+import json
+import os
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from news_item import NewsItem, to_news_items
+
+SNAPSHOT_VERSION = 1
+
+# 快照保留天数（与输出目录中运行结果的保留时间一致）
+SNAPSHOT_DAYS = 90
+
+# 影响渲染和文案结果的源文件，其哈希记录在快照中，重放时提示模板是否已修改
+TEMPLATE_FILES = ('image_generator.py', 'asset_atlas.py', 'formatter.py', 'trends.py')
+
+# 记录到快照中的配置（只记录TECH_NEWS_前缀的变量，不记录任何密钥）
+_CONFIG_PREFIX = 'TECH_NEWS_'
+_SECRET_MARKERS = ('KEY', 'TOKEN', 'SECRET', 'PASSWORD')
+
+
+class SnapshotError(Exception):
+    """快照不存在、不唯一或已损坏"""
+
+
+def canonical(obj: Any) -> bytes:
+    """规范化JSON（键排序、无多余空白），相同内容总是得到相同的字节"""
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def template_versions() -> Dict[str, str]:
+    """模板源文件的哈希（前12位）"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    versions = {}
+    for name in TEMPLATE_FILES:
+        try:
+            with open(os.path.join(directory, name), 'rb') as f:
+                versions[name] = hashlib.sha256(f.read()).hexdigest()[:12]
+        except OSError:
+            versions[name] = ''
+    return versions
+
+
+def snapshot_config(variants: Optional[List[Dict]] = None) -> Dict[str, Any]:
+    """本次运行的相关配置（环境变量 + 版式变体定义）"""
+    env = {name: value for name, value in sorted(os.environ.items())
+           if name.startswith(_CONFIG_PREFIX) and not any(m in name for m in _SECRET_MARKERS)}
+    return {'env': env, 'variants': variants}
+
+
+class SnapshotStore:
+    """内容寻址的快照存储"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, 'objects')
+        self.runs_dir = os.path.join(directory, 'runs')
+
+    # ---- 对象 ----
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put(self, obj: Any) -> Tuple[str, int]:
+        """
+        写入对象（已存在时跳过）
+
+        Returns:
+            (哈希, 新写入的字节数)
+        """
+        data = canonical(obj)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        compressed = zlib.compress(data, 9)
+        self._write_atomic(path, compressed)
+        return digest, len(compressed)
+
+    def get(self, digest: str) -> Any:
+        """
+        Raises:
+            SnapshotError: 对象不存在或内容与哈希不符
+        """
+        try:
+            with open(self._object_path(digest), 'rb') as f:
+                data = zlib.decompress(f.read())
+        except (OSError, zlib.error) as e:
+            raise SnapshotError(f"快照对象 {digest[:12]} 无法读取: {e}")
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise SnapshotError(f"快照对象 {digest[:12]} 已损坏")
+        return json.loads(data)
+
+    # ---- 运行 ----
+
+    def save(self, run_id: str, news_list: List, trends: Optional[Dict] = None,
+             variants: Optional[List[Dict]] = None, created_at: Optional[datetime] = None) -> Dict:
+        """
+        保存一次运行的输入
+
+        Returns:
+            {'id': 清单哈希, 'articles': 新闻数, 'new_objects': 新写入对象数, 'bytes': 新写入字节数}
+        """
+        new_objects = written = 0
+
+        def put(obj) -> str:
+            nonlocal new_objects, written
+            digest, size = self.put(obj)
+            if size:
+                new_objects += 1
+                written += size
+            return digest
+
+        manifest = {
+            'version': SNAPSHOT_VERSION,
+            'run_id': run_id,
+            'created_at': (created_at or datetime.now()).isoformat(timespec='seconds'),
+            'articles': [put(item.to_dict()) for item in to_news_items(news_list)],
+            'trends': put(trends) if trends is not None else None,
+            'config': put(snapshot_config(variants)),
+            'templates': template_versions(),
+        }
+        digest = put(manifest)
+        self._write_atomic(os.path.join(self.runs_dir, run_id), digest.encode('ascii'))
+        return {'id': digest, 'articles': len(manifest['articles']),
+                'new_objects': new_objects, 'bytes': written}
+
+    def list_runs(self) -> List[str]:
+        """有快照的运行ID（按时间排序）"""
+        try:
+            return sorted(name for name in os.listdir(self.runs_dir) if not name.endswith('.tmp'))
+        except FileNotFoundError:
+            return []
+
+    def resolve(self, run_id: str) -> str:
+        """
+        运行ID可以是完整ID、唯一前缀或latest
+
+        Raises:
+            SnapshotError: 没有匹配或匹配不唯一
+        """
+        runs = self.list_runs()
+        if run_id == 'latest':
+            if not runs:
+                raise SnapshotError("还没有任何运行快照")
+            return runs[-1]
+        if run_id in runs:
+            return run_id
+        matches = [r for r in runs if r.startswith(run_id)]
+        if not matches:
+            raise SnapshotError(f"找不到运行 {run_id} 的快照")
+        if len(matches) > 1:
+            raise SnapshotError(f"运行ID前缀 {run_id} 不唯一: {', '.join(matches[:5])}")
+        return matches[0]
+
+    def load(self, run_id: str) -> Dict:
+        """
+        读取快照
+
+        Returns:
+            {'run_id', 'created_at', 'news': [NewsItem], 'trends', 'config', 'templates'}
+        """
+        run_id = self.resolve(run_id)
+        try:
+            with open(os.path.join(self.runs_dir, run_id), 'r', encoding='ascii') as f:
+                digest = f.read().strip()
+        except OSError as e:
+            raise SnapshotError(f"读取运行 {run_id} 的快照失败: {e}")
+        manifest = self.get(digest)
+        if manifest.get('version') != SNAPSHOT_VERSION:
+            raise SnapshotError(f"不支持的快照版本: {manifest.get('version')}")
+        return {
+            'run_id': run_id,
+            'id': digest,
+            'created_at': datetime.fromisoformat(manifest['created_at']),
+            'news': [NewsItem.from_dict(self.get(d)) for d in manifest['articles']],
+            'trends': self.get(manifest['trends']) if manifest['trends'] else None,
+            'config': self.get(manifest['config']),
+            'templates': manifest['templates'],
+        }
+
+    def prune(self, keep_days: int = SNAPSHOT_DAYS) -> int:
+        """
+        删除过期快照，以及不再被任何快照引用的对象
+
+        Returns:
+            删除的快照数
+        """
+        cutoff = (datetime.now() - timedelta(days=keep_days)).strftime('%Y%m%d')
+        expired = [r for r in self.list_runs() if r[:8].isdigit() and r[:8] < cutoff]
+        for run_id in expired:
+            os.unlink(os.path.join(self.runs_dir, run_id))
+        if not expired:
+            return 0
+
+        # 标记：仍然存在的快照引用的所有对象
+        live = set()
+        for run_id in self.list_runs():
+            try:
+                with open(os.path.join(self.runs_dir, run_id), 'r', encoding='ascii') as f:
+                    digest = f.read().strip()
+                manifest = self.get(digest)
+            except (OSError, SnapshotError):
+                continue
+            live.add(digest)
+            live.update(manifest['articles'])
+            live.update(d for d in (manifest['trends'], manifest['config']) if d)
+
+        # 清除：刚写入的对象可能属于正在保存的快照，留到下次再判断
+        recent = time.time() - 3600
+        for prefix in os.listdir(self.objects_dir):
+            directory = os.path.join(self.objects_dir, prefix)
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if prefix + name not in live and os.path.getmtime(path) < recent:
+                    os.unlink(path)
+        return len(expired)
+
+
+def replay(store: SnapshotStore, run_id: str, output_dir: str) -> Dict:
+    """
+    用快照离线重新渲染图片和文案
+
+    Args:
+        output_dir: 输出目录（已有的同名文件会被覆盖）
+
+    Returns:
+        {'run_id', 'images', 'variants', 'note', 'changed_templates', 'missing_thumbnails',
+         'load_ms', 'render_ms'}
+    """
+    start = time.perf_counter()
+    snapshot = store.load(run_id)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    from formatter import format_for_xiaohongshu
+    from image_generator import XiaohongshuImageGenerator
+    from thumbnails import ThumbnailFetcher, is_thumbnails_enabled
+
+    current = template_versions()
+    changed = [name for name, version in snapshot['templates'].items() if current.get(name) != version]
+
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    generator = XiaohongshuImageGenerator()
+    generator.render_date = snapshot['created_at']
+    if is_thumbnails_enabled():
+        # 只用本机已缓存的配图，重放不访问网络
+        generator.thumbnails = ThumbnailFetcher(offline=True)
+    news = snapshot['news']
+    images = generator.generate_all_images(news, snapshot['trends'], output_dir)
+
+    variants = []
+    if snapshot['config'].get('variants'):
+        variants = generator.render_variants(news, snapshot['config']['variants'],
+                                             os.path.join(output_dir, 'variants'))
+
+    note_path = os.path.join(output_dir, 'note.txt')
+    with open(note_path, 'w', encoding='utf-8') as f:
+        f.write(format_for_xiaohongshu(news, date=snapshot['created_at']))
+
+    return {
+        'run_id': snapshot['run_id'],
+        'images': images,
+        'variants': variants,
+        'note': note_path,
+        'changed_templates': changed,
+        'missing_thumbnails': generator.thumbnails.missing if generator.thumbnails is not None else [],
+        'load_ms': round(load_ms, 1),
+        'render_ms': round((time.perf_counter() - start) * 1000, 1),
+    }
@@ -0,0 +1,644 @@
+#!/usr/bin/env python3
+"""
+长时间运行测试（soak test）
+在同一个进程中反复运行"获取 -> 渲染 -> 发送"流程和突发监控轮询（可持续数小时），
+新闻源、图片和Webhook都由本地桩服务提供，并按比例注入延迟、5xx错误和429限流
+
+每轮结束后记录进程的资源占用，结束时与预热后的基线比较，超过阈值即判定失败：
+- 常驻内存（RSS）和Python堆（开启tracemalloc时）的增长
+- 打开的文件描述符数、线程数的增长（连接、文件或线程池没有关闭）
+- 存活的Pillow图片对象数的增长（渲染后图片没有释放；素材和背景缓存中的图片在预热后不再增加）
+- 各内存缓存的条目数是否在预热后仍在增长（缓存没有上限）
+- 每轮耗时的漂移（后段中位数 / 前段中位数）
+- 迭代中抛出的未捕获异常
+
+python3 main.py soak --duration 2h（完整用法见 main.py soak --help）
+"""
+
+import contextlib
+import gc
+import io
+import json
+import os
+import random
+import re
+import statistics
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from builtin_providers import NewsAPIProvider
+from provider_sdk import create_provider, provider_names, register_provider
+
+# 桩服务地址所在的环境变量（设置后桩新闻源才会启用）
+SOAK_URL_ENV = 'TECH_NEWS_SOAK_URL'
+
+# 桩服务提供的不同配图数（缩略图缓存命中与下载都会出现）
+STUB_IMAGES = 24
+
+_COMPANIES = ('Nvidia', 'OpenAI', 'Apple', 'Tesla', 'Google', 'Microsoft', 'TSMC', 'Meta',
+              'Intel', 'Samsung', 'Anthropic', 'AMD')
+_TOPICS = ('unveils new AI chip', 'launches reasoning model', 'expands robotaxi pilot',
+           'ships AR headset update', 'announces 2nm roadmap', 'opens datacenter region',
+           'cuts GPU prices', 'releases open-weight LLM')
+_SOURCES = ('The Verge', 'TechCrunch', 'Reuters', 'Bloomberg', 'Ars Technica', 'Wired')
+
+
+# ---- 故障注入 ----
+
+@dataclass
+class FaultPlan:
+    """桩服务对每个请求注入的故障"""
+    latency_min: float = 0.0    # 额外延迟下限（秒）
+    latency_max: float = 0.3    # 额外延迟上限（秒）
+    error_rate: float = 0.1     # 返回5xx的比例
+    rate_limit_rate: float = 0.05  # 返回429的比例
+    seed: int = 0
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def decide(self) -> Tuple[float, Optional[int]]:
+        """
+        Returns:
+            (延迟秒数, 注入的HTTP状态码或None)
+        """
+        with self._lock:
+            delay = self._random.uniform(self.latency_min, self.latency_max)
+            roll = self._random.random()
+            status = self._random.choice((500, 502, 503))
+        if roll < self.rate_limit_rate:
+            return delay, 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, status
+        return delay, None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+# ---- 桩服务 ----
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET  /news?pageSize=N  NewsAPI格式的新文章（每次请求都是新的一批，同一事件由多家媒体报道）
+    GET  /rss              RSS订阅源（带media:thumbnail）
+    GET  /article/<id>     文章页面（原文摘要提取）
+    GET  /img/<n>.jpg      配图
+    POST /webhook          笔记Webhook
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def stub(self) -> 'StubServer':
+        return self.server.stub
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject(self, route: str) -> bool:
+        """注入延迟和错误，返回True表示已经以错误响应"""
+        delay, status = self.stub.faults.decide()
+        if delay:
+            time.sleep(delay)
+        self.stub.count(route, status)
+        if status is None:
+            return False
+        if status == 429:
+            self._send(429, b'{"status": "error", "code": "rateLimited", "message": "stub 429"}',
+                       'application/json', {'Retry-After': '1'})
+        else:
+            self._send(status, b'stub error\n', 'text/plain')
+        return True
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path
+        if path == '/news':
+            if self._inject('news'):
+                return
+            query = parse_qs(parts.query)
+            size = min(int((query.get('pageSize') or ['10'])[0]), 100)
+            body = json.dumps({'status': 'ok', 'totalResults': size,
+                               'articles': self.stub.articles(size)}).encode('utf-8')
+            self._send(200, body, 'application/json; charset=utf-8')
+        elif path == '/rss':
+            if self._inject('rss'):
+                return
+            self._send(200, self.stub.rss(), 'application/rss+xml; charset=utf-8')
+        elif path.startswith('/article/'):
+            if self._inject('article'):
+                return
+            self._send(200, self.stub.article_page(path.rsplit('/', 1)[-1]), 'text/html; charset=utf-8')
+        elif re.fullmatch(r'/img/\d+\.jpg', path):
+            if self._inject('image'):
+                return
+            self._send(200, self.stub.image(int(path[5:-4])), 'image/jpeg')
+        else:
+            self._send(404, b'not found\n', 'text/plain')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if self.path != '/webhook':
+            self._send(404, b'not found\n', 'text/plain')
+            return
+        if self._inject('webhook'):
+            return
+        self._send(200, b'{"ok": true}', 'application/json')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """本地桩服务（后台线程运行），提供新闻源、文章页、配图和Webhook"""
+
+    def __init__(self, faults: FaultPlan, host: str = '127.0.0.1', port: int = 0):
+        self.faults = faults
+        self._httpd = ThreadingHTTPServer((host, port), StubRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._images: Dict[int, bytes] = {}
+        self.requests: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StubServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='soak-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def count(self, route: str, status: Optional[int]):
+        outcome = 'ok' if status is None else str(status)
+        with self._lock:
+            stats = self.requests.setdefault(route, {})
+            stats[outcome] = stats.get(outcome, 0) + 1
+
+    def _next_stories(self, count: int) -> List[Dict]:
+        """新的一批文章：每个事件由2-3家媒体报道（突发监控据此聚类）"""
+        with self._lock:
+            start = self._seq
+            self._seq += count
+        now = datetime.now(timezone.utc)
+        stories = []
+        for seq in range(start, start + count):
+            event_id = seq // 3
+            company = _COMPANIES[event_id % len(_COMPANIES)]
+            topic = _TOPICS[(event_id // len(_COMPANIES)) % len(_TOPICS)]
+            stories.append({
+                'seq': seq,
+                'title': f"{company} {topic} ({event_id})",
+                'description': f"{company} {topic}, sources say the move reshapes the market. "
+                               f"Report {seq} adds analyst reactions and pricing details.",
+                'source': _SOURCES[seq % len(_SOURCES)],
+                'url': f"{self.url}/article/{seq}",
+                'image': f"{self.url}/img/{seq % STUB_IMAGES}.jpg",
+                'published': now.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'rfc822': now.strftime('%a, %d %b %Y %H:%M:%S +0000'),
+            })
+        return stories
+
+    def articles(self, count: int) -> List[Dict]:
+        return [{
+            'title': s['title'],
+            'description': s['description'],
+            'source': {'name': s['source']},
+            'url': s['url'],
+            'urlToImage': s['image'],
+            'publishedAt': s['published'],
+        } for s in self._next_stories(count)]
+
+    def rss(self, count: int = 10) -> bytes:
+        items = ''.join(
+            f"<item><title>{s['title']}</title><link>{s['url']}</link>"
+            f"<description>{s['description']}</description><pubDate>{s['rfc822']}</pubDate>"
+            f"<media:thumbnail url=\"{s['image']}\"/></item>\n"
+            for s in self._next_stories(count))
+        return (f'<?xml version="1.0"?>\n<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/">'
+                f'<channel><title>Soak Stub</title>\n{items}</channel></rss>').encode('utf-8')
+
+    def article_page(self, article_id: str) -> bytes:
+        paragraphs = ''.join(
+            f"<p>Paragraph {i} of article {article_id}: the company detailed shipments, pricing "
+            f"and partner plans, while analysts expect demand to stay strong next quarter.</p>"
+            for i in range(12))
+        return (f"<html><head><title>Article {article_id}</title></head><body><nav>menu</nav>"
+                f"<article>{paragraphs}</article><footer>footer</footer></body></html>").encode('utf-8')
+
+    def image(self, index: int) -> bytes:
+        with self._lock:
+            data = self._images.get(index)
+        if data is None:
+            from PIL import Image, ImageDraw
+            img = Image.new('RGB', (1200, 800), ((index * 37) % 256, (index * 91) % 256, 180))
+            ImageDraw.Draw(img).ellipse([300, 150, 900, 650], fill=(250, 210, 80))
+            buffer = io.BytesIO()
+            img.save(buffer, 'JPEG', quality=85)
+            data = buffer.getvalue()
+            with self._lock:
+                self._images[index] = data
+        return data
+
+
+@register_provider
+class SoakStubProvider(NewsAPIProvider):
+    """指向本地桩服务的NewsAPI格式新闻源（只在设置了TECH_NEWS_SOAK_URL时启用）"""
+    name = 'SoakStub'
+    env_key = SOAK_URL_ENV
+    default_query = 'technology'
+    cache_ttl = 0  # 每轮都真正发出请求，注入的故障才会生效
+
+    def __init__(self, api_key: Optional[str] = None):
+        super().__init__(api_key='')
+        self.base_url = os.getenv(SOAK_URL_ENV, '').rstrip('/')
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url)
+
+    def page_requests(self, query, num_results, since):
+        for request in super().page_requests(query, num_results, since):
+            request.url = f"{self.base_url}/news"
+            yield request
+
+
+@contextlib.contextmanager
+def soak_environment(stub_url: str, state_dir: str) -> Iterator[None]:
+    """
+    把流程的所有外部依赖指向桩服务（退出时恢复环境变量）：
+    真实新闻源的密钥清空，RSS和Webhook使用桩服务，状态目录使用独立目录，并开启增量模式
+    """
+    overrides = {name: '' for name in (create_provider(n).env_key for n in provider_names()) if name}
+    overrides.update({
+        SOAK_URL_ENV: stub_url,
+        'TECH_NEWS_RSS_FEEDS': f"{stub_url}/rss",
+        'GETNOTE_WEBHOOK_URL': f"{stub_url}/webhook",
+        'TECH_NEWS_STATE_DIR': state_dir,
+        'TECH_NEWS_INCREMENTAL': 'true',
+        'TECH_NEWS_EVENT_LOG': os.path.join(state_dir, 'events.jsonl'),
+    })
+    saved = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+# ---- 资源采样 ----
+
+def rss_bytes() -> Optional[int]:
+    """当前常驻内存（Linux读/proc，其他系统返回峰值）"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def open_fds() -> Optional[int]:
+    """打开的文件描述符数（不支持时返回None）"""
+    for directory in ('/proc/self/fd', '/dev/fd'):
+        try:
+            return len(os.listdir(directory)) - 1  # 不计listdir自身打开的目录
+        except OSError:
+            continue
+    return None
+
+
+def live_images() -> int:
+    """仍然存活的Pillow图片对象数"""
+    from PIL import Image
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, Image.Image))
+
+
+def sample_resources(caches: Dict[str, Callable[[], int]]) -> Dict:
+    """回收垃圾后采样一次（只统计真正泄漏的对象，而不是尚未回收的垃圾）"""
+    gc.collect()
+    rss = rss_bytes()
+    sample = {
+        'rss_mb': round(rss / 1048576, 2) if rss is not None else None,
+        'traced_mb': round(tracemalloc.get_traced_memory()[0] / 1048576, 2) if tracemalloc.is_tracing() else None,
+        'fds': open_fds(),
+        'threads': threading.active_count(),
+        'images': live_images(),
+        'caches': {},
+    }
+    for name, size in caches.items():
+        try:
+            sample['caches'][name] = size()
+        except Exception:
+            sample['caches'][name] = None
+    return sample
+
+
+# ---- 阈值判定 ----
+
+@dataclass
+class SoakThresholds:
+    rss_growth_mb: float = 64.0      # 预热后常驻内存最多增长
+    traced_growth_mb: float = 16.0   # 预热后Python堆最多增长（开启tracemalloc时）
+    fd_growth: int = 8               # 预热后文件描述符最多增加
+    thread_growth: int = 4           # 预热后线程最多增加
+    image_growth: int = 8            # 预热后存活的图片对象最多增加
+    cache_growth: int = 16           # 预热后各内存缓存最多新增条目
+    latency_drift: float = 1.5       # 后段/前段每轮耗时中位数的上限
+    errors: int = 0                  # 允许的未捕获异常数
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _edge(values: List[float], tail: bool, size: int = 3) -> float:
+    """序列首（或尾）几个值的中位数（比单个采样点稳定）"""
+    window = values[-size:] if tail else values[:size]
+    return statistics.median(window)
+
+
+def evaluate(samples: List[Dict], thresholds: SoakThresholds, warmup: int) -> Dict:
+    """
+    比较预热后的基线与结束时的资源占用
+
+    Returns:
+        {'growth': {...}, 'latency': {...}, 'breaches': [超出阈值的说明]}
+    """
+    breaches = []
+    errors = [s for s in samples if s.get('error')]
+    if len(errors) > thresholds.errors:
+        breaches.append(f"未捕获异常 {len(errors)} 次（首次: {errors[0]['error']}）")
+
+    steady = samples[warmup:] if len(samples) > warmup else samples[-1:]
+    growth = {}
+    limits = {'rss_mb': thresholds.rss_growth_mb, 'traced_mb': thresholds.traced_growth_mb,
+              'fds': thresholds.fd_growth, 'threads': thresholds.thread_growth,
+              'images': thresholds.image_growth}
+    labels = {'rss_mb': '常驻内存(MB)', 'traced_mb': 'Python堆(MB)', 'fds': '文件描述符', 'threads': '线程',
+              'images': '存活图片对象'}
+    for key, limit in limits.items():
+        values = [s[key] for s in steady if s.get(key) is not None]
+        if not values:
+            continue
+        delta = round(_edge(values, True) - _edge(values, False), 2)
+        growth[key] = delta
+        if delta > limit:
+            breaches.append(f"{labels[key]}增长 {delta}，超过阈值 {limit}")
+
+    for name in sorted({n for s in steady for n in s['caches']}):
+        values = [s['caches'][name] for s in steady if s['caches'].get(name) is not None]
+        if not values:
+            continue
+        delta = values[-1] - values[0]
+        growth[f"cache.{name}"] = delta
+        if delta > thresholds.cache_growth:
+            breaches.append(f"缓存 {name} 预热后仍增长了 {delta} 项（{values[0]} -> {values[-1]}），可能没有上限")
+
+    latency = {}
+    for kind in sorted({s['kind'] for s in steady}):
+        values = [s['latency_s'] for s in steady if s['kind'] == kind and not s.get('error')]
+        if len(values) < 6:
+            continue
+        third = len(values) // 3
+        early, late = statistics.median(values[:third]), statistics.median(values[-third:])
+        drift = round(late / early, 2) if early > 0 else None
+        latency[kind] = {'early_s': round(early, 3), 'late_s': round(late, 3), 'drift': drift,
+                         'p95_s': round(sorted(values)[int(len(values) * 0.95) - 1], 3)}
+        if drift is not None and drift > thresholds.latency_drift:
+            breaches.append(f"{kind} 每轮耗时从 {early:.2f}s 漂移到 {late:.2f}s（{drift}倍），"
+                            f"超过阈值 {thresholds.latency_drift}")
+
+    return {'growth': growth, 'latency': latency, 'breaches': breaches}
+
+
+def parse_duration(value: str) -> float:
+    """'90' / '45s' / '30m' / '2h' -> 秒"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*', value or '')
+    if not match:
+        raise ValueError(f"无法识别的时长: {value!r}")
+    return float(match.group(1)) * {'': 1, 's': 1, 'm': 60, 'h': 3600}[match.group(2)]
+
+
+# ---- 驱动 ----
+
+class SoakTest:
+    """在一个进程中反复运行流程并采样资源占用"""
+
+    def __init__(self, directory: str, faults: Optional[FaultPlan] = None,
+                 thresholds: Optional[SoakThresholds] = None, mode: str = 'both',
+                 warmup: int = 3, trace_malloc: bool = False):
+        """
+        Args:
+            directory: 本次测试的输出、状态和报告目录
+            mode: run（日报流程）/ watch（突发监控轮询）/ both（每轮两者各一次）
+            warmup: 不计入基线的预热轮数（字体、素材、连接池等首次加载）
+            trace_malloc: 开启tracemalloc，统计Python堆并在报告中列出增长最多的分配位置
+        """
+        if mode not in ('run', 'watch', 'both'):
+            raise ValueError(f"未知的模式: {mode}")
+        self.directory = directory
+        self.output_dir = os.path.join(directory, 'output')
+        self.state_dir = os.path.join(directory, 'state')
+        self.faults = faults or FaultPlan()
+        self.thresholds = thresholds or SoakThresholds()
+        self.mode = mode
+        self.warmup = warmup
+        self.trace_malloc = trace_malloc
+
+    def _steps(self, make_pipeline: Callable[[str], object]) -> Tuple[List[Tuple[str, Callable]], Dict]:
+        """
+        每轮执行的步骤，以及需要监控大小的内存缓存
+
+        每个步骤开始前清除新闻源健康度记录：注入的429会把新闻源标记为当日配额耗尽，
+        连续错误会打开熔断器，不清除的话之后的轮次都不再请求新闻源，测不到获取路径
+        """
+        steps = []
+        caches: Dict[str, Callable[[], int]] = {}
+        if self.mode in ('run', 'both'):
+            pipeline = make_pipeline(self.output_dir)
+
+            def run_pipeline():
+                pipeline.news_fetcher.router.reset()
+                return pipeline.run(skip_send=False)
+
+            steps.append(('run', run_pipeline))
+            caches.update({f"run.{name}": (lambda n=name: pipeline.image_generator.cache_sizes()[n])
+                           for name in ('fonts', 'gradients', 'assets')})
+        if self.mode in ('watch', 'both'):
+            from watch_mode import BreakingNewsWatcher
+            watcher = BreakingNewsWatcher(self.output_dir, os.path.join(self.output_dir, 'archive.sqlite3'),
+                                          send=True, daily_polls=10 ** 6)
+
+            def poll_watcher():
+                watcher.fetcher.router.reset()
+                return watcher.poll_once()
+
+            steps.append(('watch', poll_watcher))
+            caches.update({f"watch.{name}": (lambda n=name: watcher.generator.cache_sizes()[n])
+                           for name in ('fonts', 'gradients', 'assets')})
+        return steps, caches
+
+    def run(self, make_pipeline: Callable[[str], object], duration: Optional[float] = None,
+            iterations: Optional[int] = None, interval: float = 0, verbose: bool = False) -> Dict:
+        """
+        运行测试直到达到时长或轮数（两者都未指定时运行10轮）
+
+        Args:
+            make_pipeline: output_dir -> 日报流程对象（main.TechNewsAutomation）
+            interval: 两轮之间的间隔秒数
+            verbose: 显示流程自身的输出（默认只显示每轮一行）
+
+        Returns:
+            测试报告（同时写入 <directory>/soak_report.json），'passed' 为是否全部在阈值内
+        """
+        if duration is None and iterations is None:
+            iterations = 10
+        os.makedirs(self.output_dir, exist_ok=True)
+        os.makedirs(self.state_dir, exist_ok=True)
+
+        stub = StubServer(self.faults).start()
+        print(f"🧪 桩服务: {stub.url}  故障注入: 延迟 {self.faults.latency_min}-{self.faults.latency_max}s, "
+              f"5xx {self.faults.error_rate:.0%}, 429 {self.faults.rate_limit_rate:.0%}")
+        if self.trace_malloc:
+            tracemalloc.start(10)
+        samples: List[Dict] = []
+        baseline_snapshot = None
+        started = time.time()
+        try:
+            with soak_environment(stub.url, self.state_dir):
+                steps, caches = self._steps(make_pipeline)
+                iteration = 0
+                while True:
+                    if iterations is not None and iteration >= iterations:
+                        break
+                    if duration is not None and time.time() - started >= duration:
+                        break
+                    for kind, step in steps:
+                        samples.append(self._iterate(iteration, kind, step, caches, started, verbose))
+                    if iteration == self.warmup - 1 and self.trace_malloc:
+                        baseline_snapshot = tracemalloc.take_snapshot()
+                    iteration += 1
+                    if interval:
+                        time.sleep(interval)
+        finally:
+            stub.stop()
+
+        report = {
+            'started_at': datetime.fromtimestamp(started).isoformat(timespec='seconds'),
+            'elapsed_s': round(time.time() - started, 1),
+            'mode': self.mode,
+            'iterations': len({s['iteration'] for s in samples}),
+            'warmup': self.warmup,
+            'faults': self.faults.to_dict(),
+            'thresholds': self.thresholds.to_dict(),
+            'stub_requests': stub.requests,
+            'samples': samples,
+        }
+        report.update(evaluate(samples, self.thresholds, self.warmup * len(steps)))
+        if self.trace_malloc:
+            if baseline_snapshot is not None:
+                # 不计测试自身的采样记录和桩服务
+                own = [tracemalloc.Filter(False, __file__)]
+                diff = tracemalloc.take_snapshot().filter_traces(own).compare_to(
+                    baseline_snapshot.filter_traces(own), 'lineno')
+                report['top_allocations'] = [
+                    {'where': str(stat.traceback[0]), 'size_diff_kb': round(stat.size_diff / 1024, 1),
+                     'count_diff': stat.count_diff} for stat in diff[:10]]
+            tracemalloc.stop()
+        report['passed'] = not report['breaches']
+
+        report_path = os.path.join(self.directory, 'soak_report.json')
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        report['report_path'] = report_path
+        return report
+
+    def _iterate(self, iteration: int, kind: str, step: Callable, caches: Dict,
+                 started: float, verbose: bool) -> Dict:
+        """执行一轮中的一个步骤并采样"""
+        start = time.perf_counter()
+        error = None
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output) if not verbose else contextlib.nullcontext():
+                result = step()
+            outcome = self._describe(kind, result)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            outcome = '异常'
+        latency = time.perf_counter() - start
+
+        sample = dict(iteration=iteration, kind=kind, at_s=round(time.time() - started, 1),
+                      latency_s=round(latency, 3), outcome=outcome, error=error,
+                      **sample_resources(caches))
+        traced = f" 堆 {sample['traced_mb']}MB" if sample['traced_mb'] is not None else ''
+        print(f"   #{iteration:<4} {kind:<5} {latency:6.2f}s  {outcome:<16} RSS {sample['rss_mb']}MB{traced} "
+              f"fd {sample['fds']} 线程 {sample['threads']} 图片 {sample['images']}"
+              + (f"  ❌ {error}" if error else ''))
+        return sample
+
+    @staticmethod
+    def _describe(kind: str, result) -> str:
+        if kind == 'watch':
+            return f"新 {result['new']} 推送 {len(result['alerts'])}"
+        if 'run_dir' not in result:
+            return '未发布'
+        send = result['steps'].get('send_to_getnote', {})
+        return f"已发布/{send.get('method', 'webhook') if send.get('success') else '发送失败'}"
+
+
+def print_report(report: Dict):
+    """打印测试结论"""
+    print("=" * 60)
+    print(f"🧪 Soak测试: {report['iterations']} 轮, 用时 {report['elapsed_s'] / 60:.1f} 分钟（模式 {report['mode']}）")
+    requests_total = {route: sum(stats.values()) for route, stats in report['stub_requests'].items()}
+    injected = {route: sum(n for outcome, n in stats.items() if outcome != 'ok')
+                for route, stats in report['stub_requests'].items()}
+    print("   桩服务请求: " + ', '.join(f"{route} {requests_total[route]}（注入故障 {injected[route]}）"
+                                    for route in sorted(requests_total)))
+    for key, delta in report['growth'].items():
+        print(f"   {key:<20} {delta:+}")
+    for kind, stats in report['latency'].items():
+        print(f"   {kind} 耗时: 前段 {stats['early_s']}s -> 后段 {stats['late_s']}s "
+              f"（{stats['drift']}倍, p95 {stats['p95_s']}s）")
+    for item in report.get('top_allocations', [])[:5]:
+        print(f"   {item['size_diff_kb']:+9.1f} KiB  {item['where']}")
+    if report['passed']:
+        print("✅ 所有指标都在阈值内")
+    else:
+        for breach in report['breaches']:
+            print(f"❌ {breach}")
+    print(f"📊 报告: {report['report_path']}")
+    print("=" * 60)
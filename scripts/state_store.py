@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+持久化状态存储工具
+统一管理跨运行保存的状态文件位置，并提供原子写入
+"""
+
+import json
+import os
+import tempfile
+from typing import Any, Optional
+
+DEFAULT_STATE_DIR = "/tmp/tech_news_state"
+
+
+def get_state_dir() -> str:
+    """获取状态目录（可通过环境变量TECH_NEWS_STATE_DIR覆盖）"""
+    state_dir = os.getenv('TECH_NEWS_STATE_DIR', DEFAULT_STATE_DIR)
+    os.makedirs(state_dir, exist_ok=True)
+    return state_dir
+
+
+def state_path(name: str) -> str:
+    """状态目录下某个文件的完整路径"""
+    return os.path.join(get_state_dir(), name)
+
+
+def load_json(path: str, default: Any = None) -> Any:
+    """读取JSON文件，文件不存在或损坏时返回默认值"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json_atomic(path: str, data: Any, indent: Optional[int] = None):
+    """原子写入JSON：先写临时文件再rename，中途失败不会留下半个文件"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+        os.chmod(tmp_path, 0o644)  # mkstemp默认0600，与普通open写出的文件保持一致
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+结构化事件日志与运行指标
+
+控制台输出仍然是给人看的emoji文字；本模块另外记录机器可读的事件和指标：
+
+- 事件以JSON行写入日志文件，自动带上当前的运行ID、阶段和新闻源
+  （用contextvars传递，asyncio任务和to_thread中同样有效）
+- 调用方只把事件放进有界内存队列，由后台线程格式化并写盘，不会阻塞抓取和渲染；
+  队列满时丢弃事件并计数，而不是等待
+- 指标（计数器、仪表、直方图）常驻内存，常驻进程（watch、serve）
+  通过本地HTTP接口暴露：GET /metrics（Prometheus文本格式）、GET /healthz（JSON）
+
+日志路径由 TECH_NEWS_EVENT_LOG 指定（默认状态目录下的events.jsonl，设为off关闭）。
+"""
+
+import atexit
+import bisect
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from state_store import state_path
+
+# 事件队列上限，超出时丢弃
+EVENT_QUEUE_SIZE = 10000
+
+# 日志文件轮转：单个文件上限和保留个数
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+# 延迟直方图的桶（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 发布到送达的延迟桶（秒）：1分钟到2天
+LAG_BUCKETS = (60, 300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600, 86400, 2 * 86400)
+
+_run_id: ContextVar[str] = ContextVar('run_id', default='')
+_stage: ContextVar[str] = ContextVar('stage', default='')
+_provider: ContextVar[str] = ContextVar('provider', default='')
+
+logger = logging.getLogger('tech_news.events')
+logger.setLevel(logging.INFO)
+logger.propagate = False
+logger.addHandler(logging.NullHandler())
+
+
+# ---- 指标 ----
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Histogram:
+    """固定桶直方图（每组标签一份）"""
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个是+Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """进程内指标注册表（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}   # 名称 -> (类型, 说明)
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._callbacks: Dict[str, Callable[[], float]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str,
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        with self._lock:
+            self._help[name] = (kind, help_text)
+            if kind == 'histogram':
+                self._buckets[name] = tuple(buckets)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _labels(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def gauge_callback(self, name: str, func: Callable[[], float]):
+        """注册在导出时才读取的仪表（如队列长度）"""
+        with self._lock:
+            self._callbacks[name] = func
+
+    def observe(self, name: str, value: float, **labels):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _labels(labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    def render(self) -> str:
+        """Prometheus文本格式"""
+        with self._lock:
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+            callbacks = dict(self._callbacks)
+            lines: List[str] = []
+
+            def header(name: str, default_kind: str):
+                kind, help_text = self._help.get(name, (default_kind, ''))
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            for name, series in sorted(self._counters.items()):
+                header(name, 'counter')
+                lines.extend(f"{name}{_format_labels(k)} {v:g}" for k, v in sorted(series.items()))
+
+            for name, series in sorted(self._histograms.items()):
+                header(name, 'histogram')
+                for key, h in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(h.buckets + (float('inf'),), h.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', le))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {h.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {h.count}")
+
+        # 回调可能加锁（如读取队列长度），在指标锁之外调用
+        for name, func in callbacks.items():
+            try:
+                gauges.setdefault(name, {})[()] = func()
+            except Exception:
+                continue
+        for name, series in sorted(gauges.items()):
+            header(name, 'gauge')
+            lines.extend(f"{name}{_format_labels(k)} {v:g}" for k, v in sorted(series.items()))
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+metrics.describe('tech_news_fetch_seconds', 'histogram', '新闻源单页请求耗时（含流式解析）')
+metrics.describe('tech_news_fetch_requests_total', 'counter', '新闻源请求数（按结果）')
+metrics.describe('tech_news_stage_seconds', 'histogram', '流水线阶段耗时')
+metrics.describe('tech_news_render_seconds', 'histogram', '单页图片渲染耗时')
+metrics.describe('tech_news_thumbnail_seconds', 'histogram', '一批新闻配图的下载和缩放耗时')
+metrics.describe('tech_news_delivery_seconds', 'histogram', '发送笔记耗时')
+metrics.describe('tech_news_delivery_lag_seconds', 'histogram', '新闻发布到送达的延迟', LAG_BUCKETS)
+metrics.describe('tech_news_events_dropped_total', 'counter', '队列已满而丢弃的事件数')
+metrics.describe('tech_news_event_queue_depth', 'gauge', '等待写盘的事件数')
+metrics.describe('tech_news_render_queue_depth', 'gauge', '渲染服务等待中的请求数')
+metrics.describe('tech_news_watch_polls_today', 'gauge', '突发监控当日已轮询次数')
+metrics.describe('tech_news_watch_interval_seconds', 'gauge', '突发监控当前轮询间隔')
+
+
+# ---- 上下文 ----
+
+def current_context() -> Dict[str, str]:
+    context = {'run_id': _run_id.get(), 'stage': _stage.get(), 'provider': _provider.get()}
+    return {k: v for k, v in context.items() if v}
+
+
+@contextmanager
+def bind(run_id: Optional[str] = None, stage: Optional[str] = None, provider: Optional[str] = None):
+    """在with块内（及其中创建的asyncio任务、线程池调用中）为事件附加ID"""
+    tokens = []
+    for var, value in ((_run_id, run_id), (_stage, stage), (_provider, provider)):
+        if value is not None:
+            tokens.append((var, var.set(value)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def event(name: str, level: int = logging.INFO, **fields):
+    """记录一个事件（只入队，不做IO）"""
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(level, name, extra={'event': name, 'context': current_context(), 'fields': fields})
+
+
+@contextmanager
+def stage(name: str):
+    """流水线阶段：绑定阶段名，结束时记录耗时事件和指标"""
+    start = time.perf_counter()
+    outcome = 'ok'
+    with bind(stage=name):
+        try:
+            yield
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe('tech_news_stage_seconds', elapsed, stage=name)
+            event('stage.finish', duration_ms=round(elapsed * 1000, 1), outcome=outcome)
+
+
+@contextmanager
+def timed(name: str, **labels):
+    """把with块的耗时记入直方图"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe(name, time.perf_counter() - start, **labels)
+
+
+def _parse_time(value: str) -> Optional[float]:
+    try:
+        dt = datetime.fromisoformat((value or '').replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.astimezone()
+    return dt.timestamp()
+
+
+def record_delivery(method: str, success: bool, duration: float, published: Iterable[str] = ()):
+    """
+    记录一次送达：发送耗时，以及每篇新闻从发布到送达的延迟
+
+    Args:
+        method: 发送方式（webhook / local_save）
+        published: 新闻的发布时间（ISO格式，无法解析的忽略）
+    """
+    metrics.observe('tech_news_delivery_seconds', duration, method=method)
+    lags = []
+    if success:
+        now = time.time()
+        for value in published:
+            ts = _parse_time(value)
+            if ts is not None and ts <= now:
+                lags.append(now - ts)
+                metrics.observe('tech_news_delivery_lag_seconds', now - ts)
+    event('delivery', method=method, success=success, duration_ms=round(duration * 1000, 1),
+          articles=len(lags), max_lag_s=round(max(lags), 1) if lags else None)
+
+
+# ---- 日志写入 ----
+
+class JSONLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'event': getattr(record, 'event', record.getMessage()),
+        }
+        entry.update(getattr(record, 'context', {}))
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃事件并计数，调用方永不等待"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 格式化留给写盘线程，这里只保证异常信息可以跨线程传递
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.inc('tech_news_events_dropped_total')
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # 退出时队列可能是满的，停止标记需要等到有空位再放入
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[_Listener] = None
+_handler: Optional[DroppingQueueHandler] = None
+_listener_lock = threading.Lock()
+
+
+def configure(path: Optional[str] = None) -> Optional[str]:
+    """
+    启动后台写盘线程（重复调用无影响）
+
+    Returns:
+        日志文件路径，关闭时返回None
+    """
+    global _listener, _handler
+    with _listener_lock:
+        if _listener is not None:
+            return _listener.handlers[0].baseFilename
+        path = path or os.getenv('TECH_NEWS_EVENT_LOG', '').strip() or state_path('events.jsonl')
+        if path.lower() == 'off':
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8')
+        file_handler.setFormatter(JSONLinesFormatter())
+        events: 'queue.Queue' = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        _handler = DroppingQueueHandler(events)
+        _listener = _Listener(events, file_handler, respect_handler_level=False)
+        _listener.start()
+        logger.addHandler(_handler)
+        metrics.gauge_callback('tech_news_event_queue_depth', events.qsize)
+        atexit.register(shutdown)
+        return path
+
+
+def shutdown():
+    """写完队列中剩余的事件并停止后台线程"""
+    global _listener, _handler
+    with _listener_lock:
+        if _listener is None:
+            return
+        logger.removeHandler(_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = _handler = None
+
+
+# ---- HTTP接口 ----
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    health: Callable[[], Dict] = staticmethod(lambda: {})
+    started = time.time()
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._send(200, metrics.render().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8')
+        elif self.path == '/healthz':
+            data = dict(status='ok', uptime_s=round(time.time() - self.started, 1))
+            try:
+                data.update(self.health())
+            except Exception as e:
+                data.update(status='error', error=str(e))
+            body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+            self._send(200 if data['status'] == 'ok' else 503, body, 'application/json; charset=utf-8')
+        else:
+            self._send(404, b'not found\n', 'text/plain; charset=utf-8')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host: str = '127.0.0.1', port: int = 8809,
+                         health: Optional[Callable[[], Dict]] = None) -> ThreadingHTTPServer:
+    """在后台线程中提供 /metrics 和 /healthz（常驻进程使用）"""
+    handler = type('Handler', (MetricsRequestHandler,), {
+        'health': staticmethod(health or (lambda: {})), 'started': time.time()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
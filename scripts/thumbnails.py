@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+新闻缩略图模块
+并发下载排名靠前新闻的配图，缩小裁剪后缓存在磁盘上，供卡片合成使用
+
+- 所有请求共享一个连接池，单张图片有体积上限和超时
+- JPEG用Pillow的draft模式解码：解码器直接按1/2、1/4、1/8缩小，
+  大图不需要完整解码再缩小
+- 缩略图按URL哈希缓存（同一张配图跨运行只下载一次），下载失败也记录一段时间，避免反复重试
+- prefetch()在后台线程中下载，调用方可以先渲染不需要缩略图的页面
+- 缓存按最近使用时间清理：超过MAX_AGE_DAYS天未使用或超出MAX_CACHED数量的缩略图、
+  过期的失败记录由prune()删除（输出目录整理时调用）
+
+通过 TECH_NEWS_THUMBNAILS 开关（默认开启）。
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from http_client import AsyncHTTPClient, HTTPError
+from state_store import state_path
+from telemetry import event, metrics
+
+# 缓存的缩略图尺寸（卡片中按需再缩小）
+THUMB_SIZE = (240, 240)
+
+# 单张图片最多下载的字节数
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
+# 解码前检查的像素上限（防止超大图片或解压炸弹）
+MAX_PIXELS = 40_000_000
+
+# 下载失败的记录有效期（秒），过期后允许重试
+FAILURE_TTL = 6 * 3600
+
+# 缩略图未被使用多少天后删除（与运行快照的保留时间一致，保留期内的快照重放时仍有配图）
+MAX_AGE_DAYS = 90
+
+# 最多缓存的缩略图数量，超出时删除最久未使用的
+MAX_CACHED = 5000
+
+_ACCEPT = 'image/jpeg,image/png,image/webp;q=0.9,image/*;q=0.8'
+
+
+def thumbnail_key(url: str) -> str:
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+
+
+def make_thumbnail(data: bytes, size: Tuple[int, int] = THUMB_SIZE) -> Image.Image:
+    """
+    把图片字节解码为居中裁剪的缩略图
+
+    Raises:
+        ValueError: 不是可识别的图片或像素过多
+    """
+    try:
+        img = Image.open(io.BytesIO(data))
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"无法识别的图片: {e}") from e
+    with img:
+        if img.width * img.height > MAX_PIXELS:
+            raise ValueError(f"图片过大: {img.width}x{img.height}")
+        # 按裁剪后短边的需要计算解码尺寸，draft只会缩小到不低于该尺寸
+        scale = max(size[0] / img.width, size[1] / img.height)
+        img.draft('RGB', (max(1, int(img.width * scale + 1)), max(1, int(img.height * scale + 1))))
+        try:
+            return ImageOps.fit(img.convert('RGB'), size, Image.LANCZOS)
+        except OSError as e:
+            raise ValueError(f"图片解码失败: {e}") from e
+
+
+class ThumbnailCache:
+    """按URL哈希缓存在磁盘上的缩略图"""
+
+    def __init__(self, directory: Optional[str] = None, size: Tuple[int, int] = THUMB_SIZE):
+        self.directory = directory or state_path('thumbnails')
+        self.size = size
+
+    def path(self, url: str) -> str:
+        key = thumbnail_key(url)
+        return os.path.join(self.directory, key[:2], f"{key}_{self.size[0]}x{self.size[1]}.jpg")
+
+    def get(self, url: str) -> Optional[Image.Image]:
+        path = self.path(url)
+        try:
+            with Image.open(path) as cached:
+                img = cached.convert('RGB')
+        except (OSError, ValueError):
+            return None
+        # 修改时间作为最近使用时间，供prune()按LRU清理
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return img
+
+    def put(self, url: str, img: Image.Image):
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        img.save(tmp_path, 'JPEG', quality=90)
+        os.replace(tmp_path, path)
+
+    def failed_recently(self, url: str) -> bool:
+        try:
+            return time.time() - os.path.getmtime(self.path(url) + '.failed') < FAILURE_TTL
+        except OSError:
+            return False
+
+    def mark_failed(self, url: str):
+        path = self.path(url) + '.failed'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w'):
+            pass
+
+    def prune(self, max_age_days: int = MAX_AGE_DAYS, max_entries: int = MAX_CACHED) -> Dict[str, int]:
+        """
+        删除久未使用的缩略图、过期的失败记录和残留的临时文件
+
+        Returns:
+            {'removed': 删除的缩略图数, 'bytes_freed': 释放的字节数}
+        """
+        now = time.time()
+        stats = {'removed': 0, 'bytes_freed': 0}
+        thumbnails = []
+
+        def remove(path: str, size: int, counted: bool):
+            try:
+                os.unlink(path)
+            except OSError:
+                return
+            stats['bytes_freed'] += size
+            stats['removed'] += int(counted)
+
+        if not os.path.isdir(self.directory):
+            return stats
+        for prefix in os.scandir(self.directory):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                age = now - st.st_mtime
+                if entry.name.endswith('.failed'):
+                    if age >= FAILURE_TTL:
+                        remove(entry.path, st.st_size, False)
+                elif entry.name.endswith('.tmp'):
+                    if age >= 3600:
+                        remove(entry.path, st.st_size, False)
+                elif age >= max_age_days * 86400:
+                    remove(entry.path, st.st_size, True)
+                else:
+                    thumbnails.append((st.st_mtime, entry.path, st.st_size))
+
+        # 数量超限时删除最久未使用的
+        thumbnails.sort()
+        for _, path, size in thumbnails[:max(0, len(thumbnails) - max_entries)]:
+            remove(path, size, True)
+
+        for prefix in os.scandir(self.directory):
+            if prefix.is_dir():
+                try:
+                    os.rmdir(prefix.path)
+                except OSError:
+                    pass
+        return stats
+
+
+class ThumbnailFetcher:
+    """并发下载并缓存缩略图"""
+
+    def __init__(self, max_concurrency: int = 6, timeout: float = 8,
+                 max_bytes: int = MAX_IMAGE_BYTES, cache: Optional[ThumbnailCache] = None,
+                 offline: bool = False):
+        """
+        Args:
+            max_concurrency: 最大并发下载数
+            timeout: 单张图片超时（秒）
+            max_bytes: 单张图片最大字节数
+            offline: 只使用磁盘缓存，不发起网络请求（重放快照时使用）
+        """
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.cache = cache or ThumbnailCache()
+        self.offline = offline
+        # 离线模式下本机缓存中没有的URL（重放时报告）
+        self.missing: List[str] = []
+
+    @property
+    def deadline(self) -> float:
+        """等待一批下载的最长时间"""
+        return self.timeout * 2
+
+    async def _fetch_one(self, client: AsyncHTTPClient, url: str) -> Optional[Image.Image]:
+        try:
+            data = await asyncio.wait_for(client.get_bytes(url, max_bytes=self.max_bytes), self.timeout)
+            # 解码在线程中进行，不阻塞其他下载
+            img = await asyncio.to_thread(make_thumbnail, data, self.cache.size)
+        except (HTTPError, asyncio.TimeoutError, ValueError) as e:
+            print(f"⚠️ 缩略图下载失败: {url} ({e or '超时'})")
+            self.cache.mark_failed(url)
+            return None
+        self.cache.put(url, img)
+        return img
+
+    async def fetch_async(self, urls: Iterable[str]) -> Dict[str, Image.Image]:
+        """下载一组缩略图（先查缓存），返回 {URL: 缩略图}，失败的URL不在结果中"""
+        start = time.perf_counter()
+        thumbnails: Dict[str, Image.Image] = {}
+        missing = []
+        for url in dict.fromkeys(u for u in urls if u and u.startswith(('http://', 'https://'))):
+            cached = self.cache.get(url)
+            if cached is not None:
+                thumbnails[url] = cached
+            elif self.offline:
+                if url not in self.missing:
+                    self.missing.append(url)
+            elif not self.cache.failed_recently(url):
+                missing.append(url)
+        cached_count = len(thumbnails)
+
+        if missing:
+            async with AsyncHTTPClient(max_connections=self.max_concurrency, timeout=self.timeout,
+                                       headers={'Accept': _ACCEPT}) as client:
+                results = await asyncio.gather(*(self._fetch_one(client, url) for url in missing))
+            thumbnails.update((url, img) for url, img in zip(missing, results) if img is not None)
+
+        elapsed = time.perf_counter() - start
+        metrics.observe('tech_news_thumbnail_seconds', elapsed)
+        event('thumbnails.fetch', cached=cached_count, downloaded=len(thumbnails) - cached_count,
+              failed=len(missing) - (len(thumbnails) - cached_count), duration_ms=round(elapsed * 1000, 1))
+        return thumbnails
+
+    def fetch(self, urls: Iterable[str]) -> Dict[str, Image.Image]:
+        """同步入口"""
+        return asyncio.run(self.fetch_async(urls))
+
+    def prefetch(self, urls: Iterable[str]) -> 'Future[Dict[str, Image.Image]]':
+        """在后台线程中下载，立即返回Future（事件中保留调用方的运行ID和阶段）"""
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='thumbnails')
+        future = executor.submit(contextvars.copy_context().run, self.fetch, list(urls))
+        executor.shutdown(wait=False)
+        return future
+
+
+def is_thumbnails_enabled() -> bool:
+    """是否在卡片中合成新闻配图（TECH_NEWS_THUMBNAILS，默认开启）"""
+    return os.getenv('TECH_NEWS_THUMBNAILS', 'true').lower() != 'false'
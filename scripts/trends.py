@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+科技趋势分析模块
+按天累计各类别、各公司/产品（实体）的新闻数，计算热度变化和爆发度，驱动总结页的趋势卡片
+
+- 每条新文章只更新它所属日期的几个计数（常数时间），不重新扫描历史
+- 每日快照只读取最近N天的聚合计数，与历史总量无关
+"""
+
+import math
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from state_store import state_path
+from watermarks import article_id
+
+# 实体别名 -> 统一名称
+ENTITY_ALIASES = {
+    'openai': 'OpenAI', 'chatgpt': 'OpenAI', 'gpt': 'OpenAI',
+    'google': '谷歌', '谷歌': '谷歌', 'gemini': '谷歌', 'deepmind': '谷歌',
+    'microsoft': '微软', '微软': '微软', 'copilot': '微软', 'azure': '微软',
+    'apple': '苹果', '苹果': '苹果', 'iphone': '苹果', 'vision pro': '苹果',
+    'nvidia': '英伟达', '英伟达': '英伟达',
+    'tesla': '特斯拉', '特斯拉': '特斯拉', 'fsd': '特斯拉',
+    'spacex': 'SpaceX', 'starlink': 'SpaceX', '星链': 'SpaceX', '星舰': 'SpaceX',
+    'meta': 'Meta', 'quest': 'Meta',
+    'amazon': '亚马逊', 'aws': '亚马逊', '亚马逊': '亚马逊',
+    'tsmc': '台积电', '台积电': '台积电',
+    'intel': '英特尔', '英特尔': '英特尔',
+    'amd': 'AMD',
+    'anthropic': 'Anthropic', 'claude': 'Anthropic',
+    'samsung': '三星', '三星': '三星',
+    'huawei': '华为', '华为': '华为',
+    'xiaomi': '小米', '小米': '小米',
+    'byd': '比亚迪', '比亚迪': '比亚迪',
+    'baidu': '百度', '百度': '百度', '文心': '百度',
+    'alibaba': '阿里巴巴', '阿里': '阿里巴巴', '通义': '阿里巴巴',
+    'tencent': '腾讯', '腾讯': '腾讯',
+    'bitcoin': '比特币', '比特币': '比特币',
+    'nasa': 'NASA',
+}
+
+# 类别趋势卡片的说明文字（数据不足时使用）
+CATEGORY_TAGLINES = {
+    '人工智能': '大模型能力持续突破，多模态成为标配',
+    '自动驾驶': '自动驾驶技术加速落地，L4级即将商用',
+    '芯片': 'AI芯片算力竞赛白热化，3nm成主流',
+    '硬件设备': '空间计算时代来临，头显设备轻量化',
+    '元宇宙': '虚拟与现实加速融合',
+    '航天': '商业航天进入高频发射时代',
+    '区块链': '数字资产监管与应用并进',
+    '云计算': '云厂商加码AI基础设施',
+    '科技': '前沿科技持续演进',
+}
+
+# 基线窗口（天）与聚合数据保留天数
+BASELINE_DAYS = 7
+RETENTION_DAYS = 90
+
+
+def _is_word_char(ch: str) -> bool:
+    """英文单词字符（中文紧挨着英文时也视为单词边界）"""
+    return ch.isascii() and ch.isalnum()
+
+
+def extract_entities(text: str) -> List[str]:
+    """从标题中识别公司/产品实体（去重，保持出现顺序）"""
+    lowered = text.lower()
+    found = []
+    for alias, name in ENTITY_ALIASES.items():
+        if name in found:
+            continue
+        if alias.isascii():
+            # 英文别名按单词边界匹配，避免"ai"匹配到"said"
+            start = lowered.find(alias)
+            while start != -1:
+                end = start + len(alias)
+                if (start == 0 or not _is_word_char(lowered[start - 1])) and \
+                        (end == len(lowered) or not _is_word_char(lowered[end])):
+                    found.append(name)
+                    break
+                start = lowered.find(alias, start + 1)
+        elif alias in text:
+            found.append(name)
+    return found
+
+
+class TrendAnalyzer:
+    """增量趋势统计"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or state_path('trends.sqlite3')
+        with self._connect() as conn:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS daily_counts (
+                    day TEXT NOT NULL, kind TEXT NOT NULL, key TEXT NOT NULL,
+                    n INTEGER NOT NULL, PRIMARY KEY (day, kind, key));
+                CREATE TABLE IF NOT EXISTS seen_articles (
+                    id TEXT PRIMARY KEY, day TEXT NOT NULL);
+                CREATE INDEX IF NOT EXISTS idx_seen_day ON seen_articles(day);
+            ''')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def update(self, news_list: Iterable, today: Optional[str] = None) -> int:
+        """
+        累加新文章的计数（已统计过的文章跳过）
+
+        Returns:
+            新统计的文章数
+        """
+        today = today or datetime.now().strftime('%Y-%m-%d')
+        added = 0
+        with self._connect() as conn:
+            for news in news_list:
+                # 按入库日期计数：日报当天收录的新闻（含前一天发布的）都算作当天的热度
+                day = today
+                cursor = conn.execute('INSERT OR IGNORE INTO seen_articles VALUES (?, ?)',
+                                      (article_id(news), day))
+                if not cursor.rowcount:
+                    continue
+                category = news.get('category') or '科技'
+                entities = extract_entities(news.get('title', ''))
+                keys = [('category', category)]
+                keys += [('entity', e) for e in entities]
+                keys += [('category_entity', f"{category}|{e}") for e in entities]
+                conn.executemany('''INSERT INTO daily_counts VALUES (?, ?, ?, 1)
+                                    ON CONFLICT(day, kind, key) DO UPDATE SET n = n + 1''',
+                                 [(day, kind, key) for kind, key in keys])
+                added += 1
+
+            # 清理过期的聚合数据，表大小与保留天数成正比
+            cutoff = (datetime.strptime(today, '%Y-%m-%d') -
+                      timedelta(days=RETENTION_DAYS)).strftime('%Y-%m-%d')
+            conn.execute('DELETE FROM daily_counts WHERE day < ?', (cutoff,))
+            conn.execute('DELETE FROM seen_articles WHERE day < ?', (cutoff,))
+        return added
+
+    def snapshot(self, today: Optional[str] = None, window: int = BASELINE_DAYS,
+                 top: int = 4) -> Dict:
+        """
+        计算当日趋势快照
+
+        Returns:
+            {'date', 'categories': [...], 'entities': [...], 'bursts': [...]}
+            每项包含 name / count（当日）/ baseline（前window天日均）/
+            velocity（当日-日均）/ burst（标准分），类别还带有当日热门实体entities
+        """
+        today = today or datetime.now().strftime('%Y-%m-%d')
+        start = (datetime.strptime(today, '%Y-%m-%d') - timedelta(days=window)).strftime('%Y-%m-%d')
+        with self._connect() as conn:
+            rows = conn.execute('SELECT day, kind, key, n FROM daily_counts WHERE day >= ? AND day <= ?',
+                                (start, today)).fetchall()
+
+        series: Dict[tuple, Dict[str, int]] = {}
+        for day, kind, key, n in rows:
+            series.setdefault((kind, key), {})[day] = n
+
+        stats = {'category': [], 'entity': [], 'category_entity': []}
+        for (kind, key), days in series.items():
+            count = days.get(today, 0)
+            history = [n for d, n in days.items() if d != today]
+            history += [0] * (window - len(history))
+            mean = sum(history) / window
+            std = math.sqrt(sum((n - mean) ** 2 for n in history) / window)
+            stats[kind].append({
+                'name': key,
+                'count': count,
+                'baseline': round(mean, 2),
+                'velocity': round(count - mean, 2),
+                'burst': round((count - mean) / (std + 1), 2),
+            })
+
+        rank = lambda s: (s['count'] > 0, s['burst'], s['count'])
+        categories = sorted(stats['category'], key=rank, reverse=True)[:top]
+        # 每个类别当天最热的实体
+        for cat in categories:
+            prefix = cat['name'] + '|'
+            cat['entities'] = [s['name'][len(prefix):] for s in
+                               sorted(stats['category_entity'], key=rank, reverse=True)
+                               if s['name'].startswith(prefix) and s['count'] > 0][:2]
+        entities = sorted(stats['entity'], key=rank, reverse=True)[:top * 2]
+        return {
+            'date': today,
+            'categories': categories,
+            'entities': entities,
+            'bursts': [s['name'] for s in stats['entity'] + stats['category']
+                       if s['count'] >= 2 and s['burst'] >= 2],
+        }
+
+
+def describe_trend(trend: Dict) -> str:
+    """生成类别趋势卡片的一句话说明"""
+    if trend['count'] <= 0:
+        return CATEGORY_TAGLINES.get(trend['name'], CATEGORY_TAGLINES['科技'])
+    parts = [f"今日{trend['count']}条"]
+    if trend['velocity'] >= 0.5:
+        parts.append(f"较7日均值+{trend['velocity']:g}")
+    elif trend['velocity'] <= -0.5:
+        parts.append(f"较7日均值{trend['velocity']:g}")
+    if trend.get('entities'):
+        parts.append('热词: ' + '、'.join(trend['entities']))
+    return ' · '.join(parts)
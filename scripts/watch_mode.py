@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+突发新闻监控模块
+在日报之外持续轮询新闻API，发现多家媒体集中报道的新事件时立即生成单条卡片并推送
+
+- 轮询使用独立的增量水位线，不影响日报的增量获取
+- 轮询间隔自适应：按当日剩余监控预算均摊到剩余时间；有新文章时缩短，安静时放宽
+- 每个API保留一部分当日配额给日报，低于保留量时监控不再使用该API
+- 新文章与最近24小时入库的文章按标题相似度聚类，按报道媒体数、热度和趋势爆发度打分
+- 同一事件只推送一次
+"""
+
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from archive_index import ArchiveIndex, tokenize
+from state_store import load_json, save_json_atomic, state_path
+from telemetry import bind, configure, event, metrics, stage, start_metrics_server, timed
+from trends import TrendAnalyzer, extract_entities
+from watermarks import WatermarkStore, article_id
+
+# 轮询间隔上下限（秒）
+MIN_INTERVAL = 120
+MAX_INTERVAL = 1800
+
+# 每天用于监控的轮询次数上限（TECH_NEWS_WATCH_POLLS）
+DEFAULT_DAILY_POLLS = 40
+
+# 每个API为日报保留的当日请求数
+DIGEST_RESERVE = 10
+
+# 聚类时回看的入库文章时间（小时）
+LOOKBACK_HOURS = 24
+
+# 标题相似度阈值；共享同一实体时放宽
+SIMILARITY = 0.3
+ENTITY_SIMILARITY = 0.15
+
+# 突发事件得分阈值
+BREAKING_SCORE = 80
+
+# 记录已推送文章ID的上限
+MAX_ALERTED_IDS = 1000
+
+# 超过计划轮询时间这么久仍未开始下一轮，/healthz 视为卡住（秒）
+STALL_GRACE = 600
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def cluster_stories(new_items: List[Dict], recent: List[Dict]) -> List[Dict]:
+    """
+    把新文章与最近入库的文章按标题相似度聚类（并查集）
+
+    Returns:
+        包含至少一篇新文章的事件：{'items', 'new', 'sources', 'entities'}
+    """
+    items = list(new_items) + list(recent)
+    tokens = [set(tokenize(n.get('title', ''))) for n in items]
+    entities = [set(extract_entities(n.get('title', ''))) for n in items]
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # 只需比较包含新文章的配对
+    for i in range(len(new_items)):
+        for j in range(i + 1, len(items)):
+            similarity = _jaccard(tokens[i], tokens[j])
+            if similarity >= SIMILARITY or (entities[i] & entities[j] and similarity >= ENTITY_SIMILARITY):
+                parent[find(i)] = find(j)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(items)):
+        groups.setdefault(find(i), []).append(i)
+
+    clusters = []
+    for members in groups.values():
+        new_members = [i for i in members if i < len(new_items)]
+        if not new_members:
+            continue
+        clusters.append({
+            'items': [items[i] for i in members],
+            'new': [items[i] for i in new_members],
+            'sources': sorted({items[i].get('source') or 'Unknown' for i in members}),
+            'entities': sorted(set().union(*(entities[i] for i in members))),
+        })
+    return clusters
+
+
+def score_cluster(cluster: Dict, bursts: Optional[List[str]] = None) -> float:
+    """事件得分：报道媒体数为主，热度和趋势爆发度加分"""
+    score = 25 * len(cluster['sources'])
+    score += 0.3 * max(n.get('hot_score', 0) or 0 for n in cluster['items'])
+    if bursts and set(cluster['entities']) & set(bursts):
+        score += 15
+    if len(cluster['new']) >= 2:
+        score += 10
+    return round(score, 1)
+
+
+class BreakingNewsWatcher:
+    """突发新闻监控循环"""
+
+    def __init__(self, output_dir: str, archive_db: str, send: bool = False,
+                 min_interval: float = MIN_INTERVAL, max_interval: float = MAX_INTERVAL,
+                 daily_polls: Optional[int] = None, threshold: float = BREAKING_SCORE):
+        """
+        Args:
+            output_dir: 输出目录，突发卡片保存在其下的breaking/
+            archive_db: 历史文章库
+            send: 是否推送（否则只生成卡片）
+            daily_polls: 每天监控轮询次数上限，默认读取TECH_NEWS_WATCH_POLLS
+            threshold: 推送的事件得分阈值
+        """
+        from news_fetcher import TechNewsFetcher
+
+        self.output_dir = output_dir
+        self.send = send
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.daily_polls = daily_polls or int(os.getenv('TECH_NEWS_WATCH_POLLS', DEFAULT_DAILY_POLLS))
+        self.threshold = threshold
+
+        self.fetcher = TechNewsFetcher()
+        self.fetcher.watermarks = WatermarkStore(state_path('watch_watermarks.json'))
+        self.archive = ArchiveIndex(archive_db)
+        self.trends = TrendAnalyzer()
+        self._generator = None
+
+        self.state_file = state_path('watch_state.json')
+        self.state = load_json(self.state_file, {}) or {}
+        self.interval = float(self.state.get('interval', min_interval))
+        
+        # /healthz 展示的最近一轮状态
+        self.last_poll_at: Optional[str] = None
+        self.next_poll_at: Optional[str] = None
+        self._next_poll_ts: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def generator(self):
+        if self._generator is None:
+            from image_generator import XiaohongshuImageGenerator
+            self._generator = XiaohongshuImageGenerator()
+        return self._generator
+
+    # ---- 预算与间隔 ----
+
+    def _polls_today(self) -> int:
+        today = datetime.now().strftime('%Y-%m-%d')
+        if self.state.get('day') != today:
+            self.state['day'] = today
+            self.state['polls'] = 0
+        return self.state['polls']
+
+    def usable_providers(self) -> List[str]:
+        """剩余配额高于日报保留量的新闻源（无需密钥的源不受配额限制）"""
+        usable = []
+        for name in self.fetcher.configured_providers():
+            remaining = self.fetcher.router.remaining_quota(name)
+            if remaining is None or remaining > DIGEST_RESERVE:
+                usable.append(name)
+        return usable
+
+    def next_interval(self, found_new: bool) -> float:
+        """
+        下次轮询的等待时间
+
+        取"预算均摊间隔"和"活跃度间隔"中较大者：有新文章时活跃度间隔减半，否则放宽1.5倍
+        """
+        now = datetime.now()
+        seconds_left = 86400 - (now.hour * 3600 + now.minute * 60 + now.second)
+        polls_left = self.daily_polls - self._polls_today()
+        budget_interval = seconds_left / polls_left if polls_left > 0 else seconds_left
+
+        self.interval = self.interval * 0.5 if found_new else self.interval * 1.5
+        self.interval = min(self.max_interval, max(self.min_interval, self.interval))
+        return min(max(self.interval, budget_interval), max(seconds_left, self.min_interval))
+
+    # ---- 轮询 ----
+
+    def poll_once(self) -> Dict:
+        """
+        轮询一次：增量获取 -> 聚类打分 -> 生成并推送突发卡片 -> 入库
+
+        Returns:
+            {'new': 新文章数, 'alerts': [推送的事件], 'providers': [使用的API]}
+        """
+        # 每轮轮询是一次独立的运行，配额额度按当时的剩余量重新计算
+        self.fetcher.quota.begin_run()
+        if self._polls_today() >= self.daily_polls:
+            print(f"⏸️ 今日监控轮询已达上限（{self.daily_polls} 次），本轮跳过")
+            return {'new': 0, 'alerts': [], 'providers': []}
+
+        providers = self.usable_providers()
+        result = {'new': 0, 'alerts': [], 'providers': providers}
+        if not providers:
+            print("⏸️ 所有API剩余配额都已低于日报保留量，本轮跳过")
+            return result
+
+        self.state['polls'] = self._polls_today() + 1
+        fetched = self.fetcher.fetch_news(num_results=20, incremental=True, providers=providers)
+        new_items = self.archive.filter_new(fetched)
+        result['new'] = len(new_items)
+        if not new_items:
+            self.fetcher.commit_watermarks()
+            return result
+
+        recent = self.archive.recent(LOOKBACK_HOURS)
+        self.trends.update(new_items)
+        bursts = self.trends.snapshot()['bursts']
+
+        alerted = set(self.state.get('alerted', []))
+        for cluster in cluster_stories(new_items, recent):
+            score = score_cluster(cluster, bursts)
+            ids = [article_id(n) for n in cluster['items']]
+            if score < self.threshold or alerted.intersection(ids):
+                continue
+            alert = self._push(cluster, score)
+            result['alerts'].append(alert)
+            alerted.update(ids)
+            self.state['alerted'] = (self.state.get('alerted', []) + ids)[-MAX_ALERTED_IDS:]
+        # 推送完成后才入库并推进水位线：推送出错时抛出异常，这些文章既不入库也不推进水位线，
+        # 下一轮重新获取时仍是新文章，突发提醒不会丢失
+        self.archive.index_news(new_items)
+        self.fetcher.commit_watermarks()
+        return result
+
+    def _push(self, cluster: Dict, score: float) -> Dict:
+        lead = max(cluster['new'], key=lambda n: n.get('hot_score', 0) or 0)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        breaking_dir = os.path.join(self.output_dir, 'breaking')
+        os.makedirs(breaking_dir, exist_ok=True)
+        with timed('tech_news_render_seconds', page='breaking'):
+            image = self.generator.generate_breaking_image(
+                lead, cluster['sources'], breaking_dir, f"breaking_{stamp}_{article_id(lead)[:8]}.jpg")
+        print(f"🚨 突发: {lead['title']}（{len(cluster['sources'])}家媒体, 得分{score}）")
+        event('watch.alert', title=lead['title'], score=score, sources=cluster['sources'])
+
+        alert = {'title': lead['title'], 'score': score, 'sources': cluster['sources'],
+                 'image': image}
+        if self.send:
+            from getnote_sender import GetNoteSender
+            content = f"{lead['title']}\n\n{lead.get('summary', '')}\n\n" \
+                      f"来源: {'、'.join(cluster['sources'])}\n{lead.get('url', '')}"
+            alert['send'] = GetNoteSender().send_note(
+                f"🚨 突发 | {lead['title']}", content, [image], self.output_dir,
+                note_name=os.path.join('breaking', f"note_{stamp}_{article_id(lead)[:8]}"),
+                published=[lead.get('published_at') or ''])
+        return alert
+
+    def health(self) -> Dict:
+        """/healthz 的内容：上一轮失败或轮询明显逾期时 status 为 error（返回503）"""
+        status = 'ok'
+        if self.last_error:
+            status = 'error'
+        elif self._next_poll_ts is not None and time.time() - self._next_poll_ts > STALL_GRACE:
+            status = 'error'
+        return {
+            'status': status,
+            'polls_today': self.state.get('polls', 0),
+            'daily_polls': self.daily_polls,
+            'interval_s': round(self.interval, 1),
+            'last_poll_at': self.last_poll_at,
+            'next_poll_at': self.next_poll_at,
+            'last_error': self.last_error,
+        }
+    
+    def run(self, max_polls: Optional[int] = None, metrics_port: Optional[int] = None):
+        """
+        持续轮询，直到Ctrl+C或达到max_polls
+        
+        Args:
+            metrics_port: 在该端口提供 /metrics 和 /healthz（为空时不启动）
+        """
+        print(f"👀 突发新闻监控已启动（每日最多轮询 {self.daily_polls} 次, "
+              f"间隔 {self.min_interval:.0f}-{self.max_interval:.0f} 秒）")
+        configure()
+        if metrics_port:
+            start_metrics_server(port=metrics_port, health=self.health)
+            print(f"📈 监控指标: http://127.0.0.1:{metrics_port}/metrics")
+        metrics.gauge_callback('tech_news_watch_polls_today', lambda: self.state.get('polls', 0))
+        metrics.gauge_callback('tech_news_watch_interval_seconds', lambda: self.interval)
+        polls = 0
+        try:
+            while max_polls is None or polls < max_polls:
+                # 每轮轮询作为一次运行，事件带上轮询ID
+                with bind(run_id=f"watch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"):
+                    try:
+                        with stage('poll'):
+                            result = self.poll_once()
+                        self.last_error = None
+                        event('watch.poll', new=result['new'], alerts=len(result['alerts']),
+                              providers=result['providers'])
+                    except Exception as e:
+                        print(f"⚠️ 本轮监控失败: {e}")
+                        self.last_error = str(e)
+                        result = {'new': 0, 'alerts': []}
+                self.last_poll_at = datetime.now().isoformat(timespec='seconds')
+                polls += 1
+                wait = self.next_interval(result['new'] > 0)
+                self.state['interval'] = self.interval
+                save_json_atomic(self.state_file, self.state)
+                self._next_poll_ts = time.time() + wait
+                self.next_poll_at = datetime.fromtimestamp(self._next_poll_ts).isoformat(timespec='seconds')
+                if max_polls is not None and polls >= max_polls:
+                    break
+                print(f"   新文章 {result['new']} 条, 推送 {len(result['alerts'])} 条, "
+                      f"{wait / 60:.1f} 分钟后再次检查")
+                time.sleep(wait)
+        except KeyboardInterrupt:
+            print("👋 突发新闻监控已停止")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+增量获取水位线模块
+按"API + 查询词"记录上次见到的最新发布时间和最近的文章ID，跨运行持久化
+
+- 支持时间过滤的API（NewsAPI、GNews）只请求水位线之后的新闻
+- 不支持的API（天行数据）在客户端按水位线过滤
+- 获取时只暂存（stage），流程发布/发送成功后再提交（commit），失败的运行下次会重新获取同一批新闻
+"""
+
+import hashlib
+from typing import List, Dict, Optional, Sequence
+
+from state_store import state_path, load_json, save_json_atomic
+
+# 每个水位线保留的最近文章ID数（处理发布时间相同的文章）
+MAX_SEEN_IDS = 200
+
+
+def normalize_timestamp(value: str) -> str:
+    """统一时间格式为 YYYY-MM-DDTHH:MM:SS，便于同一API内按字符串比较"""
+    if not value:
+        return ''
+    value = value.strip().replace(' ', 'T').rstrip('Z')
+    # 去掉毫秒和时区偏移
+    value = value.split('.')[0].split('+')[0]
+    if len(value) == 16:  # 只有到分钟
+        value += ':00'
+    return value[:19]
+
+
+def article_id(news: Dict) -> str:
+    """文章ID：优先用URL，没有URL时用标题哈希"""
+    key = news.get('url') or news.get('title', '')
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+class WatermarkStore:
+    """增量获取水位线"""
+
+    def __init__(self, state_file: Optional[str] = None):
+        self.state_file = state_file or state_path('watermarks.json')
+        self.state = load_json(self.state_file, {}) or {}
+        # 已暂存、尚未提交的推进：(API, 查询词, 返回的文章, 获取到但未返回的文章)
+        self.pending: List[tuple] = []
+
+    @staticmethod
+    def _key(provider: str, query: str) -> str:
+        return f"{provider}:{query}"
+
+    def since(self, provider: str, query: str = '') -> Optional[str]:
+        """上次见到的最新发布时间（UTC ISO格式，不带时区后缀），没有记录时返回None"""
+        mark = self.state.get(self._key(provider, query))
+        return mark['published_at'] if mark and mark.get('published_at') else None
+
+    def filter_new(self, provider: str, query: str, news_list: List[Dict]) -> List[Dict]:
+        """过滤掉水位线之前或已经见过的文章"""
+        mark = self.state.get(self._key(provider, query))
+        if not mark:
+            return news_list
+
+        watermark = mark.get('published_at', '')
+        seen = set(mark.get('seen_ids', []))
+        fresh = []
+        for news in news_list:
+            if article_id(news) in seen:
+                continue
+            published = normalize_timestamp(news.get('published_at', ''))
+            if published and watermark and published < watermark:
+                continue
+            fresh.append(news)
+        return fresh
+
+    def advance(self, provider: str, query: str, news_list: List[Dict],
+                held_back: Sequence[Dict] = ()):
+        """
+        用本次返回的文章推进水位线
+
+        Args:
+            held_back: 获取到但被条数截掉的文章，水位线不越过其中最早的发布时间，
+                       下次仍能获取到
+        """
+        if not news_list:
+            return
+        key = self._key(provider, query)
+        mark = self.state.setdefault(key, {'published_at': '', 'seen_ids': []})
+
+        latest = max((normalize_timestamp(n.get('published_at', '')) for n in news_list),
+                     default='')
+        held = [t for t in (normalize_timestamp(n.get('published_at', '')) for n in held_back) if t]
+        if held:
+            latest = min(latest, min(held))
+        if latest > mark['published_at']:
+            mark['published_at'] = latest
+
+        seen_ids = mark['seen_ids'] + [article_id(n) for n in news_list]
+        mark['seen_ids'] = list(dict.fromkeys(seen_ids))[-MAX_SEEN_IDS:]
+
+    def stage(self, provider: str, query: str, news_list: List[Dict], held_back: Sequence[Dict] = ()):
+        """暂存一次推进，commit()时才生效"""
+        if news_list:
+            self.pending.append((provider, query, list(news_list), list(held_back)))
+
+    def commit(self):
+        """应用暂存的推进并持久化"""
+        if not self.pending:
+            return
+        for provider, query, news_list, held_back in self.pending:
+            self.advance(provider, query, news_list, held_back)
+        self.pending = []
+        self.save()
+
+    def discard(self):
+        """丢弃暂存的推进"""
+        self.pending = []
+
+    def save(self):
+        """持久化水位线"""
+        try:
+            save_json_atomic(self.state_file, self.state)
+        except OSError as e:
+            print(f"水位线保存失败: {e}")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+原文摘要提取的编码测试
+用本地HTTP服务提供UTF-8和GBK编码的新闻页面，检查提取出的摘要
+
+运行: python -m unittest discover tests（或 python -m pytest tests）
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from enrichment import ArticleEnricher, PageDecoder, SummaryCache  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# 路径 -> (文件名, Content-Type)
+PAGES = {
+    '/utf8': ('article_utf8.html', 'text/html; charset=utf-8'),
+    '/utf8-meta': ('article_utf8.html', 'text/html'),
+    '/gbk-header': ('article_gbk.html', 'text/html; charset=GBK'),
+    '/gbk-meta': ('article_gbk.html', 'text/html'),
+}
+
+EXPECTED = '国产芯片厂商今天在北京发布了新一代服务器处理器'
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in PAGES:
+            self.send_error(404)
+            return
+        file_name, content_type = PAGES[self.path]
+        with open(os.path.join(FIXTURES, file_name), 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class EnrichmentCharsetTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        cache = SummaryCache(os.path.join(self.tmp.name, 'summaries.sqlite3'))
+        self.enricher = ArticleEnricher(host_interval=0, timeout=5, cache=cache)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def summary_of(self, path: str) -> str:
+        news = [{'title': '新一代处理器', 'summary': '', 'url': self.base_url + path}]
+        self.assertEqual(self.enricher.enrich(news), 1)
+        return news[0]['summary']
+
+    def assert_readable(self, summary: str):
+        self.assertIn(EXPECTED, summary)
+        self.assertNotIn('�', summary)
+
+    def test_utf8_from_header(self):
+        self.assert_readable(self.summary_of('/utf8'))
+
+    def test_utf8_from_meta(self):
+        self.assert_readable(self.summary_of('/utf8-meta'))
+
+    def test_gbk_from_header(self):
+        self.assert_readable(self.summary_of('/gbk-header'))
+
+    def test_gbk_from_meta(self):
+        self.assert_readable(self.summary_of('/gbk-meta'))
+
+
+class PageDecoderTest(unittest.TestCase):
+    def decode(self, data: bytes, content_type: str = 'text/html', chunk_size: int = 7) -> str:
+        decoder = PageDecoder()
+        decoder.set_headers({'Content-Type': content_type})
+        text = ''.join(decoder.decode(data[i:i + chunk_size]) for i in range(0, len(data), chunk_size))
+        return text + decoder.close()
+
+    def test_multibyte_split_across_chunks(self):
+        html = '<meta charset="gbk"><p>芯片</p>'
+        self.assertEqual(self.decode(html.encode('gbk')), html)
+
+    def test_header_overrides_meta(self):
+        html = '<meta charset="utf-8"><p>芯片</p>'
+        self.assertEqual(self.decode(html.encode('gbk'), 'text/html; charset=gbk'), html)
+
+    def test_unknown_charset_falls_back_to_utf8(self):
+        html = '<p>芯片</p>'
+        self.assertEqual(self.decode(html.encode('utf-8'), 'text/html; charset=x-unknown'), html)
+
+    def test_utf8_bom(self):
+        html = '<p>芯片</p>'
+        self.assertEqual(self.decode(b'\xef\xbb\xbf' + html.encode('utf-8')), html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+增量获取的水位线测试
+用两个桩新闻源模拟连续两次运行，检查跨源标题重复和被条数截掉的新闻
+
+运行: python -m unittest discover tests（或 python -m pytest tests）
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from news_fetcher import TechNewsFetcher  # noqa: E402
+from news_item import NewsItem  # noqa: E402
+from provider_sdk import NewsProvider  # noqa: E402
+
+
+class StubProvider(NewsProvider):
+    """每次都返回固定文章的新闻源"""
+
+    def __init__(self, name: str, items):
+        super().__init__()
+        self.name = name
+        self.items = items
+
+    def page_requests(self, query, num_results, since):
+        return iter(())
+
+    def normalize(self, raw):
+        return raw
+
+
+def news(title: str, url: str, hot_score: int, published_at: str, from_api: str) -> NewsItem:
+    return NewsItem(title=title, url=url, hot_score=hot_score, published_at=published_at, from_api=from_api)
+
+
+class IncrementalFetchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = mock.patch.dict(os.environ, {'TECH_NEWS_STATE_DIR': self.tmp.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def make_fetcher(self, providers):
+        fetcher = TechNewsFetcher()
+        fetcher.providers = {p.name: p for p in providers}
+
+        # 像RSS一样不按条数截断，返回全部文章
+        async def fetch(client, provider, query='', num_results=10, since=None):
+            return list(provider.items)
+
+        fetcher.hub.fetch = fetch
+        return fetcher
+
+    def run_once(self, providers, num_results):
+        # 每次运行新建fetcher，水位线从状态目录重新读取
+        fetcher = self.make_fetcher(providers)
+        titles = [n.title for n in fetcher.fetch_news(num_results=num_results, incremental=True)]
+        fetcher.commit_watermarks()
+        return titles
+
+    def test_cross_provider_duplicate_not_delivered_again(self):
+        shared = '英伟达发布新一代GPU'
+        providers = [
+            StubProvider('StubA', [news(shared, 'https://a.example/gpu', 90, '2026-10-19T08:00:00Z', 'StubA'),
+                                   news('苹果发布新款芯片', 'https://a.example/chip', 80,
+                                        '2026-10-19T07:00:00Z', 'StubA')]),
+            StubProvider('StubB', [news(shared, 'https://b.example/gpu', 85, '2026-10-19T08:05:00Z', 'StubB'),
+                                   news('微软更新Copilot', 'https://b.example/copilot', 70,
+                                        '2026-10-19T06:00:00Z', 'StubB')]),
+        ]
+        first = self.run_once(providers, num_results=10)
+        self.assertEqual(sorted(first), sorted([shared, '苹果发布新款芯片', '微软更新Copilot']))
+        self.assertEqual(self.run_once(providers, num_results=10), [])
+
+    def test_items_cut_by_num_results_delivered_next_run(self):
+        providers = [
+            StubProvider('StubA', [news(f"新闻{i}", f"https://a.example/{i}", 100 - i,
+                                        f"2026-10-19T0{i}:00:00Z", 'StubA') for i in range(4)]),
+        ]
+        first = self.run_once(providers, num_results=2)
+        self.assertEqual(len(first), 2)
+        second = self.run_once(providers, num_results=10)
+        self.assertEqual(sorted(first + second), [f"新闻{i}" for i in range(4)])
+        self.assertEqual(self.run_once(providers, num_results=10), [])
+
+
+if __name__ == '__main__':
+    unittest.main()